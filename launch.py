@@ -9,7 +9,7 @@ from six.moves import shlex_quote
 import torch
 
 # Runners
-from rlpyt.runners.minibatch_rl import MinibatchRl, MinibatchRlEval
+from rlpyt.runners.minibatch_rl import MinibatchRl, MinibatchRlEval, MinibatchRlPipelined
 
 # Policies
 from rlpyt.agents.pg.atari import AtariFfAgent, AtariLstmAgent
@@ -17,9 +17,11 @@ from rlpyt.agents.pg.mujoco import MujocoFfAgent, MujocoLstmAgent
 
 # Samplers
 from rlpyt.samplers.parallel.cpu.collectors import CpuResetCollector, CpuWaitResetCollector, CpuEvalCollector
+from rlpyt.samplers.parallel.cpu.collectors import VecCpuResetCollector, VecCpuWaitResetCollector
 from rlpyt.samplers.parallel.gpu.collectors import GpuResetCollector, GpuWaitResetCollector, GpuEvalCollector
+from rlpyt.samplers.async_.collectors import DbCpuResetCollector, DbCpuWaitResetCollector, DbVecCpuResetCollector, DbVecCpuWaitResetCollector
 from rlpyt.samplers.serial.sampler import SerialSampler
-from rlpyt.samplers.parallel.cpu.sampler import CpuSampler
+from rlpyt.samplers.parallel.cpu.sampler import CpuSampler, PipelinedCpuSampler
 from rlpyt.samplers.parallel.gpu.sampler import GpuSampler
 
 # Environments
@@ -179,6 +181,8 @@ def start_experiment(args):
         model_args['curiosity_kwargs']['forward_loss_wt'] = args.forward_loss_wt
         model_args['curiosity_kwargs']['forward_model'] = args.forward_model
         model_args['curiosity_kwargs']['feature_space'] = args.feature_space
+        model_args['curiosity_kwargs']['cache_features'] = args.cache_features
+        model_args['curiosity_kwargs']['shared_encoder'] = args.shared_encoder
     elif args.curiosity_alg == 'micm':
         model_args['curiosity_kwargs']['feature_encoding'] = args.feature_encoding
         model_args['curiosity_kwargs']['batch_norm'] = args.batch_norm
@@ -186,6 +190,7 @@ def start_experiment(args):
         model_args['curiosity_kwargs']['forward_loss_wt'] = args.forward_loss_wt
         model_args['curiosity_kwargs']['forward_model'] = args.forward_model
         model_args['curiosity_kwargs']['ensemble_mode'] = args.ensemble_mode
+        model_args['curiosity_kwargs']['ensemble_size'] = args.ensemble_size
         model_args['curiosity_kwargs']['device'] = args.sample_mode
     elif args.curiosity_alg == 'disagreement':
         model_args['curiosity_kwargs']['feature_encoding'] = args.feature_encoding
@@ -195,9 +200,10 @@ def start_experiment(args):
         model_args['curiosity_kwargs']['forward_loss_wt'] = args.forward_loss_wt
         model_args['curiosity_kwargs']['device'] = args.sample_mode
         model_args['curiosity_kwargs']['forward_model'] = args.forward_model
+        model_args['curiosity_kwargs']['cache_features'] = args.cache_features
     elif args.curiosity_alg == 'ndigo':
         model_args['curiosity_kwargs']['feature_encoding'] = args.feature_encoding
-        model_args['curiosity_kwargs']['pred_horizon'] = args.pred_horizon
+        model_args['curiosity_kwargs']['horizon'] = args.pred_horizon
         model_args['curiosity_kwargs']['prediction_beta'] = args.prediction_beta
         model_args['curiosity_kwargs']['batch_norm'] = args.batch_norm
         model_args['curiosity_kwargs']['device'] = args.sample_mode
@@ -207,6 +213,7 @@ def start_experiment(args):
         model_args['curiosity_kwargs']['drop_probability'] = args.drop_probability
         model_args['curiosity_kwargs']['gamma'] = args.discount
         model_args['curiosity_kwargs']['device'] = args.sample_mode
+        model_args['curiosity_kwargs']['cache_features'] = args.cache_features
     
     if args.curiosity_alg != 'none':
         model_args['curiosity_step_kwargs']['curiosity_step_minibatches'] = args.curiosity_step_minibatches
@@ -320,6 +327,9 @@ def start_experiment(args):
             fire_on_reset=args.fire_on_reset
             )
 
+    if args.pipelined:
+        assert args.sample_mode == 'cpu' and args.alg in ('ppo', 'a2c') and args.eval_envs == 0, \
+            'Pipelined runs need cpu sampling, an on-policy algorithm (ppo/a2c) and no evaluation.'
     if args.sample_mode == 'gpu':
         if args.lstm:
             collector_class = GpuWaitResetCollector
@@ -338,13 +348,32 @@ def start_experiment(args):
             eval_max_trajectories=args.eval_max_traj,
             record_freq=args.record_freq,
             log_dir=args.log_dir,
-            CollectorCls=collector_class
+            CollectorCls=collector_class,
+            frame_buffer=args.env in _ATARI_ENVS and args.frame_buffer
         )
+    elif args.pipelined:
+        if args.lstm:
+            collector_class = DbVecCpuWaitResetCollector if args.vec_env else DbCpuWaitResetCollector
+        else:
+            collector_class = DbVecCpuResetCollector if args.vec_env else DbCpuResetCollector
+        sampler = PipelinedCpuSampler(
+            EnvCls=env_cl,
+            env_kwargs=env_args,
+            eval_env_kwargs=env_args,
+            batch_T=args.timestep_limit,
+            batch_B=args.num_envs,
+            max_decorrelation_steps=0,
+            TrajInfoCls=traj_info_cl,
+            record_freq=args.record_freq,
+            log_dir=args.log_dir,
+            CollectorCls=collector_class,
+            frame_buffer=args.env in _ATARI_ENVS and args.frame_buffer
+            )
     else:
         if args.lstm:
-            collector_class = CpuWaitResetCollector
+            collector_class = VecCpuWaitResetCollector if args.vec_env else CpuWaitResetCollector
         else:
-            collector_class = CpuResetCollector
+            collector_class = VecCpuResetCollector if args.vec_env else CpuResetCollector
         sampler = CpuSampler(
             EnvCls=env_cl,
             env_kwargs=env_args,
@@ -358,11 +387,24 @@ def start_experiment(args):
             eval_max_trajectories=args.eval_max_traj,
             record_freq=args.record_freq,
             log_dir=args.log_dir,
-            CollectorCls=collector_class
+            CollectorCls=collector_class,
+            frame_buffer=args.env in _ATARI_ENVS and args.frame_buffer
             )
 
     # ----------------------------------------------------- RUNNER ----------------------------------------------------- #     
-    if args.eval_envs > 0:
+    if args.pipelined:
+        runner = MinibatchRlPipelined(
+            algo=algo,
+            agent=agent,
+            sampler=sampler,
+            n_steps=args.iterations,
+            affinity=affinity,
+            log_interval_steps=args.log_interval,
+            log_dir=args.log_dir,
+            pretrain=args.pretrain,
+            max_policy_lag=args.max_policy_lag
+            )
+    elif args.eval_envs > 0:
         runner = (MinibatchRlEval if args.num_gpus <= 1 else SyncRlEval)(
             algo=algo,
             agent=agent,
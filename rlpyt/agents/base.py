@@ -11,12 +11,12 @@ from rlpyt.utils.logging import logger
 from rlpyt.models.utils import strip_ddp_state_dict
 
 AgentInputs = namedarraytuple("AgentInputs", ["observation", "prev_action", "prev_reward"])
-IcmAgentCuriosityInputs = namedarraytuple("IcmAgentCuriosityInputs", ["observation", "next_observation", "action", "valid"])
-NdigoAgentCuriosityInputs = namedarraytuple("NdigoAgentCuriosityInputs", ["observation", "prev_actions", "actions", "valid"])
-RndAgentCuriosityInputs = namedarraytuple("RndAgentCuriosityInputs", ["next_observation", "valid"])
+IcmAgentCuriosityInputs = namedarraytuple("IcmAgentCuriosityInputs", ["observation", "next_observation", "action", "valid", "features"])
+NdigoAgentCuriosityInputs = namedarraytuple("NdigoAgentCuriosityInputs", ["observation", "prev_actions", "actions", "done", "prev_gru_state", "valid"])
+RndAgentCuriosityInputs = namedarraytuple("RndAgentCuriosityInputs", ["next_observation", "valid", "features"])
 
 IcmAgentCuriosityStepInputs = namedarraytuple("IcmAgentCuriosityStepInputs", ["observation", "next_observation", "actions",])
-NdigoAgentCuriosityStepInputs = namedarraytuple("NdigoAgentCuriosityStepInputs", ["observations", "prev_actions", "actions"])
+NdigoAgentCuriosityStepInputs = namedarraytuple("NdigoAgentCuriosityStepInputs", ["observations", "prev_actions", "actions", "done"])
 RndAgentCuriosityStepInputs = namedarraytuple("RndAgentCuriosityStepInputs", ["next_observation", "done"])
 
 AgentStep = namedarraytuple("AgentStep", ["action", "agent_info"])
@@ -125,20 +125,29 @@ class BaseAgent:
         """
         if cuda_idx is None:
             return
-        if self.shared_model is not None:
-            self.model = self.ModelCls(**self.env_model_kwargs,
-                **self.model_kwargs)
-            self.model.load_state_dict(self.shared_model.state_dict())
-            if self.dual_model:
-                self.model_int = self.ModelCls(**self.env_model_kwargs,
-                    **self.model_kwargs)
-                self.model_int.load_state_dict(self.shared_model_int.state_dict())
+        self.separate_shared_model()
         self.device = torch.device("cuda", index=cuda_idx)
         self.model.to(self.device)
         if self.dual_model:
             self.model_int.to(self.device)
         logger.log(f"Initialized agent model on device: {self.device}.")
 
+    def separate_shared_model(self):
+        """Replaces the model(s) trained here with new instances holding the
+        same parameters, if they are still the (shared memory) ones sampler
+        workers act with; those then only change in ``sync_shared_memory()``.
+        Called by ``to_device()``, or e.g. to optimize while workers sample.
+        """
+        if self.shared_model is None or self.shared_model is not self.model:
+            return
+        self.model = self.ModelCls(**self.env_model_kwargs,
+            **self.model_kwargs)
+        self.model.load_state_dict(self.shared_model.state_dict())
+        if self.dual_model:
+            self.model_int = self.ModelCls(**self.env_model_kwargs,
+                **self.model_kwargs)
+            self.model_int.load_state_dict(self.shared_model_int.state_dict())
+
     def data_parallel(self):
         """Wraps the model with PyTorch's DistributedDataParallel.  The
         intention is for rlpyt to create a separate Python process to drive
@@ -8,6 +8,6 @@ AgentInfoRnnTwin = namedarraytuple("AgentInfoRnnTwin", [
                                     "dist_info", "dist_int_info", 
                                     "value", "int_value", 
                                     "prev_rnn_state", "prev_int_rnn_state"])
-IcmInfo = namedarraytuple("IcmInfo", [])
-NdigoInfo = namedarraytuple("NdigoInfo", ["prev_gru_state"])
-RndInfo = namedarraytuple("RndInfo", [])
\ No newline at end of file
+IcmInfo = namedarraytuple("IcmInfo", ["phi1", "phi2"])  # Cached encoder features (or None).
+NdigoInfo = namedarraytuple("NdigoInfo", ["prev_gru_state"])  # Belief state entering each step, [T,B,H].
+RndInfo = namedarraytuple("RndInfo", ["phi"])  # Cached target network features (or None).
\ No newline at end of file
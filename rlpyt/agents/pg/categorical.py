@@ -29,32 +29,48 @@ class CategoricalPgAgent(BaseAgent):
         super().initialize(env_spaces, share_memory,
             global_B=global_B, env_ranks=env_ranks, **kwargs)
         self.distribution = Categorical(dim=env_spaces.action.n)
+        self._pinned_inputs = None
+
+    def _step_inputs(self, observation, prev_action, prev_reward):
+        """Model inputs for action selection, on the agent's device.  On GPU,
+        the inputs (``prev_action`` as indexes, one-hot encoded on the device)
+        are staged in pinned host buffers kept across steps and copied without
+        blocking; outputs return to the host with blocking copies, so these
+        are done before the buffers are written again."""
+        inputs = (observation, prev_action, prev_reward)
+        if self.device.type == "cpu" or not all(isinstance(x, torch.Tensor) for x in inputs):
+            prev_action = self.distribution.to_onehot(prev_action)
+            return buffer_to((observation, prev_action, prev_reward), device=self.device)
+        if self._pinned_inputs is None or any(p.shape != x.shape or p.dtype != x.dtype
+                for p, x in zip(self._pinned_inputs, inputs)):
+            self._pinned_inputs = buffer_method(inputs, "pin_memory")
+        else:
+            for pinned, x in zip(self._pinned_inputs, inputs):
+                pinned.copy_(x)
+        observation, prev_action, prev_reward = buffer_method(self._pinned_inputs,
+            "to", self.device, non_blocking=True)
+        return observation, self.distribution.to_onehot(prev_action), prev_reward
 
     @torch.no_grad()
     def step(self, observation, prev_action, prev_reward):
-        prev_action = self.distribution.to_onehot(prev_action)
-        model_inputs = buffer_to((observation, prev_action, prev_reward), device=self.device)
-
-         # TODO: need to decide which action to take
+        """Samples actions from the extrinsic policy, or in dual-model mode
+        (except in eval mode) from the intrinsic one; ``model_int`` only runs
+        in dual-model mode."""
+        model_inputs = self._step_inputs(observation, prev_action, prev_reward)
         pi, value = self.model(*model_inputs)
-        int_pi, int_value = self.model_int(*model_inputs)
-
         dist_info = DistInfo(prob=pi)
 
         if self.dual_model:
-            pi_int, pi_int = self.model_int(*model_inputs)
-            dist_int_info = DistInfo(prob=pi_int)
+            int_pi, int_value = self.model_int(*model_inputs)
+            dist_int_info = DistInfo(prob=int_pi)
             if self._mode == "eval":
                 action = self.distribution.sample(dist_info)
             else:
                 action = self.distribution.sample(dist_int_info)
-        else:
-            action = self.distribution.sample(dist_info)
-        
-        if self.dual_model:
             agent_info = AgentInfoTwin(dist_info=dist_info, value=value, 
                                 dist_int_info=dist_int_info, int_value=int_value)
         else:
+            action = self.distribution.sample(dist_info)
             agent_info = AgentInfo(dist_info=dist_info, value=value)
 
         action, agent_info = buffer_to((action, agent_info), device="cpu")
@@ -62,9 +78,7 @@ class CategoricalPgAgent(BaseAgent):
 
     @torch.no_grad()
     def value(self, observation, prev_action, prev_reward, ret_int=False):
-        prev_action = self.distribution.to_onehot(prev_action)
-        model_inputs = buffer_to((observation, prev_action, prev_reward),
-            device=self.device)
+        model_inputs = self._step_inputs(observation, prev_action, prev_reward)
         if ret_int:
             assert self.dual_model
             _pi, value = self.model_int(*model_inputs)
@@ -75,17 +89,21 @@ class CategoricalPgAgent(BaseAgent):
 
 class RecurrentCategoricalPgAgentBase(BaseAgent):
 
-    def __call__(self, observation, prev_action, prev_reward, init_rnn_state):
+    def __call__(self, observation, prev_action, prev_reward, init_rnn_state, phi=None):
         # Assume init_rnn_state already shaped: [N,B,H]
         prev_action = self.distribution.to_onehot(prev_action)
         model_inputs = buffer_to((observation, prev_action, prev_reward, init_rnn_state), device=self.device)
-        pi, value, next_rnn_state = self.model(*model_inputs)
+        if phi is None:
+            pi, value, next_rnn_state = self.model(*model_inputs)
+        else:  # Features of observation from the shared encoder (see encode()).
+            pi, value, next_rnn_state = self.model(*model_inputs, phi=phi)
         dist_info, value = buffer_to((DistInfo(prob=pi), value), device="cpu")
         return dist_info, value, next_rnn_state  # Leave rnn_state on device.
 
     def initialize(self, env_spaces, share_memory=False, global_B=1, obs_stats=None, env_ranks=None):
         super().initialize(env_spaces, share_memory, global_B=global_B, obs_stats=obs_stats, env_ranks=env_ranks)
         self.distribution = Categorical(dim=env_spaces.action.n)
+        self._ndigo_gru_state = None  # NDIGO belief state carried across batches, [1,B,H] (on device).
 
     @torch.no_grad()
     def step(self, observation, prev_action, prev_reward):
@@ -132,6 +150,7 @@ class RecurrentCategoricalPgAgentBase(BaseAgent):
     def curiosity_step(self, curiosity_type, *args):
         curiosity_model = self.model.module.curiosity_model if isinstance(self.model, torch.nn.parallel.DistributedDataParallel) else self.model.curiosity_model
         curiosity_step_minibatches = self.model_kwargs['curiosity_step_kwargs']['curiosity_step_minibatches']
+        cache_features = getattr(curiosity_model, 'cache_features', False)
         T, B = args[0].shape[:2] # either observation or next_observation
         batch_size = B
         mb_size = batch_size // curiosity_step_minibatches
@@ -145,18 +164,19 @@ class RecurrentCategoricalPgAgentBase(BaseAgent):
                 actions=actions
             )
             curiosity_agent_inputs = buffer_to(curiosity_agent_inputs, device=self.device)
-            agent_curiosity_info = IcmInfo()                
+            info_cls = IcmInfo
         elif curiosity_type == 'ndigo':
-            observation, prev_actions, actions = args
+            observation, prev_actions, actions, done = args
             actions = self.distribution.to_onehot(actions)
             prev_actions = self.distribution.to_onehot(prev_actions)
             curiosity_agent_inputs = NdigoAgentCuriosityStepInputs(
                 observations=observation,
                 prev_actions=prev_actions,
-                actions=actions
+                actions=actions,
+                done=done
             )
             curiosity_agent_inputs = buffer_to(curiosity_agent_inputs, device=self.device)
-            agent_curiosity_info = NdigoInfo(prev_gru_state=None)
+            info_cls = NdigoInfo
         elif curiosity_type == 'rnd':
             next_observation, done = args
             curiosity_agent_inputs = RndAgentCuriosityStepInputs(
@@ -164,51 +184,88 @@ class RecurrentCategoricalPgAgentBase(BaseAgent):
                 done=done
             )
             curiosity_agent_inputs = buffer_to(curiosity_agent_inputs, device=self.device)
-            agent_curiosity_info = RndInfo()
+            info_cls = RndInfo
 
         # Need to split the intrinsic reward predictions to several minibatches -- otherwise, we will run out of GPU memory 
         r_ints = []
+        features = []
+        gru_states = []
         for idxs in iterate_mb_idxs(batch_size, mb_size, shuffle=False):
             T_idxs = slice(None)
             B_idxs = idxs                    
-            mb_r_int = curiosity_model.compute_bonus(*curiosity_agent_inputs[slice(None), B_idxs])
+            if curiosity_type == 'ndigo':
+                # Continue each env's belief state from where the last batch left it.
+                gru_state = None if self._ndigo_gru_state is None else self._ndigo_gru_state[:, B_idxs]
+                mb_r_int, mb_prev_gru_state, gru_state = curiosity_model.compute_bonus(*curiosity_agent_inputs[slice(None), B_idxs], gru_state=gru_state)
+                features.append((mb_prev_gru_state,))
+                gru_states.append(gru_state)
+            elif cache_features:
+                mb_r_int, mb_features = curiosity_model.compute_bonus(*curiosity_agent_inputs[slice(None), B_idxs], return_features=True)
+                features.append(mb_features)
+            else:
+                mb_r_int = curiosity_model.compute_bonus(*curiosity_agent_inputs[slice(None), B_idxs])
             r_ints.append(mb_r_int)
         r_int = torch.cat(r_ints, dim=1)
 
-        r_int, agent_curiosity_info = buffer_to((r_int, agent_curiosity_info), device="cpu")
+        if curiosity_type == 'ndigo':
+            self._ndigo_gru_state = torch.cat(gru_states, dim=1)
+
+        if cache_features or curiosity_type == 'ndigo':
+            # Features stay on device, to be reused (and sliced) by the loss in the algorithm.
+            agent_curiosity_info = info_cls(*(torch.cat(f, dim=1) for f in zip(*features)))
+        else:
+            agent_curiosity_info = info_cls(*(None for _ in info_cls._fields))
+
+        r_int = buffer_to(r_int, device="cpu")
 
         return AgentCuriosityStep(r_int=r_int, agent_curiosity_info=agent_curiosity_info)
 
-    def curiosity_loss(self, curiosity_type, *args):
+    @property
+    def shared_encoder(self):
+        """Whether the policy runs on the curiosity model's encoder."""
+        model = self.model.module if isinstance(self.model, torch.nn.parallel.DistributedDataParallel) else self.model
+        return getattr(model, 'shared_encoder', False)
+
+    def encode(self, observation):
+        """Shared encoder features of ``observation`` ([T,B] leading dims),
+        to pass as ``phi`` to both ``__call__()`` and ``curiosity_loss()`` on
+        the same minibatch, so it is encoded once for the two losses."""
+        model = self.model.module if isinstance(self.model, torch.nn.parallel.DistributedDataParallel) else self.model
+        return model.encode(observation.to(self.device))
+
+    def curiosity_loss(self, curiosity_type, *args, phi=None):
         
         curiosity_model = self.model.module.curiosity_model if isinstance(self.model, torch.nn.parallel.DistributedDataParallel) else self.model.curiosity_model
         if curiosity_type in {'icm', 'micm'}:
-            observation, next_observation, actions, valid = args
+            observation, next_observation, actions, valid, features = args
             actions = self.distribution.to_onehot(actions)
             actions = actions.squeeze() # ([batch, 1, size]) -> ([batch, size])
-            curiosity_agent_inputs = buffer_to((observation, next_observation, actions, valid), device=self.device)
-            inv_loss, forward_loss = curiosity_model.compute_loss(*curiosity_agent_inputs)
+            curiosity_agent_inputs = buffer_to((observation, next_observation, actions, valid, features), device=self.device)
+            if phi is None:
+                inv_loss, forward_loss = curiosity_model.compute_loss(*curiosity_agent_inputs)
+            else:  # (ICM only, see encode().)
+                inv_loss, forward_loss = curiosity_model.compute_loss(*curiosity_agent_inputs, phi1=phi)
             # inv_loss, forward_loss = curiosity_model.compute_loss(*args)
             losses = (inv_loss.to("cpu"), forward_loss.to("cpu"))
         elif curiosity_type == 'disagreement':
-            observation, next_observation, actions, valid = args
+            observation, next_observation, actions, valid, features = args
             actions = self.distribution.to_onehot(actions)
             actions = actions.squeeze() # ([batch, 1, size]) -> ([batch, size])
-            curiosity_agent_inputs = buffer_to((observation, next_observation, actions, valid), device=self.device)
+            curiosity_agent_inputs = buffer_to((observation, next_observation, actions, valid, features), device=self.device)
             forward_loss = curiosity_model.compute_loss(*curiosity_agent_inputs)
             losses = (forward_loss.to("cpu"))
         elif curiosity_type == 'ndigo':
-            observations, prev_actions, actions, valid = args
+            observations, prev_actions, actions, done, prev_gru_state, valid = args
             actions = self.distribution.to_onehot(actions)
             prev_actions = self.distribution.to_onehot(prev_actions)
             actions = actions.squeeze() # ([batch, 1, size]) -> ([batch, size])
             prev_actions = prev_actions.squeeze() # ([batch, 1, size]) -> ([batch, size])
-            curiosity_agent_inputs = buffer_to((observations, prev_actions, actions, valid), device=self.device)
+            curiosity_agent_inputs = buffer_to((observations, prev_actions, actions, done, prev_gru_state, valid), device=self.device)
             forward_loss = curiosity_model.compute_loss(*curiosity_agent_inputs)
             losses = (forward_loss.to("cpu"))
         elif curiosity_type == 'rnd':
-            next_observation, valid = args
-            curiosity_agent_inputs = buffer_to((next_observation, valid), device=self.device)
+            next_observation, valid, features = args
+            curiosity_agent_inputs = buffer_to((next_observation, valid, features), device=self.device)
             forward_loss = curiosity_model.compute_loss(*curiosity_agent_inputs)
             losses = (forward_loss.to("cpu"))
 
@@ -6,7 +6,7 @@ from torch.nn.parallel import DistributedDataParallel as DDP
 from torch.nn.parallel import DistributedDataParallelCPU as DDPC
 
 from rlpyt.agents.base import BaseAgent, AgentStep
-from rlpyt.models.qpg.mlp import QofMuMlpModel, PiMlpModel
+from rlpyt.models.qpg.mlp import QofMuMlpModel, QofMuEnsembleMlpModel, PiMlpModel
 from rlpyt.utils.quick_args import save__init__args
 from rlpyt.distributions.gaussian import Gaussian, DistInfoStd
 from rlpyt.utils.buffer import buffer_to
@@ -23,20 +23,28 @@ Models = namedtuple("Models", ["pi", "q1", "q2", "v"])
 
 
 class SacAgent(BaseAgent):
-    """Agent for SAC algorithm, including action-squashing, using twin Q-values."""
+    """Agent for SAC algorithm, including action-squashing, using twin Q-values.
+
+    With ``fused_q_models=True``, the twin Q-models are one ensemble model
+    (``QofMuEnsembleMlpModel`` by default), evaluated in one batched pass, and
+    likewise the twin target Q-models, which are then updated together.
+    """
 
     def __init__(
             self,
             ModelCls=PiMlpModel,  # Pi model.
-            QModelCls=QofMuMlpModel,
+            QModelCls=None,  # Leave None to select by fused_q_models.
             model_kwargs=None,  # Pi model.
             q_model_kwargs=None,
             v_model_kwargs=None,
             initial_model_state_dict=None,  # All models.
             action_squash=1.,  # Max magnitude (or None).
             pretrain_std=0.75,  # With squash 0.75 is near uniform.
+            fused_q_models=False,
             ):
         """Saves input arguments; network defaults stored within."""
+        if QModelCls is None:
+            QModelCls = QofMuEnsembleMlpModel if fused_q_models else QofMuMlpModel
         if model_kwargs is None:
             model_kwargs = dict(hidden_sizes=[256, 256])
         if q_model_kwargs is None:
@@ -55,14 +63,21 @@ class SacAgent(BaseAgent):
         super().initialize(env_spaces, share_memory,
             global_B=global_B, env_ranks=env_ranks)
         self.initial_model_state_dict = _initial_model_state_dict
-        self.q1_model = self.QModelCls(**self.env_model_kwargs, **self.q_model_kwargs)
-        self.q2_model = self.QModelCls(**self.env_model_kwargs, **self.q_model_kwargs)
-        self.target_q1_model = self.QModelCls(**self.env_model_kwargs,
-            **self.q_model_kwargs)
-        self.target_q2_model = self.QModelCls(**self.env_model_kwargs,
-            **self.q_model_kwargs)
-        self.target_q1_model.load_state_dict(self.q1_model.state_dict())
-        self.target_q2_model.load_state_dict(self.q2_model.state_dict())
+        if self.fused_q_models:
+            self.q_models = self.QModelCls(**self.env_model_kwargs,
+                **self.q_model_kwargs, ensemble_size=2)
+            self.target_q_models = self.QModelCls(**self.env_model_kwargs,
+                **self.q_model_kwargs, ensemble_size=2)
+            self.target_q_models.load_state_dict(self.q_models.state_dict())
+        else:
+            self.q1_model = self.QModelCls(**self.env_model_kwargs, **self.q_model_kwargs)
+            self.q2_model = self.QModelCls(**self.env_model_kwargs, **self.q_model_kwargs)
+            self.target_q1_model = self.QModelCls(**self.env_model_kwargs,
+                **self.q_model_kwargs)
+            self.target_q2_model = self.QModelCls(**self.env_model_kwargs,
+                **self.q_model_kwargs)
+            self.target_q1_model.load_state_dict(self.q1_model.state_dict())
+            self.target_q2_model.load_state_dict(self.q2_model.state_dict())
         if self.initial_model_state_dict is not None:
             self.load_state_dict(self.initial_model_state_dict)
         assert len(env_spaces.action.shape) == 1
@@ -75,16 +90,17 @@ class SacAgent(BaseAgent):
 
     def to_device(self, cuda_idx=None):
         super().to_device(cuda_idx)
-        self.q1_model.to(self.device)
-        self.q2_model.to(self.device)
-        self.target_q1_model.to(self.device)
-        self.target_q2_model.to(self.device)
+        for q_model in self.q_model_list(targets=True):
+            q_model.to(self.device)
 
     def data_parallel(self):
         super().data_parallel
         DDP_WRAP = DDPC if self.device.type == "cpu" else DDP
-        self.q1_model = DDP_WRAP(self.q1_model)
-        self.q2_model = DDP_WRAP(self.q2_model)
+        if self.fused_q_models:
+            self.q_models = DDP_WRAP(self.q_models)
+        else:
+            self.q1_model = DDP_WRAP(self.q1_model)
+            self.q2_model = DDP_WRAP(self.q2_model)
 
     def give_min_itr_learn(self, min_itr_learn):
         self.min_itr_learn = min_itr_learn  # From algo.
@@ -101,6 +117,8 @@ class SacAgent(BaseAgent):
         (with grad)."""
         model_inputs = buffer_to((observation, prev_action, prev_reward,
             action), device=self.device)
+        if self.fused_q_models:
+            return self.q_models(*model_inputs).cpu().unbind(-1)
         q1 = self.q1_model(*model_inputs)
         q2 = self.q2_model(*model_inputs)
         return q1.cpu(), q2.cpu()
@@ -110,6 +128,8 @@ class SacAgent(BaseAgent):
         action.""" 
         model_inputs = buffer_to((observation, prev_action,
         prev_reward, action), device=self.device)
+        if self.fused_q_models:
+            return self.target_q_models(*model_inputs).cpu().unbind(-1)
         target_q1 =self.target_q1_model(*model_inputs)
         target_q2 = self.target_q2_model(*model_inputs)
         return target_q1.cpu(), target_q2.cpu()
@@ -141,16 +161,34 @@ class SacAgent(BaseAgent):
         return AgentStep(action=action, agent_info=agent_info)
 
     def update_target(self, tau=1):
+        if self.fused_q_models:
+            update_state_dict(self.target_q_models, self.q_models.state_dict(), tau)
+            return
         update_state_dict(self.target_q1_model, self.q1_model.state_dict(), tau)
         update_state_dict(self.target_q2_model, self.q2_model.state_dict(), tau)
 
     @property
     def models(self):
+        if self.fused_q_models:
+            return Models(pi=self.model, q1=self.q_models, q2=self.q_models)
         return Models(pi=self.model, q1=self.q1_model, q2=self.q2_model)
 
+    def q_model_list(self, targets=False):
+        """The Q-model modules (fused or not), and optionally the targets."""
+        if self.fused_q_models:
+            q_models = [self.q_models]
+            return q_models + [self.target_q_models] if targets else q_models
+        q_models = [self.q1_model, self.q2_model]
+        return q_models + [self.target_q1_model, self.target_q2_model] if targets else q_models
+
     def pi_parameters(self):
         return self.model.parameters()
 
+    def q_parameters(self):
+        """Parameters of both Q-models (e.g. for one optimizer when fused)."""
+        for q_model in self.q_model_list():
+            yield from q_model.parameters()
+
     def q1_parameters(self):
         return self.q1_model.parameters()
 
@@ -159,13 +197,13 @@ class SacAgent(BaseAgent):
 
     def train_mode(self, itr):
         super().train_mode(itr)
-        self.q1_model.train()
-        self.q2_model.train()
+        for q_model in self.q_model_list():
+            q_model.train()
 
     def sample_mode(self, itr):
         super().sample_mode(itr)
-        self.q1_model.eval()
-        self.q2_model.eval()
+        for q_model in self.q_model_list():
+            q_model.eval()
         if itr == 0:
             logger.log(f"Agent at itr {itr}, sample std: {self.pretrain_std}")
         if itr == self.min_itr_learn:
@@ -175,11 +213,17 @@ class SacAgent(BaseAgent):
 
     def eval_mode(self, itr):
         super().eval_mode(itr)
-        self.q1_model.eval()
-        self.q2_model.eval()
+        for q_model in self.q_model_list():
+            q_model.eval()
         self.distribution.set_std(0.)  # Deterministic (dist_info std ignored).
 
     def state_dict(self):
+        if self.fused_q_models:
+            return dict(
+                model=self.model.state_dict(),  # Pi model.
+                q_models=self.q_models.state_dict(),
+                target_q_models=self.target_q_models.state_dict(),
+            )
         return dict(
             model=self.model.state_dict(),  # Pi model.
             q1_model=self.q1_model.state_dict(),
@@ -190,6 +234,10 @@ class SacAgent(BaseAgent):
 
     def load_state_dict(self, state_dict):
         self.model.load_state_dict(state_dict["model"])
+        if self.fused_q_models:
+            self.q_models.load_state_dict(state_dict["q_models"])
+            self.target_q_models.load_state_dict(state_dict["target_q_models"])
+            return
         self.q1_model.load_state_dict(state_dict["q1_model"])
         self.q2_model.load_state_dict(state_dict["q2_model"])
         self.target_q1_model.load_state_dict(state_dict["target_q1_model"])
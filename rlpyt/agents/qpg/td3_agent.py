@@ -6,12 +6,19 @@ from rlpyt.agents.qpg.ddpg_agent import DdpgAgent
 from rlpyt.utils.buffer import buffer_to
 from rlpyt.distributions.gaussian import Gaussian, DistInfo
 from rlpyt.models.utils import update_state_dict
+from rlpyt.models.qpg.mlp import QofMuEnsembleMlpModel
 from rlpyt.utils.quick_args import save__init__args
 from rlpyt.utils.logging import logger
 
 
 class Td3Agent(DdpgAgent):
-    """Agent for TD3 algorithm, using two Q-models and two target Q-models."""
+    """Agent for TD3 algorithm, using two Q-models and two target Q-models.
+
+    With ``fused_q_models=True``, ``q_model`` is a twin ensemble model
+    (``QofMuEnsembleMlpModel`` by default) evaluating both Q-models in one
+    batched pass, and likewise ``target_q_model``; there is no ``q2_model``.
+    The policy is trained through the first member only, as usual.
+    """
 
     def __init__(
             self,
@@ -19,23 +26,29 @@ class Td3Agent(DdpgAgent):
             target_noise_std=0.2,
             target_noise_clip=0.5,
             initial_q2_model_state_dict=None,
+            fused_q_models=False,
             **kwargs
             ):
         """Saves input arguments."""
+        if fused_q_models:
+            kwargs.setdefault("QModelCls", QofMuEnsembleMlpModel)
         super().__init__(**kwargs)
         save__init__args(locals())
+        if fused_q_models:
+            self.q_model_kwargs = dict(self.q_model_kwargs, ensemble_size=2)
         self.min_itr_learn = 0  # Get from algo.
 
     def initialize(self, env_spaces, share_memory=False,
             global_B=1, env_ranks=None):
         super().initialize(env_spaces, share_memory, global_B, env_ranks)
-        self.q2_model = self.QModelCls(**self.env_model_kwargs,
-            **self.q_model_kwargs)
-        if self.initial_q2_model_state_dict is not None:
-            self.q2_model.load_state_dict(self.initial_q2_model_state_dict)
-        self.target_q2_model = self.QModelCls(**self.env_model_kwargs,
-            **self.q_model_kwargs)
-        self.target_q2_model.load_state_dict(self.q2_model.state_dict())
+        if not self.fused_q_models:
+            self.q2_model = self.QModelCls(**self.env_model_kwargs,
+                **self.q_model_kwargs)
+            if self.initial_q2_model_state_dict is not None:
+                self.q2_model.load_state_dict(self.initial_q2_model_state_dict)
+            self.target_q2_model = self.QModelCls(**self.env_model_kwargs,
+                **self.q_model_kwargs)
+            self.target_q2_model.load_state_dict(self.q2_model.state_dict())
         self.target_distribution = Gaussian(
             dim=env_spaces.action.shape[0],
             std=self.target_noise_std,
@@ -45,11 +58,14 @@ class Td3Agent(DdpgAgent):
 
     def to_device(self, cuda_idx=None):
         super().to_device(cuda_idx)
-        self.q2_model.to(self.device)
-        self.target_q2_model.to(self.device)
+        if not self.fused_q_models:
+            self.q2_model.to(self.device)
+            self.target_q2_model.to(self.device)
 
     def data_parallel(self):
         super().data_parallel()
+        if self.fused_q_models:
+            return  # Both in q_model.
         if self.device.type == "cpu":
             self.q2_model = DDPC(self.q2_model)
         else:
@@ -63,10 +79,23 @@ class Td3Agent(DdpgAgent):
         (with grad)."""
         model_inputs = buffer_to((observation, prev_action, prev_reward,
             action), device=self.device)
+        if self.fused_q_models:
+            return self.q_model(*model_inputs).cpu().unbind(-1)
         q1 = self.q_model(*model_inputs)
         q2 = self.q2_model(*model_inputs)
         return q1.cpu(), q2.cpu()
 
+    def q_at_mu(self, observation, prev_action, prev_reward):
+        """Compute Q-value of the first Q-model for input state/observation,
+        through the mu_model (with grad)."""
+        if not self.fused_q_models:
+            return super().q_at_mu(observation, prev_action, prev_reward)
+        model_inputs = buffer_to((observation, prev_action, prev_reward),
+            device=self.device)
+        mu = self.model(*model_inputs)
+        q = self.q_model(*model_inputs, mu, member=0)
+        return q.cpu()
+
     def target_q_at_mu(self, observation, prev_action, prev_reward):
         """Compute twin target Q-values for state/observation, through
         target mu model."""
@@ -74,17 +103,21 @@ class Td3Agent(DdpgAgent):
             device=self.device)
         target_mu = self.target_model(*model_inputs)
         target_action = self.target_distribution.sample(DistInfo(mean=target_mu))
+        if self.fused_q_models:
+            return self.target_q_model(*model_inputs, target_action).cpu().unbind(-1)
         target_q1_at_mu = self.target_q_model(*model_inputs, target_action)
         target_q2_at_mu = self.target_q2_model(*model_inputs, target_action)
         return target_q1_at_mu.cpu(), target_q2_at_mu.cpu()
 
     def update_target(self, tau=1):
         super().update_target(tau)
-        update_state_dict(self.target_q2_model, self.q2_model.state_dict(), tau)
+        if not self.fused_q_models:
+            update_state_dict(self.target_q2_model, self.q2_model.state_dict(), tau)
 
     def q_parameters(self):
         yield from self.q_model.parameters()
-        yield from self.q2_model.parameters()
+        if not self.fused_q_models:
+            yield from self.q2_model.parameters()
 
     def set_target_noise(self, std, noise_clip=None):
         self.target_distribution.set_std(std)
@@ -92,11 +125,13 @@ class Td3Agent(DdpgAgent):
 
     def train_mode(self, itr):
         super().train_mode(itr)
-        self.q2_model.train()
+        if not self.fused_q_models:
+            self.q2_model.train()
 
     def sample_mode(self, itr):
         super().sample_mode(itr)
-        self.q2_model.eval()
+        if not self.fused_q_models:
+            self.q2_model.eval()
         std = self.action_std if itr >= self.min_itr_learn else self.pretrain_std
         if itr == 0 or itr == self.min_itr_learn:
             logger.log(f"Agent at itr {itr}, sample std: {std}.")
@@ -104,15 +139,20 @@ class Td3Agent(DdpgAgent):
 
     def eval_mode(self, itr):
         super().eval_mode(itr)
-        self.q2_model.eval()
+        if not self.fused_q_models:
+            self.q2_model.eval()
 
     def state_dict(self):
         state_dict = super().state_dict()
+        if self.fused_q_models:
+            return state_dict
         state_dict["q2_model"] = self.q2_model.state_dict()
         state_dict["target_q2_model"] = self.target_q2_model.state_dict()
         return state_dict
 
     def load_state_dict(self, state_dict):
         super().load_state_dict(state_dict)
+        if self.fused_q_models:
+            return
         self.q2_model.load_state_dict(state_dict["q2_model"])
         self.target_q2_model.load_state_dict(state_dict["target_q2_model"])
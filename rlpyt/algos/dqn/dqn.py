@@ -8,6 +8,7 @@ from rlpyt.utils.logging import logger
 from rlpyt.replays.non_sequence.frame import (UniformReplayFrameBuffer,
     PrioritizedReplayFrameBuffer, AsyncUniformReplayFrameBuffer,
     AsyncPrioritizedReplayFrameBuffer)
+from rlpyt.replays.sharded import ShardedAsyncReplayBuffer
 from rlpyt.utils.collections import namedarraytuple
 from rlpyt.utils.tensor import select_at_indexes, valid_mean
 from rlpyt.algos.utils import valid_from_done
@@ -55,6 +56,8 @@ class DQN(RlAlgorithm):
             default_priority=None,
             ReplayBufferCls=None,  # Leave None to select by above options.
             updates_per_sync=1,  # For async mode only.
+            replay_shards=1,  # For async mode only.
+            replay_memmap_dir=None,  # Leave None to keep replay in memory.
             ):
         """Saves input arguments.  
 
@@ -64,6 +67,13 @@ class DQN(RlAlgorithm):
         to data-generation.  For example, original DQN sampled 4 environment steps between
         each training update with batch-size 32, for a replay ratio of 8.
 
+        ``replay_shards>1`` splits the asynchronous replay buffer along the
+        sampler's environments (see ``ShardedAsyncReplayBuffer``), so that
+        writes and reads lock only one shard at a time.
+
+        ``replay_memmap_dir`` stores the replay buffer in memory-mapped files
+        in that directory, paged by the OS, instead of in RAM.
+
         """ 
         if optim_kwargs is None:
             optim_kwargs = dict(eps=0.01 / batch_size)
@@ -142,6 +152,8 @@ class DQN(RlAlgorithm):
             discount=self.discount,
             n_step_return=self.n_step_return,
         )
+        if self.replay_memmap_dir is not None:
+            replay_kwargs["memmap_dir"] = self.replay_memmap_dir
         if self.prioritized_replay:
             replay_kwargs.update(dict(
                 alpha=self.pri_alpha,
@@ -158,6 +170,9 @@ class DQN(RlAlgorithm):
             logger.log(f"WARNING: ignoring internal selection logic and using"
                 f" input replay buffer class: {ReplayCls} -- compatibility not"
                 " guaranteed.")
+        if async_ and self.replay_shards > 1:
+            replay_kwargs.update(dict(ShardCls=ReplayCls, n_shards=self.replay_shards))
+            ReplayCls = ShardedAsyncReplayBuffer
         self.replay_buffer = ReplayCls(**replay_kwargs)
 
     def optimize_agent(self, itr, samples=None, sampler_itr=None):
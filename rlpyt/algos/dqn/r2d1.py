@@ -10,11 +10,13 @@ from rlpyt.utils.collections import namedarraytuple
 from rlpyt.replays.sequence.frame import (UniformSequenceReplayFrameBuffer,
     PrioritizedSequenceReplayFrameBuffer, AsyncUniformSequenceReplayFrameBuffer,
     AsyncPrioritizedSequenceReplayFrameBuffer)
+from rlpyt.replays.sharded import ShardedAsyncReplayBuffer
 from rlpyt.utils.tensor import select_at_indexes, valid_mean
 from rlpyt.algos.utils import valid_from_done, discount_return_n_step
 from rlpyt.utils.buffer import buffer_to, buffer_method, torchify_buffer
 
-OptInfo = namedtuple("OptInfo", ["loss", "gradNorm", "tdAbsErr", "priority"])
+OptInfo = namedtuple("OptInfo", ["loss", "gradNorm", "tdAbsErr", "priority",
+    "replayGB", "rnnStateError"])
 SamplesToBufferRnn = namedarraytuple("SamplesToBufferRnn",
     SamplesToBuffer._fields + ("prev_rnn_state",))
 PrioritiesSamplesToBuffer = namedarraytuple("PrioritiesSamplesToBuffer",
@@ -34,6 +36,7 @@ class R2D1(DQN):
             batch_B=64,
             warmup_T=40,
             store_rnn_state_interval=40,  # 0 for none, 1 for all.
+            store_rnn_state_dtype=None,  # "float16" or "bfloat16" to compress.
             min_steps_learn=int(1e5),
             delta_clip=None,  # Typically use squared-error loss (Steven).
             replay_size=int(1e6),
@@ -63,11 +66,14 @@ class R2D1(DQN):
             value_scale_eps=1e-3,  # 1e-3 (Steven).
             ReplayBufferCls=None,  # leave None to select by above options
             updates_per_sync=1,  # For async mode only.
+            replay_shards=1,  # For async mode only.
+            replay_memmap_dir=None,  # Leave None to keep replay in memory.
             ):
         """Saves input arguments.
 
         Args:
             store_rnn_state_interval (int): store RNN state only once this many steps, to reduce memory usage; replay sequences will only begin at the steps with stored recurrent state.
+            store_rnn_state_dtype (str): store RNN state as "float16" or "bfloat16" (half the memory), leave None for float32; the ``warmup_T`` burn-in recovers from the rounding (largest error logged as ``rnnStateError``).
         
         Note:
             Typically ran with ``store_rnn_state_interval`` equal to the sampler's ``batch_T``, 40.  Then every 40 steps
@@ -106,6 +112,10 @@ class R2D1(DQN):
             # batch_T fixed for prioritized, (relax if rnn_state_interval=1 or 0).
             batch_T=self.batch_T + self.warmup_T,
         )
+        if self.store_rnn_state_dtype is not None:
+            replay_kwargs["rnn_state_dtype"] = self.store_rnn_state_dtype
+        if self.replay_memmap_dir is not None:
+            replay_kwargs["memmap_dir"] = self.replay_memmap_dir
         if self.prioritized_replay:
             replay_kwargs.update(dict(
                 alpha=self.pri_alpha,
@@ -124,7 +134,16 @@ class R2D1(DQN):
             logger.log(f"WARNING: ignoring internal selection logic and using"
                 f" input replay buffer class: {ReplayCls} -- compatibility not"
                 " guaranteed.")
+        if async_ and self.replay_shards > 1:
+            replay_kwargs.update(dict(ShardCls=ReplayCls, n_shards=self.replay_shards))
+            ReplayCls = ShardedAsyncReplayBuffer
         self.replay_buffer = ReplayCls(**replay_kwargs)
+        self._replay_GB = None
+        if hasattr(self.replay_buffer, "memory_usage"):
+            usage = self.replay_buffer.memory_usage()
+            self._replay_GB = sum(usage.values()) / 1e9  # Fixed at allocation.
+            logger.log(f"Replay buffer using {self._replay_GB:.3g} GB: "
+                + ", ".join(f"{k} {v / 1e9:.3g}" for k, v in usage.items()))
         return self.replay_buffer
 
     def optimize_agent(self, itr, samples=None, sampler_itr=None):
@@ -145,6 +164,11 @@ class R2D1(DQN):
             samples_to_buffer = self.samples_to_buffer(samples)
             self.replay_buffer.append_samples(samples_to_buffer)
         opt_info = OptInfo(*([] for _ in range(len(OptInfo._fields))))
+        if self._replay_GB is not None:
+            opt_info.replayGB.append(self._replay_GB)
+        if self.store_rnn_state_dtype is not None:
+            # Shared memory, also written by async memory copiers.
+            opt_info.rnnStateError.append(self.replay_buffer.rnn_state_error)
         if itr < self.min_itr_learn:
             return opt_info
         for _ in range(self.updates_per_optimize):
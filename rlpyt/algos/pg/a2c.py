@@ -88,6 +88,11 @@ class A2C(PolicyGradientAlgo):
 
         dist = self.agent.distribution
         logli = dist.log_likelihood(samples.agent.action, dist_info)
+        if self.stale_samples:  # Truncated importance weights for the sampling policy (one update behind).
+            old_dist_info = samples.agent.agent_info.dist_info
+            ratio = dist.likelihood_ratio(samples.agent.action,
+                old_dist_info=old_dist_info, new_dist_info=dist_info)
+            logli = logli * torch.clamp(ratio, max=1.).detach()
         pi_loss = - valid_mean(logli * advantage, valid)
 
         value_error = 0.5 * (value - return_) ** 2
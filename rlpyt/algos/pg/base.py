@@ -5,7 +5,10 @@ import torch
 from collections import namedtuple
 
 from rlpyt.algos.base import RlAlgorithm
-from rlpyt.algos.utils import discount_return, generalized_advantage_estimation, valid_from_done
+from rlpyt.agents.base import AgentInputs
+from rlpyt.utils.buffer import buffer_to, buffer_method
+from rlpyt.algos.utils import (discount_return, generalized_advantage_estimation, valid_from_done,
+    terminal_next_observation)
 
 # Convention: traj_info fields CamelCase, opt_info fields lowerCamelCase
 OptInfo = namedtuple("OptInfo", ["return_",
@@ -49,6 +52,7 @@ class PolicyGradientAlgo(RlAlgorithm):
     """
 
     bootstrap_value = True  # Tells the sampler it needs Value(State')
+    stale_samples = False  # Samples were collected by the policy from before the previous update (pipelined runner).
     opt_info_fields = tuple(f for f in OptInfo._fields)  # copy
 
     def initialize(self, agent, n_itr, batch_spec, mid_batch_reset=False,
@@ -66,6 +70,36 @@ class PolicyGradientAlgo(RlAlgorithm):
         self.batch_spec = batch_spec
         self.mid_batch_reset = mid_batch_reset
 
+    @torch.no_grad()
+    def measure_policy_lag(self, samples):
+        """
+        Returns the mean KL divergence from the policy which collected
+        ``samples`` to the agent's current policy, i.e. how far the policy has
+        moved since sampling.  Masks invalid samples as ``process_returns()``.
+        """
+        agent_inputs = AgentInputs(
+            observation=samples.env.observation,
+            prev_action=samples.agent.prev_action,
+            prev_reward=samples.env.prev_reward,
+        )
+        agent_inputs = buffer_to(agent_inputs, device=self.agent.device)
+        if self.agent.recurrent:
+            init_rnn_state = samples.agent.agent_info.prev_rnn_state[0]  # T = 0.
+            # [B,N,H] --> [N,B,H] (for cudnn).
+            init_rnn_state = buffer_method(init_rnn_state, "transpose", 0, 1)
+            init_rnn_state = buffer_method(init_rnn_state, "contiguous")
+            init_rnn_state = buffer_to(init_rnn_state, device=self.agent.device)
+            dist_info, _value, _rnn_state = self.agent(*agent_inputs, init_rnn_state)
+        else:
+            dist_info, _value = self.agent(*agent_inputs)
+        dist_info = buffer_to(dist_info, device="cpu")
+        if not self.mid_batch_reset or self.agent.recurrent:
+            valid = valid_from_done(samples.env.done.type(samples.env.reward.dtype))
+        else:
+            valid = None
+        return self.agent.distribution.mean_kl(samples.agent.agent_info.dist_info,
+            dist_info, valid).item()
+
     def process_returns(self, samples):
         """
         Compute bootstrapped returns and advantages from a minibatch of
@@ -82,8 +116,14 @@ class PolicyGradientAlgo(RlAlgorithm):
             reward, done, value, bv = (samples.env.reward, samples.env.done, samples.agent.agent_info.value, samples.agent.bootstrap_value)        
         done = done.type(reward.dtype)
 
+        if self.curiosity_type in {'icm', 'disagreement', 'micm', 'rnd'}:
+            # Kept for the curiosity loss; terminal_valid masks steps without a next observation.
+            self.next_observation, self.terminal_valid = terminal_next_observation(samples.env)
+
         if self.curiosity_type in {'icm', 'disagreement', 'micm'}:
-            intrinsic_rewards, _ = self.agent.curiosity_step(self.curiosity_type, samples.env.observation.clone(), samples.env.next_observation.clone(), samples.agent.action.clone())
+            intrinsic_rewards, self.curiosity_info = self.agent.curiosity_step(self.curiosity_type, samples.env.observation, self.next_observation, samples.agent.action.clone())
+            if self.terminal_valid is not None:
+                intrinsic_rewards = intrinsic_rewards * self.terminal_valid
             intrinsic_rewards_logging = intrinsic_rewards.clone().data.numpy()
             self.intrinsic_rewards = intrinsic_rewards_logging
             self.extint_ratio = reward.clone().data.numpy()/(intrinsic_rewards_logging+1e-15)
@@ -92,7 +132,7 @@ class PolicyGradientAlgo(RlAlgorithm):
             else:
                 reward += intrinsic_rewards
         elif self.curiosity_type == 'ndigo':
-            intrinsic_rewards, _ = self.agent.curiosity_step(self.curiosity_type, samples.env.observation.clone(), samples.agent.prev_action.clone(), samples.agent.action.clone()) # no grad
+            intrinsic_rewards, self.curiosity_info = self.agent.curiosity_step(self.curiosity_type, samples.env.observation, samples.agent.prev_action.clone(), samples.agent.action.clone(), samples.env.done.clone()) # no grad
             intrinsic_rewards_logging = intrinsic_rewards.clone().data.numpy()
             self.intrinsic_rewards = intrinsic_rewards_logging
             self.extint_ratio = reward.clone().data.numpy()/(intrinsic_rewards_logging+1e-15)
@@ -101,7 +141,9 @@ class PolicyGradientAlgo(RlAlgorithm):
             else:
                 reward += intrinsic_rewards
         elif self.curiosity_type == 'rnd':
-            intrinsic_rewards, _ = self.agent.curiosity_step(self.curiosity_type, samples.env.next_observation.clone(), done.clone())
+            intrinsic_rewards, self.curiosity_info = self.agent.curiosity_step(self.curiosity_type, self.next_observation, done.clone())
+            if self.terminal_valid is not None:
+                intrinsic_rewards = intrinsic_rewards * self.terminal_valid
             intrinsic_rewards_logging = intrinsic_rewards.clone().data.numpy()
             self.intrinsic_rewards = intrinsic_rewards_logging
             self.extint_ratio = reward.clone().data.numpy()/(intrinsic_rewards_logging+1e-15)
@@ -111,17 +153,13 @@ class PolicyGradientAlgo(RlAlgorithm):
                 reward += intrinsic_rewards
 
         if self.normalize_reward:
-            rews = np.array([])
-            for rew in reward.clone().detach().data.numpy():
-                rews = np.concatenate((rews, self.reward_ff.update(rew)))
-            self.reward_rms.update_from_moments(np.mean(rews), np.var(rews), len(rews))
+            rews = self.reward_ff.update_block(reward.detach())
+            self.reward_rms.update_from_moments(rews.mean().item(), rews.var(unbiased=False).item(), rews.numel())
             reward = reward / np.sqrt(self.reward_rms.var)
 
             if self.agent.dual_model:
-                int_rews = np.array([])
-                for int_rew in int_reward.clone().detach().data.numpy():
-                    int_rews = np.concatenate((int_rews, self.int_reward_ff.update(int_rew)))
-                self.int_reward_rms.update_from_moments(np.mean(int_rews), np.var(int_rews), len(int_rews))
+                int_rews = self.int_reward_ff.update_block(int_reward.detach())
+                self.int_reward_rms.update_from_moments(int_rews.mean().item(), int_rews.var(unbiased=False).item(), int_rews.numel())
                 int_reward = int_reward / np.sqrt(self.int_reward_rms.var)
 
         if self.gae_lambda == 1:  # GAE reduces to empirical discounted.
@@ -64,6 +64,9 @@ class PPO(PolicyGradientAlgo):
                 self.int_reward_rms = RunningMeanStd()
         self.intrinsic_rewards = None
         self.extint_ratio = None        
+        self.curiosity_info = None # features cached by the curiosity model during the bonus pass (if enabled)
+        self.next_observation = None # next observations with terminal ones restored (mid-batch reset)
+        self.terminal_valid = None # masks resets whose terminal observation was not kept
         
     def initialize(self, *args, **kwargs):
         """
@@ -101,26 +104,39 @@ class PPO(PolicyGradientAlgo):
         else:
             return_, advantage, valid = self.process_returns(samples)
 
+        # If the bonus pass cached its features, the loss reuses them instead of the observations.
+        # (Iterate the info: indexing a namedarraytuple indexes into its fields.)
+        cached = self.curiosity_type in {'icm', 'micm', 'disagreement', 'rnd'} and \
+            all(f is not None for f in self.curiosity_info)
+        features = self.curiosity_info if cached else None
+        curiosity_valid = valid
+        if self.curiosity_type in {'icm', 'micm', 'disagreement', 'rnd'} and self.terminal_valid is not None:
+            curiosity_valid = self.terminal_valid if valid is None else valid * self.terminal_valid
+
         if self.curiosity_type in {'icm', 'micm', 'disagreement'}:
             agent_curiosity_inputs = IcmAgentCuriosityInputs(
-                observation=samples.env.observation.clone(),
-                next_observation=samples.env.next_observation.clone(),
+                observation=None if cached else samples.env.observation,
+                next_observation=None if cached else self.next_observation,
                 action=samples.agent.action.clone(),
-                valid=valid
+                valid=curiosity_valid,
+                features=features
             )
             agent_curiosity_inputs = buffer_to(agent_curiosity_inputs, device=self.agent.device)
         elif self.curiosity_type == 'ndigo':
             agent_curiosity_inputs = NdigoAgentCuriosityInputs(
-                observation=samples.env.observation.clone(),
+                observation=samples.env.observation,
                 prev_actions=samples.agent.prev_action.clone(),
                 actions=samples.agent.action.clone(),
+                done=samples.env.done.clone(),
+                prev_gru_state=self.curiosity_info.prev_gru_state,
                 valid=valid
             )
             agent_curiosity_inputs = buffer_to(agent_curiosity_inputs, device=self.agent.device)
         elif self.curiosity_type == 'rnd':
             agent_curiosity_inputs = RndAgentCuriosityInputs(
-                next_observation=samples.env.next_observation.clone(),
-                valid=valid
+                next_observation=self.next_observation,
+                valid=curiosity_valid,
+                features=features
             )
             agent_curiosity_inputs = buffer_to(agent_curiosity_inputs, device=self.agent.device)
         elif self.curiosity_type == 'none':
@@ -273,11 +289,14 @@ class PPO(PolicyGradientAlgo):
         the ``agent.distribution`` to compute likelihoods and entropies.  Valid
         for feedforward or recurrent agents.
         """
+        # A policy sharing the curiosity encoder takes the features of this
+        # minibatch the curiosity loss takes.
+        phi = self.agent.encode(agent_inputs.observation) if getattr(self.agent, "shared_encoder", False) else None
         if init_rnn_state is not None:
             # [B,N,H] --> [N,B,H] (for cudnn).
             init_rnn_state = buffer_method(init_rnn_state, "transpose", 0, 1)
             init_rnn_state = buffer_method(init_rnn_state, "contiguous")
-            dist_info, value, _rnn_state = self.agent(*agent_inputs, init_rnn_state)
+            dist_info, value, _rnn_state = self.agent(*agent_inputs, init_rnn_state, phi=phi)
             if self.agent.dual_model and self.policy_loss_type == 'dual':
                 init_int_rnn_state = buffer_method(init_int_rnn_state, "transpose", 0, 1)
                 init_int_rnn_state = buffer_method(init_int_rnn_state, "contiguous")
@@ -343,7 +362,7 @@ class PPO(PolicyGradientAlgo):
             loss = pi_loss + value_loss + entropy_loss
 
         if self.curiosity_type in {'icm', 'micm'}: 
-            inv_loss, forward_loss = self.agent.curiosity_loss(self.curiosity_type, *agent_curiosity_inputs)           
+            inv_loss, forward_loss = self.agent.curiosity_loss(self.curiosity_type, *agent_curiosity_inputs, phi=phi)
             loss += inv_loss
             loss += forward_loss
             curiosity_losses = (inv_loss, forward_loss)
@@ -16,6 +16,7 @@ from rlpyt.distributions.gaussian import Gaussian
 from rlpyt.distributions.gaussian import DistInfo as GaussianDistInfo
 from rlpyt.utils.tensor import valid_mean
 from rlpyt.algos.utils import valid_from_done
+from rlpyt.models.utils import clip_grad_norm_ensemble_
 
 
 OptInfo = namedtuple("OptInfo",
@@ -105,10 +106,15 @@ class SAC(RlAlgorithm):
         self.rank = rank
         self.pi_optimizer = self.OptimCls(self.agent.pi_parameters(),
             lr=self.learning_rate, **self.optim_kwargs)
-        self.q1_optimizer = self.OptimCls(self.agent.q1_parameters(),
-            lr=self.learning_rate, **self.optim_kwargs)
-        self.q2_optimizer = self.OptimCls(self.agent.q2_parameters(),
-            lr=self.learning_rate, **self.optim_kwargs)
+        self.fused_q_models = getattr(self.agent, "fused_q_models", False)
+        if self.fused_q_models:  # (Elementwise optimizers unaffected by fusing.)
+            self.q_optimizer = self.OptimCls(self.agent.q_parameters(),
+                lr=self.learning_rate, **self.optim_kwargs)
+        else:
+            self.q1_optimizer = self.OptimCls(self.agent.q1_parameters(),
+                lr=self.learning_rate, **self.optim_kwargs)
+            self.q2_optimizer = self.OptimCls(self.agent.q2_parameters(),
+                lr=self.learning_rate, **self.optim_kwargs)
         self._log_alpha = torch.zeros(1, requires_grad=True)
         self._alpha = torch.exp(self._log_alpha.detach())
         self.alpha_optimizer = self.OptimCls((self._log_alpha,),
@@ -183,17 +189,24 @@ class SAC(RlAlgorithm):
             self.pi_optimizer.step()
 
             # Step Q's last because pi_loss.backward() uses them?
-            self.q1_optimizer.zero_grad()
-            q1_loss.backward()
-            q1_grad_norm = torch.nn.utils.clip_grad_norm_(self.agent.q1_parameters(),
-                self.clip_grad_norm)
-            self.q1_optimizer.step()
-
-            self.q2_optimizer.zero_grad()
-            q2_loss.backward()
-            q2_grad_norm = torch.nn.utils.clip_grad_norm_(self.agent.q2_parameters(),
-                self.clip_grad_norm)
-            self.q2_optimizer.step()
+            if self.fused_q_models:  # Same updates, in one backward and step.
+                self.q_optimizer.zero_grad()
+                (q1_loss + q2_loss).backward()
+                q1_grad_norm, q2_grad_norm = clip_grad_norm_ensemble_(
+                    self.agent.q_parameters(), self.clip_grad_norm, ensemble_size=2)
+                self.q_optimizer.step()
+            else:
+                self.q1_optimizer.zero_grad()
+                q1_loss.backward()
+                q1_grad_norm = torch.nn.utils.clip_grad_norm_(self.agent.q1_parameters(),
+                    self.clip_grad_norm)
+                self.q1_optimizer.step()
+
+                self.q2_optimizer.zero_grad()
+                q2_loss.backward()
+                q2_grad_norm = torch.nn.utils.clip_grad_norm_(self.agent.q2_parameters(),
+                    self.clip_grad_norm)
+                self.q2_optimizer.step()
 
             grad_norms = (q1_grad_norm, q2_grad_norm, pi_grad_norm)
 
@@ -305,18 +318,27 @@ class SAC(RlAlgorithm):
         opt_info.alpha.append(self._alpha.item())
 
     def optim_state_dict(self):
+        if self.fused_q_models:
+            q_optim_state_dict = dict(q_optimizer=self.q_optimizer.state_dict())
+        else:
+            q_optim_state_dict = dict(
+                q1_optimizer=self.q1_optimizer.state_dict(),
+                q2_optimizer=self.q2_optimizer.state_dict(),
+            )
         return dict(
             pi_optimizer=self.pi_optimizer.state_dict(),
-            q1_optimizer=self.q1_optimizer.state_dict(),
-            q2_optimizer=self.q2_optimizer.state_dict(),
+            **q_optim_state_dict,
             alpha_optimizer=self.alpha_optimizer.state_dict(),
             log_alpha=self._log_alpha.detach().item(),
         )
 
     def load_optim_state_dict(self, state_dict):
         self.pi_optimizer.load_state_dict(state_dict["pi_optimizer"])
-        self.q1_optimizer.load_state_dict(state_dict["q1_optimizer"])
-        self.q2_optimizer.load_state_dict(state_dict["q2_optimizer"])
+        if self.fused_q_models:
+            self.q_optimizer.load_state_dict(state_dict["q_optimizer"])
+        else:
+            self.q1_optimizer.load_state_dict(state_dict["q1_optimizer"])
+            self.q2_optimizer.load_state_dict(state_dict["q2_optimizer"])
         self.alpha_optimizer.load_state_dict(state_dict["alpha_optimizer"])
         with torch.no_grad():
             self._log_alpha[:] = state_dict["log_alpha"]
@@ -10,11 +10,15 @@ def discount_return(reward, done, bootstrap_value, discount, return_dest=None):
     discounted sum of future rewards from each time-step to the end of the
     batch, including bootstrapping value.  Sum resets where `done` is 1.
     Optionally, writes to buffer `return_dest`, if provided.  Operations
-    vectorized across all trailing dimensions after the first [T,]."""
+    vectorized across all trailing dimensions after the first [T,]; torch
+    tensors also (mostly) over T, using `discounted_reverse_scan()`."""
     return_ = return_dest if return_dest is not None else zeros(
         reward.shape, dtype=reward.dtype)
     nd = 1 - done
     nd = nd.type(reward.dtype) if isinstance(nd, torch.Tensor) else nd
+    if isinstance(reward, torch.Tensor):
+        return_[:] = discounted_reverse_scan(reward, nd, discount, bootstrap_value)
+        return return_
     return_[-1] = reward[-1] + discount * bootstrap_value * nd[-1]
     for t in reversed(range(len(reward) - 1)):
         return_[t] = reward[t] + return_[t + 1] * discount * nd[t]
@@ -31,6 +35,13 @@ def generalized_advantage_estimation(reward, value, done, bootstrap_value,
     return_ = return_dest if return_dest is not None else zeros(reward.shape, dtype=reward.dtype)
     nd = 1 - done # array of whether or not an episode is not done
     nd = nd.type(reward.dtype) if isinstance(nd, torch.Tensor) else nd
+    if isinstance(reward, torch.Tensor):
+        bootstrap_value = torch.as_tensor(bootstrap_value, dtype=value.dtype, device=value.device)
+        next_value = torch.cat([value[1:], bootstrap_value.reshape(-1).expand(value[-1].numel()).view(1, *value.shape[1:])])
+        delta = reward + discount * next_value * nd - value
+        advantage[:] = discounted_reverse_scan(delta, nd, discount * gae_lambda, 0.)
+        return_[:] = advantage + value
+        return advantage, return_
     advantage[-1] = reward[-1] + discount * bootstrap_value * nd[-1] - value[-1]
     for t in reversed(range(len(reward) - 1)):
         delta = reward[t] + discount * value[t + 1] * nd[t] - value[t]
@@ -40,6 +51,37 @@ def generalized_advantage_estimation(reward, value, done, bootstrap_value,
     return advantage, return_
 
 
+def discounted_reverse_scan(delta, not_done, coef, last, max_scale=1e4):
+    """Solves ``x[t] = delta[t] + coef * not_done[t] * x[t+1]`` backwards over
+    the leading (time) dimension of torch tensors, with ``x[T] = last``.
+    Within blocks of K time-steps, ``x[t] * coef**t`` is a reverse cumulative
+    sum of ``delta[s] * coef**s`` up to the next done (``not_done`` must be 0
+    or 1), so only ceil(T / K) sequential steps remain.  K is the longest
+    block for which ``coef**-K <= max_scale``, to keep the (float64) sums
+    accurate."""
+    T, lead_shape = delta.shape[0], delta.shape[1:]
+    delta = delta.reshape(T, -1).type(torch.float64)
+    not_done = not_done.reshape(T, -1)
+    N = delta.shape[1]
+    block_size = T if coef >= 1 else max(1, min(T, int(np.log(max_scale) / -np.log(max(coef, 1e-8)))))
+    x = torch.empty_like(delta)
+    x_next = torch.as_tensor(last, dtype=delta.dtype, device=delta.device).reshape(-1).expand(N)
+    steps = torch.arange(block_size, device=delta.device)
+    scale = (coef ** steps.type(delta.dtype)).unsqueeze(1)  # [K,1]
+    for end in range(T, 0, -block_size):
+        start = max(end - block_size, 0)
+        K = end - start
+        scaled_sums = torch.flip(torch.cumsum(torch.flip(delta[start:end] * scale[:K], (0,)), 0), (0,))
+        scaled_sums = torch.cat([scaled_sums, scaled_sums.new_zeros((2, N))])  # Read at next_done + 1 <= K + 1.
+        # First done at or after each step (K if none in the rest of the block).
+        done_idxs = torch.where(not_done[start:end] == 0, steps[:K, None], torch.full_like(steps[:K, None], K))
+        next_done = torch.flip(torch.cummin(torch.flip(done_idxs, (0,)), 0).values, (0,))
+        x[start:end] = ((scaled_sums[:K] - torch.gather(scaled_sums, 0, next_done + 1)) / scale[:K] +
+            (next_done == K).type(delta.dtype) * (coef ** (K - steps[:K, None]).type(delta.dtype)) * x_next)
+        x_next = x[start]
+    return x.view(T, *lead_shape)
+
+
 # def discount_return_n_step(reward, done, n_step, discount, return_dest=None,
 #         done_n_dest=None):
 #     """Time-major inputs, optional other dimension: [T], [T,B], etc."""
@@ -112,6 +154,24 @@ def valid_from_done(done):
     return valid
 
 
+def terminal_next_observation(env_samples):
+    """Returns the observations following each time-step, [T,B,...]: those in
+    `next_observation`, except where a mid-batch-reset collector reset the
+    env after the step, which get the terminal observation recorded before
+    the reset (a copy is made only then).  Also returns a float mask [T,B]
+    which is zero at resets whose terminal observation was not kept (no slot
+    left), or None if there are none."""
+    next_observation = env_samples.next_observation
+    terminal_idx = env_samples.terminal_idx
+    t, b = torch.nonzero(terminal_idx >= 0, as_tuple=True)
+    if len(t) > 0:
+        next_observation = next_observation.clone()
+        next_observation[t, b] = env_samples.terminal_observation[terminal_idx[t, b].long(), b]
+    lost = terminal_idx == -2
+    terminal_valid = (~lost).type(torch.float) if lost.any() else None
+    return next_observation, terminal_valid
+
+
 # Tested timelimit-GAE with PPO on HalfCheetah-v3: no discernible effect.
 # Removed from PG base algo. (around 2019-09-16)
 
@@ -160,3 +220,58 @@ def generalized_advantage_estimation_tl(reward, value, done, bootstrap_value,
             discount * value[t + 1][tt] - value[t][tt])
     return_[:] = advantage + value
     return advantage, return_
+
+
+if __name__ == "__main__":
+    # Micro-benchmark: scan vs. stepping backwards over T in a python loop.
+    import timeit
+
+    def discount_return_loop(reward, done, bootstrap_value, discount):
+        return_ = torch.zeros_like(reward)
+        nd = 1 - done.type(reward.dtype)
+        return_[-1] = reward[-1] + discount * bootstrap_value * nd[-1]
+        for t in reversed(range(len(reward) - 1)):
+            return_[t] = reward[t] + return_[t + 1] * discount * nd[t]
+        return return_
+
+    def gae_loop(reward, value, done, bootstrap_value, discount, gae_lambda):
+        advantage = torch.zeros_like(reward)
+        nd = 1 - done.type(reward.dtype)
+        advantage[-1] = reward[-1] + discount * bootstrap_value * nd[-1] - value[-1]
+        for t in reversed(range(len(reward) - 1)):
+            delta = reward[t] + discount * value[t + 1] * nd[t] - value[t]
+            advantage[t] = delta + discount * gae_lambda * nd[t] * advantage[t + 1]
+        return advantage, advantage + value
+
+    # Scan vs. loop where the last block is a single step, and at gae_lambda=0 (one-step blocks).
+    for discount, gae_lambda in [(0.99, 0.95), (0.99, 0.), (0.5, 1.)]:
+        block_sizes = [max(1, int(np.log(1e4) / -np.log(max(coef, 1e-8)))) for coef in [discount, discount * gae_lambda]]
+        for T in sorted({1, 2, 3} | {k * K + 1 for K in block_sizes for k in (1, 2)}):
+            reward, value, bv = torch.randn(T, 4), torch.randn(T, 4), torch.randn(4)
+            done = (torch.rand(T, 4) < 0.1).float()
+            r_loop = discount_return_loop(reward, done, bv, discount)
+            a_loop, _ = gae_loop(reward, value, done, bv, discount, gae_lambda)
+            a_scan, _ = generalized_advantage_estimation(reward, value, done, bv, discount, gae_lambda)
+            assert torch.allclose(r_loop, discount_return(reward, done, bv, discount), atol=1e-3), (discount, T)
+            assert torch.allclose(a_loop, a_scan, atol=1e-3), (discount, gae_lambda, T)
+
+    devices = ["cpu"] + (["cuda"] if torch.cuda.is_available() else [])
+    for device in devices:
+        for T, B in [(20, 64), (128, 64), (500, 64), (500, 256)]:
+            reward = torch.randn(T, B, device=device)
+            value = torch.randn(T, B, device=device)
+            done = (torch.rand(T, B, device=device) < 0.01).float()
+            bv = torch.randn(B, device=device)
+            r_loop = discount_return_loop(reward, done, bv, 0.99)
+            r_scan = discount_return(reward, done, bv, 0.99)
+            a_loop, _ = gae_loop(reward, value, done, bv, 0.99, 0.95)
+            a_scan, _ = generalized_advantage_estimation(reward, value, done, bv, 0.99, 0.95)
+            assert torch.allclose(r_loop, r_scan, atol=1e-3) and torch.allclose(a_loop, a_scan, atol=1e-3)
+            timings = []
+            for fn in [lambda: gae_loop(reward, value, done, bv, 0.99, 0.95),
+                    lambda: generalized_advantage_estimation(reward, value, done, bv, 0.99, 0.95)]:
+                n = 20
+                if device == "cuda":
+                    torch.cuda.synchronize()
+                timings.append(timeit.timeit(lambda: (fn(), torch.cuda.synchronize() if device == "cuda" else None), number=n) / n)
+            print(f"{device} T={T} B={B}  GAE loop: {timings[0] * 1e3:.2f} ms  scan: {timings[1] * 1e3:.2f} ms")
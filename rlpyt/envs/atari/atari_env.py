@@ -7,7 +7,7 @@ import atari_py
 import cv2
 from collections import namedtuple
 
-from rlpyt.envs.base import Env, EnvStep
+from rlpyt.envs.base import Env, EnvStep, VecEnv
 from rlpyt.spaces.int_box import IntBox
 from rlpyt.utils.quick_args import save__init__args
 from rlpyt.samplers.collections import TrajInfo
@@ -27,6 +27,22 @@ class AtariTrajInfo(TrajInfo):
         self.GameScore += getattr(env_info, "game_score", 0)
 
 
+class AtariVecEnv(VecEnv):
+    """`VecEnv` for `AtariEnv` instances, which write their frame stacks
+    straight into the (stacked) output observation rather than returning new
+    arrays to be copied in."""
+
+    def step(self, action, active=None, out=None):
+        observation = self._observation if out is None else out
+        B = len(self.envs)
+        reward = np.zeros(B, dtype=np.float32)
+        done = np.zeros(B, dtype=bool)
+        env_info = [None] * B
+        for b in (range(B) if active is None else np.flatnonzero(active)):
+            _, reward[b], done[b], env_info[b] = self.envs[b].step(action[b], out=observation[b])
+        return EnvStep(observation, reward, done, env_info)
+
+
 class AtariEnv(Env):
     """An efficient implementation of the classic Atari RL envrionment using the
     Arcade Learning Environment (ALE).
@@ -48,6 +64,10 @@ class AtariEnv(Env):
     space is an `IntBox` with ``dtype=uint8`` to save memory; conversion to float
     should happen inside the agent's model's ``forward()`` method.
 
+    Past frames are kept in a ring buffer which each new frame is resized
+    into, so a step only copies the frames out once, into a new observation
+    or into ``out`` (`AtariVecEnv` passes its output buffer).
+
     (See the file for implementation details.)
 
 
@@ -68,6 +88,8 @@ class AtariEnv(Env):
         downsampling_scheme (string): if ``classical``, use (84, 84). If ``new``, use (80, 104)
     """
 
+    VecEnvCls = AtariVecEnv
+
     def __init__(self,
                  game="pong",
                  frame_skip=4,  # Frames per step (>=1).
@@ -110,7 +132,8 @@ class AtariEnv(Env):
         self._max_frame = self.ale.getScreenGrayscale()
         self._raw_frame_1 = self._max_frame.copy()
         self._raw_frame_2 = self._max_frame.copy()
-        self._obs = np.zeros(shape=obs_shape, dtype="uint8")
+        self._frames = np.zeros(shape=obs_shape, dtype="uint8")  # Ring buffer of past frames.
+        self._newest = num_img_obs - 1  # Index of the newest frame in it.
 
         # Settings
         self._has_fire = "FIRE" in self.get_action_meanings()
@@ -158,7 +181,9 @@ class AtariEnv(Env):
             self._record_episode = False
         return self.get_obs()
 
-    def step(self, action):
+    def step(self, action, out=None):
+        """Steps the game; if given, the observation is written into ``out``
+        (and returned in the ``EnvStep``) instead of a new array."""
         a = self._action_set[action]
         game_score = np.array(0., dtype="float32")
         for _ in range(self._frame_skip - 1):
@@ -179,7 +204,7 @@ class AtariEnv(Env):
         if self._no_negative_reward and reward < 0.0:
             reward = 0.0
         reward *= self._multiplier
-        return EnvStep(self.get_obs(), reward, done, info)
+        return EnvStep(self.get_obs(out), reward, done, info)
 
     def render(self, cv2=False, wait=10, show_full_obs=False):
         """Shows game screen via cv2, with option to show all frames in observation.
@@ -196,8 +221,15 @@ class AtariEnv(Env):
         else:
             return self.ale.getScreenRGB()
 
-    def get_obs(self):
-        return self._obs.copy()
+    def get_obs(self, out=None):
+        """Frames OLDEST to NEWEST, in a new array or written into ``out``."""
+        if out is None:
+            out = np.empty_like(self._frames)
+        oldest = self._newest + 1
+        n_old = self._num_img_obs - oldest
+        out[:n_old] = self._frames[oldest:]
+        out[n_old:] = self._frames[:oldest]
+        return out
 
     def close(self):
         if self.record_env:
@@ -217,12 +249,12 @@ class AtariEnv(Env):
         """Max of last two frames; crop two rows; downsample by specified scheme."""
         self._get_screen(2)
         np.maximum(self._raw_frame_1, self._raw_frame_2, self._max_frame)
-        img = cv2.resize(self._max_frame[1:-1], self._frame_shape, cv2.INTER_NEAREST)
-        # NOTE: order OLDEST to NEWEST should match use in frame-wise buffer.
-        self._obs = np.concatenate([self._obs[1:], img[np.newaxis]])
+        # NOTE: order OLDEST to NEWEST (see get_obs()) should match use in frame-wise buffer.
+        self._newest = (self._newest + 1) % self._num_img_obs
+        cv2.resize(self._max_frame[1:-1], self._frame_shape, dst=self._frames[self._newest])
 
     def _reset_obs(self):
-        self._obs[:] = 0
+        self._frames[:] = 0
         self._max_frame[:] = 0
         self._raw_frame_1[:] = 0
         self._raw_frame_2[:] = 0
@@ -1,6 +1,9 @@
 import gym
+import numpy as np
 from collections import namedtuple
 
+from rlpyt.utils.buffer import buffer_from_example
+
 
 EnvStep = namedtuple("EnvStep",
     ["observation", "reward", "done", "env_info"])
@@ -63,3 +66,76 @@ class Env:
     def close(self):
         """Any clean up operation."""
         pass
+
+
+class VecEnv:
+    """
+    Steps all of a sampler worker's environment instances in one call, with
+    inputs and outputs stacked along a leading batch dimension [B].  This
+    default implementation loops over the wrapped ``Env`` instances; an env
+    class can provide a batched implementation (e.g. one which advances arrays
+    of game states together) through a ``VecEnvCls`` attribute, which
+    ``make_vec_env()`` looks for.
+    """
+
+    def __init__(self, envs):
+        self.envs = envs
+        self._observation = None
+
+    @property
+    def num_envs(self):
+        return len(self.envs)
+
+    @property
+    def spaces(self):
+        return self.envs[0].spaces
+
+    def step(self, action, active=None, out=None):
+        """
+        Steps every instance with its entry of ``action``, or only those
+        where the boolean mask ``active`` is True.  The returned observation
+        array is reused by the next call, unless given as ``out``.
+
+        Args:
+            action: stacked actions, [B,...].
+            active (np.ndarray, optional): bool mask of instances to step, [B].
+            out (np.ndarray, optional): array to write the observations into, [B,...].
+
+        Returns:
+            observation: stacked next observations, [B,...] (stale where not stepped).
+            reward (np.ndarray): float32 rewards, [B] (zero where not stepped).
+            done (np.ndarray): bool episode ends, [B] (False where not stepped).
+            env_info (list): per-instance info namedtuples (``None`` where not stepped).
+        """
+        observation = self._observation if out is None else out
+        B = len(self.envs)
+        reward = np.zeros(B, dtype=np.float32)
+        done = np.zeros(B, dtype=bool)
+        env_info = [None] * B
+        for b in (range(B) if active is None else np.flatnonzero(active)):
+            o, reward[b], done[b], env_info[b] = self.envs[b].step(action[b])
+            observation[b] = o
+        return EnvStep(observation, reward, done, env_info)
+
+    def reset(self, idxs=None):
+        """Resets all instances, or those at integer ``idxs``, and returns
+        their stacked initial observations (a new array)."""
+        idxs = range(len(self.envs)) if idxs is None else idxs
+        observations = [self.envs[b].reset() for b in idxs]
+        observation = buffer_from_example(observations[0], len(observations))
+        for i, o in enumerate(observations):
+            observation[i] = o
+        if self._observation is None:
+            self._observation = buffer_from_example(observations[0], len(self.envs))
+        return observation
+
+    def close(self):
+        for env in self.envs:
+            env.close()
+
+
+def make_vec_env(envs):
+    """Returns the ``VecEnv`` stepping a worker's ``envs`` together, using the
+    env class's own batched ``VecEnvCls`` if it defines one."""
+    VecEnvCls = getattr(envs[0], "VecEnvCls", VecEnv)
+    return VecEnvCls(envs)
@@ -0,0 +1,836 @@
+"""Array-native engine for the pycolab maze games.
+
+The mazeworld games only use a handful of sprite behaviours (the player, fixed
+objects, white noise objects teleporting about a room, brownian objects, and
+objects the player can push) on a small static backdrop.  Through the general
+pycolab `Engine` a step is almost entirely Python: an `update` call per
+sprite, a repaint of every layer, and a `ScrollingCropper` copying every layer
+again.  `compile_game` reads the rules of a freshly made game out of its
+sprites (their `update` code, impassables, rooms and rewards), and
+`MazeEngine` then plays them for a batch of games as numpy arrays.  Games with
+anything the compiler does not recognise are left to pycolab.
+
+The batch pays off across a sampler worker's envs: `MazeVecEnv` (the
+`VecEnvCls` of the mazeworld envs which opt in) plays all of their games in
+one frame of one engine, and each env then steps as usual on a `MazeGame`
+view of its slot.  Other pycolab envs keep the plain `VecEnv`.
+
+Boards and rewards match pycolab frame for frame, and so do the draws from
+the global `np.random` for a single game (a batch draws sprite by sprite
+rather than game by game); mazeworld/tests/maze_engine_test.py checks every
+opted-in env against pycolab.  Run this module to time both.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import inspect
+import io
+import re
+import textwrap
+import tokenize
+import warnings
+from collections.abc import Mapping
+
+import numpy as np
+
+from pycolab import cropping
+from pycolab import rendering
+from pycolab import things as plab_things
+from pycolab.prefab_parts import sprites as prefab_sprites
+
+from rlpyt.envs.base import VecEnv
+
+# Directions, ordered as in `MoveableObject.directions`; _STAY never moves.
+_NORTH, _EAST, _SOUTH, _WEST, _STAY = range(5)
+_DELTAS = np.array([[-1, 0], [0, 1], [1, 0], [0, -1], [0, 0]])
+_OPPOSITE = np.array([_SOUTH, _WEST, _NORTH, _EAST])
+_PERPENDICULAR = np.array([[_EAST, _WEST], [_NORTH, _SOUTH]] * 2)
+_METHODS = {'_north': _NORTH, '_east': _EAST, '_south': _SOUTH,
+            '_west': _WEST, '_stay': _STAY}
+_NO_CELL = (-1, -1)
+
+
+def _update_lines(cls):
+    """Statements of ``cls.update`` (after the ``def`` line), stripped of
+    comments and indentation."""
+    source = textwrap.dedent(inspect.getsource(cls.update))
+    lines = source.split('\n')
+    for token in tokenize.generate_tokens(io.StringIO(source).readline):
+        if token.type == tokenize.COMMENT:  # Not a '#' inside a string.
+            row, col = token.start
+            lines[row - 1] = lines[row - 1][:col]
+    lines = [line.strip() for line in lines[1:]]
+    return [line for line in lines if line]
+
+
+def _parse(lines, grammar):
+    """Matches every line against ``grammar``, a list of ``(pattern, name)``,
+    returning the ``(name, groups)`` of each, or None if a line is not
+    understood."""
+    parsed = []
+    for line in lines:
+        for pattern, name in grammar:
+            match = re.fullmatch(pattern, line)
+            if match is not None:
+                parsed.append((name, match.groups()))
+                break
+        else:
+            return None
+    return parsed
+
+
+def _is_maze_walker(cls):
+    """True for a `MazeWalker` moving with the stock motion methods."""
+    return issubclass(cls, prefab_sprites.MazeWalker) and all(
+        getattr(cls, m) is getattr(prefab_sprites.MazeWalker, m) for m in
+        ('_north', '_east', '_south', '_west', '_stay', '_teleport', '_move',
+         '_check_motion'))
+
+
+class MazeRule:
+    """Compiled behaviour of one kind of sprite.  ``compile`` recognises a
+    sprite's ``update`` code and returns the rule's parameters (or None);
+    ``__init__`` allocates per-env state in a `MazeEngine`, which ``load``
+    fills from a sprite of a new game, and ``update`` advances envs ``n``
+    (an index array) under player ``actions`` (-1 for None)."""
+
+    _grammar = []
+
+    def __init__(self, engine, index, char, spec):
+        self.engine = engine
+        self.index = index
+        self.char = char
+        self.__dict__.update(spec)
+
+    @classmethod
+    def compile(cls, sprite):
+        raise NotImplementedError
+
+    def load(self, n, sprite):
+        self.engine.positions[n, self.index] = sprite.position
+
+    def update(self, n, actions):
+        pass
+
+
+class PlayerRule(MazeRule):
+    """The maze explorer: walks one cell per action, with optional rewards
+    for ending the move near other sprites (``if``/``elif`` chains as
+    written)."""
+
+    _grammar = [
+        (r'del .*', 'skip'),
+        (r'pr, pc = self\.position', 'skip'),
+        (r"(\w)r, \1c = things\['\1'\]\.position", 'skip'),
+        (r'self\.last_position = self\.position', 'track'),
+        (r'self\.last_action = actions', 'track'),
+        (r'(?:el)?if actions == (\d+):', 'action'),
+        (r'self\.(_north|_south|_west|_east|_stay)\(board, the_plot\)', 'move'),
+        (r'the_plot\.terminate_episode\(\)', 'terminate'),
+        (r'(el)?if \(\((\w)r-(\d+)\) <= pr <= \(\2r\+\3\)\) and '
+         r'\(\(\2c-\3\) <= pc <= \(\2c\+\3\)\):', 'near'),
+        (r'the_plot\.add_reward\(self\.(\w+)\)', 'reward'),
+    ]
+
+    @classmethod
+    def compile(cls, sprite):
+        parsed = _parse(_update_lines(type(sprite)), cls._grammar)
+        if parsed is None or not _is_maze_walker(type(sprite)):
+            return None
+        spec = dict(track=False, terminate=None, moves={}, rewards=[])
+        action = None
+        for name, groups in parsed:
+            if name == 'track':
+                spec['track'] = True
+            elif name == 'action':
+                action = int(groups[0])
+            elif name == 'move' and action is not None:
+                spec['moves'][action] = _METHODS[groups[0]]
+            elif name == 'terminate' and action is not None:
+                spec['terminate'] = action
+            elif name == 'near':
+                spec['rewards'].append([groups[0] is not None, groups[1], int(groups[2]), None])
+            elif name == 'reward' and spec['rewards'] and spec['rewards'][-1][3] is None:
+                spec['rewards'][-1][3] = groups[0]
+            elif name != 'skip':
+                return None
+        if not spec['moves'] or any(r[3] is None for r in spec['rewards']):
+            return None
+        return spec
+
+    def __init__(self, engine, index, char, spec):
+        super().__init__(engine, index, char, spec)
+        # Indexed by action + 1, so that None (-1) and unknown actions stay.
+        self.action_moves = np.full(max(self.moves) + 3, _STAY)
+        for action, move in self.moves.items():
+            self.action_moves[action + 1] = move
+        self.targets = [engine.chars.index(r[1]) for r in self.rewards]
+        self.values = np.zeros((len(self.rewards), engine.num_envs))
+
+    def load(self, n, sprite):
+        super().load(n, sprite)
+        for i, (_, _, _, attr) in enumerate(self.rewards):
+            self.values[i, n] = getattr(sprite, attr)
+
+    def update(self, n, actions):
+        engine = self.engine
+        if self.track:
+            engine.last_position[n] = engine.positions[n, self.index]
+            engine.last_action[n] = actions
+        moves = self.action_moves[np.clip(actions + 1, 0, len(self.action_moves) - 1)]
+        engine.move(n, self.index, moves)
+        if self.terminate is not None:
+            engine.game_over[n] |= actions == self.terminate
+        position = engine.positions[n, self.index]
+        matched = np.zeros(len(n), dtype=bool)
+        for i, (chained, _, radius, _) in enumerate(self.rewards):
+            near = (np.abs(position - engine.positions[n, self.targets[i]]) <= radius).all(axis=1)
+            if chained:
+                near &= ~matched
+                matched |= near
+            else:
+                matched = near
+            engine.add_reward(n[near], self.values[i, n[near]])
+
+
+class FixedRule(MazeRule):
+    """A static object, optionally rewarding the player within a radius."""
+
+    _grammar = [
+        (r'del .*', 'skip'),
+        (r'mr, mc = self\.position', 'skip'),
+        (r"pr, pc = things\['P'\]\.position", 'skip'),
+        (r'if abs\(pr-mr\) <= (\d+) and abs\(pc-mc\) <= \1:', 'near'),
+        (r'the_plot\.add_reward\(self\.(\w+)\)', 'reward'),
+    ]
+
+    @classmethod
+    def compile(cls, sprite):
+        parsed = _parse(_update_lines(type(sprite)), cls._grammar)
+        if parsed is None:
+            return None
+        spec = dict(radius=None, attr=None)
+        for name, groups in parsed:
+            if name == 'near':
+                spec['radius'] = int(groups[0])
+            elif name == 'reward' and spec['radius'] is not None:
+                spec['attr'] = groups[0]
+            elif name != 'skip':
+                return None
+        if (spec['radius'] is None) != (spec['attr'] is None):
+            return None
+        return spec
+
+    def __init__(self, engine, index, char, spec):
+        super().__init__(engine, index, char, spec)
+        self.values = np.zeros(engine.num_envs)
+
+    def load(self, n, sprite):
+        super().load(n, sprite)
+        if self.attr is not None:
+            self.values[n] = getattr(sprite, self.attr)
+
+    def update(self, n, actions):
+        if self.radius is None:
+            return
+        engine = self.engine
+        offset = engine.positions[n, engine.player] - engine.positions[n, self.index]
+        near = (np.abs(offset) <= self.radius).all(axis=1)
+        engine.add_reward(n[near], self.values[n[near]])
+
+
+class WhiteNoiseRule(MazeRule):
+    """Teleports to a uniformly drawn cell of its room every frame."""
+
+    _grammar = [
+        (r'del .*', 'skip'),
+        (r'self\._teleport\(self\.(\w+)\[np\.random\.choice\(len\(self\.\1\)\)\]\)',
+         'teleport'),
+    ]
+
+    @classmethod
+    def compile(cls, sprite):
+        parsed = _parse(_update_lines(type(sprite)), cls._grammar)
+        if parsed is None or not _is_maze_walker(type(sprite)):
+            return None
+        teleports = [groups[0] for name, groups in parsed if name == 'teleport']
+        if len(teleports) != 1:
+            return None
+        return dict(attr=teleports[0])
+
+    def load(self, n, sprite):
+        super().load(n, sprite)
+        # The rooms are module constants, shared by every game of a program.
+        self.coords = np.asarray(getattr(sprite, self.attr))
+
+    def update(self, n, actions):
+        self.engine.positions[n, self.index] = self.coords[self.engine.randint(n, len(self.coords))]
+
+
+class BrownianRule(MazeRule):
+    """Steps in a uniformly drawn direction every frame, with a restricted
+    choice of directions at the room's doorway."""
+
+    _grammar = [
+        (r'del .*', 'skip'),
+        (r'else:', 'skip'),
+        (r'if self\.position\[0\] == (\d+) and self\.position\[1\] == (\d+):', 'gate'),
+        (r'self\._direction = np\.random\.choice\(\[([\d, ]+)\]\)', 'gate_choices'),
+        (r'self\._direction = np\.random\.choice\((\d+)\)', 'choices'),
+        (r'(?:el)?if self\._direction == (\d+): '
+         r'self\.(_north|_south|_west|_east)\(board, the_plot\)', 'direction'),
+    ]
+
+    @classmethod
+    def compile(cls, sprite):
+        parsed = _parse(_update_lines(type(sprite)), cls._grammar)
+        if parsed is None or not _is_maze_walker(type(sprite)):
+            return None
+        spec = dict(gate=_NO_CELL, gate_choices=None, choices=None, directions={})
+        for name, groups in parsed:
+            if name == 'gate':
+                spec['gate'] = (int(groups[0]), int(groups[1]))
+            elif name == 'gate_choices':
+                spec['gate_choices'] = np.array([int(c) for c in groups[0].split(',')])
+            elif name == 'choices':
+                spec['choices'] = int(groups[0])
+            elif name == 'direction':
+                spec['directions'][int(groups[0])] = _METHODS[groups[1]]
+        if (spec['choices'] is None or sorted(spec['directions']) != list(range(spec['choices']))
+                or (spec['gate'] != _NO_CELL) != (spec['gate_choices'] is not None)):
+            return None
+        spec['directions'] = np.array([spec['directions'][i] for i in range(spec['choices'])])
+        return spec
+
+    def update(self, n, actions):
+        engine = self.engine
+        at_gate = (engine.positions[n, self.index] == self.gate).all(axis=1)
+        draws = np.empty(len(n), dtype=np.int64)
+        gate, other = np.flatnonzero(at_gate), np.flatnonzero(~at_gate)
+        if len(gate):
+            draws[gate] = self.gate_choices[engine.randint(n[gate], len(self.gate_choices))]
+        if len(other):
+            draws[other] = engine.randint(n[other], self.choices)
+        engine.move(n, self.index, self.directions[draws])
+
+
+class MoveableRule(MazeRule):
+    """A box the player pushes by walking into it; it stays put (and the
+    player steps back) when blocked or at its room's exit, may slip to a
+    perpendicular direction with probability ``eps``, and may reward the
+    player for reaching a goal cell."""
+
+    _grammar = [
+        (r'del .*', 'skip'),
+        (r'else:', 'skip'),
+        (r'mr, mc = self\.position', 'skip'),
+        (r"pr, pc = things\['P'\]\.last_position", 'skip'),
+        (r"p_action = things\['P'\]\.last_action", 'skip'),
+        (r'(?:el)?if \(mc == pc\) and \(mr - pr == -1\) and \(p_action == 0\):', 'push'),
+        (r'(?:el)?if \(mc == pc\) and \(mr - pr == 1\) and \(p_action == 1\):', 'push'),
+        (r'(?:el)?if \(mc - pc == 1\) and \(mr == pr\) and \(p_action == 3\):', 'push'),
+        (r'(?:el)?if \(mc - pc == -1\) and \(mr == pr\) and \(p_action == 2\):', 'push'),
+        (r'self\.pushes \+= 1', 'pushes'),
+        (r'rand = np\.random\.rand\(\) <= self\.eps', 'stochastic'),
+        (r'if rand == True:', 'skip'),
+        (r'direction_ind = np\.random\.choice\(\[(?:1, 3|0, 2)\]\)', 'skip'),
+        (r'box_direction = self\.directions\[direction_ind\]', 'skip'),
+        (r'box_direction = self\._(?:north|south|east|west)', 'skip'),
+        (r'no_go_coord = self\.no_go\[direction_ind\]', 'skip'),
+        (r'no_go_coord = \((\d+), ?(\d+)\)', 'exit'),
+        (r'exiting_room = \(self\.position == no_go_coord\)', 'skip'),
+        (r'exiting_room = \(self\.position == \((\d+), ?(\d+)\)\)', 'exit'),
+        (r'if exiting_room == True:', 'skip'),
+        (r"things\['P'\]\._(?:north|south|east|west)\(board, the_plot\)", 'skip'),
+        (r'self\._stay\(board, the_plot\)', 'skip'),
+        (r'moved = (?:box_direction|self\._(?:north|south|east|west))\(board, the_plot\)', 'skip'),
+        (r'if moved is not None:', 'skip'),
+        (r'if mr == (\d+) and mc == (\d+):', 'goal'),
+        (r'the_plot\.add_reward\(self\.(\w+)\)', 'reward'),
+    ]
+
+    @classmethod
+    def compile(cls, sprite):
+        parsed = _parse(_update_lines(type(sprite)), cls._grammar)
+        if parsed is None or not _is_maze_walker(type(sprite)):
+            return None
+        spec = dict(pushes=False, stochastic=False, exits=[], goal=None, attr=None)
+        for name, groups in parsed:
+            if name in ('pushes', 'stochastic'):
+                spec[name] = True
+            elif name == 'exit':
+                spec['exits'].append((int(groups[0]), int(groups[1])))
+            elif name == 'goal':
+                spec['goal'] = (int(groups[0]), int(groups[1]))
+            elif name == 'reward' and spec['goal'] is not None:
+                spec['attr'] = groups[0]
+        if ([name for name, _ in parsed].count('push') != 4 or len(spec['exits']) != 3
+                or (spec['goal'] is None) != (spec['attr'] is None)):
+            return None
+        if spec['stochastic'] and [getattr(sprite.directions[i], '__name__', None)
+                for i in range(4)] != ['_north', '_east', '_south', '_west']:
+            return None
+        # Exits are written in the order of the south, east and west pushes.
+        south, east, west = spec['exits']
+        spec['exits'] = np.array([_NO_CELL, east, south, west])
+        return spec
+
+    def __init__(self, engine, index, char, spec):
+        super().__init__(engine, index, char, spec)
+        self.count = np.zeros(engine.num_envs, dtype=np.int64)
+        self.eps = np.zeros(engine.num_envs)
+        self.no_go = np.zeros((engine.num_envs, 4, 2), dtype=np.int64)
+        self.values = np.zeros(engine.num_envs)
+
+    def load(self, n, sprite):
+        super().load(n, sprite)
+        if self.pushes:
+            self.count[n] = sprite.pushes
+        if self.stochastic:
+            self.eps[n] = sprite.eps
+            self.no_go[n] = [_NO_CELL if sprite.no_go[i] is None else sprite.no_go[i]
+                for i in range(4)]
+        if self.attr is not None:
+            self.values[n] = getattr(sprite, self.attr)
+
+    def update(self, n, actions):
+        engine = self.engine
+        position = engine.positions[n, self.index]
+        dr, dc = (position - engine.last_position[n]).T
+        last_action = engine.last_action[n]
+        push = np.full(len(n), -1)
+        push[(dc == 0) & (dr == -1) & (last_action == 0)] = _NORTH
+        push[(dc == 0) & (dr == 1) & (last_action == 1)] = _SOUTH
+        push[(dc == 1) & (dr == 0) & (last_action == 3)] = _EAST
+        push[(dc == -1) & (dr == 0) & (last_action == 2)] = _WEST
+        k = np.flatnonzero(push >= 0)
+        if len(k):
+            nk, push = n[k], push[k]
+            self.count[nk] += 1
+            direction, exit_cell = push.copy(), self.exits[push]
+            if self.stochastic:
+                slip = np.flatnonzero(engine.rand(nk) <= self.eps[nk])
+                if len(slip):
+                    side = engine.randint(nk[slip], 2)
+                    direction[slip] = _PERPENDICULAR[push[slip], side]
+                    exit_cell[slip] = self.no_go[nk[slip], direction[slip]]
+            # A push north never checks for the exit.
+            exiting = (position[k] == exit_cell).all(axis=1) & (push != _NORTH)
+            blocked = exiting.copy()
+            go = np.flatnonzero(~exiting)
+            blocked[go] = engine.move(nk[go], self.index, direction[go])
+            back = np.flatnonzero(blocked)
+            engine.move(nk[back], engine.player, _OPPOSITE[push[back]])
+        if self.goal is not None:
+            at_goal = (engine.positions[n, self.index] == self.goal).all(axis=1)
+            engine.add_reward(n[at_goal], self.values[n[at_goal]])
+
+
+# In order of precedence: an `update` with no moves at all reads as fixed.
+_RULES = [PlayerRule, WhiteNoiseRule, BrownianRule, MoveableRule, FixedRule]
+_sprite_rules = {}
+_programs = {}
+
+
+def _compile_sprite(sprite):
+    """The ``(rule class, spec)`` playing ``sprite``, or None."""
+    cls = type(sprite)
+    if cls not in _sprite_rules:
+        _sprite_rules[cls] = None
+        for rule_cls in ([PlayerRule] if sprite.character == 'P' else _RULES[1:]):
+            spec = rule_cls.compile(sprite)
+            if spec is not None:
+                if _is_maze_walker(cls):
+                    spec['impassable'] = frozenset(sprite.impassable)
+                _sprite_rules[cls] = (rule_cls, spec)
+                break
+    return _sprite_rules[cls]
+
+
+class MazeProgram:
+    """A compiled maze game: the board shape, the layer characters, and the
+    rule of each sprite in update order."""
+
+    def __init__(self, rows, cols, layer_chars, z_order, sprites):
+        self.rows = rows
+        self.cols = cols
+        self.layer_chars = layer_chars
+        self.z_order = z_order
+        self.sprites = sprites
+
+
+def compile_game(game):
+    """Returns the `MazeProgram` playing ``game``, a pycolab `Engine` which
+    has been made but not started, or None if the game uses anything (drapes,
+    update groups, a custom backdrop, unrecognised sprites) the engine does
+    not support."""
+    if (game._showtime or type(game._backdrop) is not plab_things.Backdrop
+            or not game._occlusion_in_layers or len(game._update_groups) != 1
+            or 'P' not in game._sprites_and_drapes):
+        return None
+    schedule = list(game._update_groups.values())[0]
+    if not all(isinstance(entity, plab_things.Sprite) for entity in schedule):
+        return None
+    key = (game.rows, game.cols, tuple(game.z_order),
+        tuple((sprite.character, type(sprite)) for sprite in schedule))
+    if key not in _programs:
+        rules = [_compile_sprite(sprite) for sprite in schedule]
+        player = [spec for rule_cls, spec in rules if rule_cls is PlayerRule] if None not in rules else []
+        if (len(player) != 1
+                or any(r[1] not in game.z_order for r in player[0]['rewards'])
+                or (any(rule_cls is MoveableRule for rule_cls, _ in rules) and not player[0]['track'])):
+            program = None
+        else:
+            layer_chars = sorted(set(game.z_order).union(game._backdrop.palette))
+            program = MazeProgram(game.rows, game.cols, layer_chars, list(game.z_order),
+                [(sprite.character,) + rule for sprite, rule in zip(schedule, rules)])
+        _programs[key] = program
+    return _programs[key]
+
+
+class MazeEngine:
+    """Plays a `MazeProgram` for ``num_envs`` games at once.  Each game is
+    loaded from a made (not started) pycolab game and started with
+    ``its_showtime``; then ``play`` advances any subset of them a frame.
+    The board of every game is ``board[n]``, re-rendered in place each frame
+    like pycolab's, and sprites see the previous frame's board while
+    updating, as in a single pycolab update group."""
+
+    def __init__(self, program, num_envs=1):
+        self.program = program
+        self.num_envs = num_envs
+        self.chars = [char for char, _, _ in program.sprites]
+        self.player = self.chars.index('P')
+        S, H, W = len(self.chars), program.rows, program.cols
+        self.backdrop = np.zeros((num_envs, H, W), dtype=np.uint8)
+        self.board = np.zeros((num_envs, H, W), dtype=np.uint8)
+        self.positions = np.zeros((num_envs, S, 2), dtype=np.int64)
+        self.last_position = np.zeros((num_envs, 2), dtype=np.int64)
+        self.last_action = np.full(num_envs, -1, dtype=np.int64)
+        self.frame = np.full(num_envs, -1, dtype=np.int64)
+        self.game_over = np.zeros(num_envs, dtype=bool)
+        self.reward = np.zeros(num_envs)
+        self.has_reward = np.zeros(num_envs, dtype=bool)
+        self.played = np.zeros(num_envs, dtype=bool)  # Frames played ahead of `MazeGame.play`.
+        self.impassable = np.zeros((S, 256), dtype=bool)
+        self.rules = []
+        for s, (char, rule_cls, spec) in enumerate(program.sprites):
+            for c in spec.get('impassable', ()):
+                self.impassable[s, ord(c)] = True
+            self.rules.append(rule_cls(self, s, char, spec))
+        self._z_order = [(self.chars.index(c), ord(c)) for c in program.z_order]
+        self._all = np.arange(num_envs)
+
+    def load(self, n, game):
+        """Loads the made (not started) pycolab ``game`` into slot ``n``."""
+        self.backdrop[n] = game._backdrop.curtain
+        sprites = game._sprites_and_drapes
+        for rule in self.rules:
+            rule.load(n, sprites[rule.char])
+        self.last_action[n] = -1
+        self.frame[n] = -1
+        self.game_over[n] = False
+        self.played[n] = False
+
+    def its_showtime(self, idxs=None):
+        """Starts loaded games: renders them, then plays the first frame with
+        no action, as `Engine.its_showtime`."""
+        n = self._all if idxs is None else np.asarray(idxs)
+        self._render(n)
+        self.play(None, idxs)
+
+    def play(self, actions, idxs=None):
+        """Advances games ``idxs`` (default all) one frame under ``actions``
+        (one per game, or None); rewards are left in ``reward`` (with
+        ``has_reward`` False where nothing was reported)."""
+        n = self._all if idxs is None else np.asarray(idxs)
+        if actions is None:
+            actions = np.full(len(n), -1, dtype=np.int64)
+        actions = np.asarray(actions, dtype=np.int64)
+        self.frame[n] += 1
+        self.reward[n] = 0.
+        self.has_reward[n] = False
+        for rule in self.rules:
+            rule.update(n, actions)
+        self._render(n)
+
+    def move(self, n, s, directions):
+        """`MazeWalker` steps of sprite ``s`` in envs ``n``, blocked by its
+        impassables on the previous frame's board; returns where blocked."""
+        position = self.positions[n, s]
+        target = position + _DELTAS[directions]
+        blocked = self.impassable[s, self.board[n, target[:, 0], target[:, 1]]]
+        blocked &= directions != _STAY
+        self.positions[n, s] = np.where(blocked[:, None], position, target)
+        return blocked
+
+    def add_reward(self, n, values):
+        self.reward[n] += values
+        self.has_reward[n] = True
+
+    def randint(self, n, high):
+        """One draw in ``[0, high)`` for each of envs ``n``, from ``np.random``
+        (as `np.random.choice(high)` in a sprite)."""
+        return np.random.randint(0, high, size=len(n))
+
+    def rand(self, n):
+        """One uniform draw in ``[0, 1)`` for each of envs ``n``."""
+        return np.random.rand(len(n))
+
+    def _render(self, n):
+        self.board[n] = self.backdrop[n]
+        for s, code in self._z_order:
+            position = self.positions[n, s]
+            self.board[n, position[:, 0], position[:, 1]] = code
+
+
+class MazeLayers(Mapping):
+    """The layers of a board, computed when looked up."""
+
+    def __init__(self, board, chars):
+        self._board = board
+        self._chars = chars
+
+    def __getitem__(self, char):
+        if char not in self._chars:
+            raise KeyError(char)
+        return self._board == ord(char)
+
+    def __iter__(self):
+        return iter(self._chars)
+
+    def __len__(self):
+        return len(self._chars)
+
+
+class MazeSprite:
+    """A view of one sprite of one game, as the pycolab `Sprite`."""
+
+    def __init__(self, engine, n, s):
+        self._engine = engine
+        self._n = n
+        self._s = s
+        rule = engine.rules[s]
+        if isinstance(rule, MoveableRule) and rule.pushes:
+            self._pushes = rule.count
+
+    @property
+    def position(self):
+        row, col = self._engine.positions[self._n, self._s]
+        return plab_things.Sprite.Position(int(row), int(col))
+
+    @property
+    def visible(self):
+        return True
+
+    @property
+    def character(self):
+        return self._engine.chars[self._s]
+
+    @property
+    def pushes(self):
+        if not hasattr(self, '_pushes'):
+            raise AttributeError('pushes')  # Untracked, as on the sprite.
+        return int(self._pushes[self._n])
+
+
+class MazePlot:
+    """Stands in for the pycolab `Plot`: carries ``info`` and ``frame``."""
+
+    def __init__(self, engine, n):
+        self._engine = engine
+        self._n = n
+        self.info = {}
+
+    @property
+    def frame(self):
+        return int(self._engine.frame[self._n])
+
+
+class MazeGame:
+    """Game ``n`` of a `MazeEngine`, behind the interface of the pycolab
+    `Engine` the mazeworld envs use.  ``play`` collects the frame if a
+    `MazeVecEnv` already played it for the whole batch."""
+
+    def __init__(self, engine, n=0):
+        self.engine = engine
+        self.n = n
+        self._idxs = np.array([n])
+        self._actions = np.zeros(1, dtype=np.int64)
+        self._observation = rendering.Observation(board=engine.board[n],
+            layers=MazeLayers(engine.board[n], engine.program.layer_chars))
+        self.things = {c: MazeSprite(engine, n, s) for s, c in enumerate(engine.chars)}
+        self.the_plot = MazePlot(engine, n)
+
+    @property
+    def rows(self):
+        return self.engine.program.rows
+
+    @property
+    def cols(self):
+        return self.engine.program.cols
+
+    @property
+    def z_order(self):
+        return list(self.engine.program.z_order)
+
+    @property
+    def game_over(self):
+        return bool(self.engine.game_over[self.n])
+
+    def its_showtime(self):
+        self.engine.its_showtime(self._idxs)
+        return self._result()
+
+    def play(self, actions):
+        engine = self.engine
+        if engine.played[self.n]:
+            engine.played[self.n] = False
+        elif actions is None:
+            engine.play(None, self._idxs)
+        else:
+            self._actions[0] = actions
+            engine.play(self._actions, self._idxs)
+        return self._result()
+
+    def _result(self):
+        n = self.n
+        reward = float(self.engine.reward[n]) if self.engine.has_reward[n] else None
+        return self._observation, reward, 0. if self.engine.game_over[n] else 1.
+
+
+class MazeCropper:
+    """The egocentric `ScrollingCropper` (odd window, centring margins and a
+    pad character) over a `MazeGame`: the tracked player always sits in the
+    centre, so the window is sliced straight out of the engine's board."""
+
+    def __init__(self, rows, cols, pad_char):
+        self.rows = rows
+        self.cols = cols
+        self._pad_char = pad_char
+        self._board = np.empty((rows, cols), dtype=np.uint8)
+        self._game = None
+
+    @classmethod
+    def from_cropper(cls, cropper):
+        """The `MazeCropper` cropping as ``cropper``, or None."""
+        if (type(cropper) is not cropping.ScrollingCropper or cropper._to_track != ['P']
+                or cropper._pad_char is None or cropper._initial_offset != (0, 0)
+                or cropper._scroll_margins != (cropper.rows // 2, cropper.cols // 2)
+                or cropper.rows % 2 == 0 or cropper.cols % 2 == 0):
+            return None
+        return cls(cropper.rows, cropper.cols, cropper._pad_char)
+
+    def set_engine(self, game):
+        self._game = game
+        self._observation = rendering.Observation(board=self._board,
+            layers=MazeLayers(self._board, game.engine.program.layer_chars))
+
+    def crop(self, observation):
+        engine, n = self._game.engine, self._game.n
+        H, W = engine.board.shape[1:]
+        row, col = engine.positions[n, engine.player]
+        top, left = int(row) - self.rows // 2, int(col) - self.cols // 2
+        r0, r1 = max(top, 0), min(top + self.rows, H)
+        c0, c1 = max(left, 0), min(left + self.cols, W)
+        if r1 - r0 < self.rows or c1 - c0 < self.cols:
+            self._board.fill(ord(self._pad_char))
+        self._board[r0 - top:r1 - top, c0 - left:c1 - left] = engine.board[n, r0:r1, c0:c1]
+        return self._observation
+
+
+def make_maze_game(game, croppers, engine, n=0):
+    """Swaps a made (not started) pycolab ``game`` and its ``croppers`` for
+    game ``n`` of ``engine`` and `MazeCropper`s.  Returns them unchanged if
+    ``engine`` does not play this game or a cropper is not egocentric."""
+    maze_croppers = [MazeCropper.from_cropper(cropper) for cropper in croppers]
+    if compile_game(game) is not engine.program or None in maze_croppers:
+        return game, croppers
+    engine.load(n, game)
+    return MazeGame(engine, n), maze_croppers
+
+
+class MazeVecEnv(VecEnv):
+    """`VecEnv` for mazeworld envs which plays the games of all instances as
+    one `MazeEngine`: each step advances every (active) game in one batched
+    frame, then steps the envs as usual, which only collect their frame.
+    A game opts in by naming this class as its env's ``VecEnvCls`` (checked
+    against pycolab by the mazeworld tests); if the engine turns out not to
+    support it, its instances step through pycolab, with a warning."""
+
+    def __init__(self, envs):
+        super().__init__(envs)
+        self._games = [env.unwrapped for env in envs]
+        self._program = None  # Compiled from the first game made (some make_game mutate module art).
+        self.engine = None
+        for n, game in enumerate(self._games):
+            game.set_maze_vec_env(self, n)
+
+    def make_maze_game(self, n, game, croppers):
+        """`make_maze_game` into slot ``n`` of the engine, built for the
+        first game made."""
+        if self._program is None:
+            self._program = compile_game(game) or False
+            if self._program:
+                self.engine = MazeEngine(self._program, len(self.envs))
+            else:
+                warnings.warn('{} is not supported by the maze engine; playing '
+                    'it through pycolab.'.format(type(self._games[n]).__name__))
+        if self.engine is None:
+            return game, croppers
+        return make_maze_game(game, croppers, self.engine, n)
+
+    def step(self, action, active=None, out=None):
+        if self.engine is not None:
+            idxs = range(len(self.envs)) if active is None else np.flatnonzero(active)
+            idxs = [n for n in idxs if getattr(self._games[n].current_game, 'engine', None) is self.engine]
+            if idxs:
+                self.engine.play(np.asarray(action)[idxs], idxs)
+                self.engine.played[idxs] = True
+        return super().step(action, active, out)
+
+
+if __name__ == '__main__':
+    # Speed of a pycolab `VecEnv` and of a `MazeVecEnv` on a few mazeworld
+    # envs, and of the bare engine.  Parity with pycolab is checked by
+    # mazeworld/tests/maze_engine_test.py.
+    import time
+    from rlpyt.envs.mazeworld.mazeworld.envs import mazeworld_env
+
+    def make_envs(env_cls, B):
+        envs = [env_cls(obs_type='mask', max_iterations=60) for _ in range(B)]
+        for env in envs:
+            env.obs_init(resize_scale=1)
+            env.log_heatmaps, env.episodes, env.startup = False, 0, True
+        return envs
+
+    B, steps = 16, 500
+    for env_cls in [mazeworld_env.FiveRoom, mazeworld_env.FiveRoomXLAllStochExt,
+                    mazeworld_env.EightRoomXLWeather]:
+        for vec_env_cls in [VecEnv, MazeVecEnv]:
+            vec_env = vec_env_cls(make_envs(env_cls, B))
+            actions = np.random.randint(5, size=(steps, B))
+            start = time.time()
+            vec_env.reset()
+            for action in actions:
+                done = vec_env.step(action).done
+                if done.any():
+                    vec_env.reset(np.flatnonzero(done))
+            print('{:>22} {:>10} x{}: {:6.1f} us/env-step'.format(env_cls.__name__,
+                vec_env_cls.__name__, B, (time.time() - start) / (steps * B) * 1e6))
+    vec_env = MazeVecEnv(make_envs(mazeworld_env.FiveRoomXLAllStochExt, 1))
+    vec_env.reset()
+    program = vec_env.engine.program
+    for num_envs in [1, 16, 256]:
+        engine = MazeEngine(program, num_envs)
+        for n in range(num_envs):
+            engine.load(n, mazeworld_env.FiveRoomXLAllStochExt().make_game(reward_config={'a': 1.}))
+        engine.its_showtime()
+        actions = np.random.randint(4, size=(steps, num_envs))
+        start = time.time()
+        for action in actions:
+            engine.play(action)
+        print('MazeEngine.play x{:<4}: {:6.2f} us/env-step'.format(num_envs,
+            (time.time() - start) / (steps * num_envs) * 1e6))
@@ -59,6 +59,7 @@ from pycolab.examples import (maze,
                               piano_long
                               )
 from pycolab import cropping
+from . import maze_engine
 from . import pycolab_env
 
 #############################################################################################################################
@@ -68,6 +69,8 @@ class FiveRoom(pycolab_env.PyColabEnv):
     """Deepmind World Discovery Models experiment 1.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -103,6 +106,8 @@ class FiveRoomWhitenoise(pycolab_env.PyColabEnv):
     """A 5 room map with whitenoise background, and a fixed object.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -138,6 +143,8 @@ class FiveRoomFlipped(pycolab_env.PyColabEnv):
     """Deepmind World Discovery Models experiment 1, with the rooms flipped.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -173,6 +180,8 @@ class FiveRoomAll(pycolab_env.PyColabEnv):
     """Map with all four objects (white noise, brownian, Fixed, moveable)
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -208,6 +217,8 @@ class FiveRoomLong(pycolab_env.PyColabEnv):
     """A 5 room variant with a long corridor leading to another room.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -243,6 +254,8 @@ class FiveRoomLongunpadded(pycolab_env.PyColabEnv):
     """5 room map with a long corridor, with the sides not padded with walls.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -278,6 +291,8 @@ class FiveRoomLongwide(pycolab_env.PyColabEnv):
     """5 room maze with a wider long corridor.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -313,6 +328,8 @@ class FiveRoomLongExt(pycolab_env.PyColabEnv):
     """5 room maze with a long corridor and an extrinsic reward in the far room.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -348,6 +365,8 @@ class FiveRoomNoobj(pycolab_env.PyColabEnv):
     """5 room map with no objects.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -383,6 +402,8 @@ class FiveRoomOneobj(pycolab_env.PyColabEnv):
     """5 room map with a single fixed object.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -418,6 +439,8 @@ class FiveRoomOnewhite(pycolab_env.PyColabEnv):
     """5 room map with a white noise teleporter.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -454,6 +477,8 @@ class FiveRoomRandomfixed(pycolab_env.PyColabEnv):
     """5 room map with a randomly relocating fixed object.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -524,6 +549,8 @@ class FiveRoomBrownian(pycolab_env.PyColabEnv):
     """Deepmind World Discovery Models experiment 4.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -559,6 +586,8 @@ class Maze(pycolab_env.PyColabEnv):
     """Deepmind World Discovery Models experiment 5.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -595,6 +624,8 @@ class FiveRoomMoveable(pycolab_env.PyColabEnv):
     """A 5 room environment with a controllable object.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -631,6 +662,8 @@ class FiveRoomMoveableBrownian(pycolab_env.PyColabEnv):
     """A 5 room environment with a controllable object and a brownian object.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -667,6 +700,8 @@ class FiveRoomMoveableStoch(pycolab_env.PyColabEnv):
     """A 5 room environment with a stochastic controllable object.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -703,6 +738,8 @@ class FiveRoomExtInt(pycolab_env.PyColabEnv):
     """5 room map with an intrinsic attractor and an extrinsic attractor.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -739,6 +776,8 @@ class PianoLong(pycolab_env.PyColabEnv):
     """Piano map with no objects.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -778,6 +817,8 @@ class FiveRoomXL(pycolab_env.PyColabEnv):
     """Large version of the 5 room environment
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -813,6 +854,8 @@ class FiveRoomXLExtInt(pycolab_env.PyColabEnv):
     """5 room map with an intrinsic attractor and an extrinsic attractor.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -920,6 +963,8 @@ class FiveRoomXLWeather(pycolab_env.PyColabEnv):
     """Large version of the 5 room environment with a changing central background color.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -956,6 +1001,8 @@ class FiveRoomXLText(pycolab_env.PyColabEnv):
     """Large version of the 5 room environment, with textures.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -991,6 +1038,8 @@ class FiveRoomXLWhitenoise(pycolab_env.PyColabEnv):
     """Large version of the 5 room environment with a whitenoise background room.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1026,6 +1075,8 @@ class FiveRoomXLTextWhitenoise(pycolab_env.PyColabEnv):
     """Large version of the 5 room environment with textures and a whitenoise background room.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1061,6 +1112,8 @@ class FiveRoomXLRandomfixed(pycolab_env.PyColabEnv):
     """Large version of the 5 room environment with a fixed object that moves
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1096,6 +1149,8 @@ class FiveRoomXLTextRandomfixed(pycolab_env.PyColabEnv):
     """Large version of the 5 room environment with textures and a randomly initialized fixed.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1131,6 +1186,8 @@ class FiveRoomXLMoveable(pycolab_env.PyColabEnv):
     """Large version of the 5 room environment with a controllable object.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1166,6 +1223,8 @@ class FiveRoomXLMoveableExt(pycolab_env.PyColabEnv):
     """Large version of the 5 room environment with a controllable object and extrinsic target.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1202,6 +1261,8 @@ class FiveRoomXLTextMoveable(pycolab_env.PyColabEnv):
     and textures.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1237,6 +1298,8 @@ class FiveRoomXLMoveableStoch(pycolab_env.PyColabEnv):
     """Large version of the 5 room environment with a stochastic controllable.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1273,6 +1336,8 @@ class FiveRoomXLMoveableStochExt(pycolab_env.PyColabEnv):
     and an extrinsic reward target.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1309,6 +1374,8 @@ class FiveRoomXLTextMoveableStoch(pycolab_env.PyColabEnv):
     textured background.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1345,6 +1412,8 @@ class FiveRoomXLMoveableBrownian(pycolab_env.PyColabEnv):
     and a brownian object.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1381,6 +1450,8 @@ class FiveRoomXLTextMoveableBrownian(pycolab_env.PyColabEnv):
     a controllable object/brownian object.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1416,6 +1487,8 @@ class FiveRoomXLBrownian(pycolab_env.PyColabEnv):
     """Large version of the 5 room environment with a brownian object.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1452,6 +1525,8 @@ class FiveRoomXLTextBrownian(pycolab_env.PyColabEnv):
     a brownian object.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1488,6 +1563,8 @@ class FiveRoomXLAll(pycolab_env.PyColabEnv):
     a controllable, and a teleporter object.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1525,6 +1602,8 @@ class FiveRoomXLAllExt(pycolab_env.PyColabEnv):
     reward target is in the top room.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1561,6 +1640,8 @@ class FiveRoomXLAllStoch(pycolab_env.PyColabEnv):
     a teleporter, a fixed object, and a stochastic controllable.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1598,6 +1679,8 @@ class FiveRoomXLAllStochExt(pycolab_env.PyColabEnv):
     reward target is in the top room. 
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1635,6 +1718,8 @@ class FiveRoomXLTextAll(pycolab_env.PyColabEnv):
     textures included.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1674,6 +1759,8 @@ class EightRoom(pycolab_env.PyColabEnv):
     with the same color.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1711,6 +1798,8 @@ class EightRoomExt(pycolab_env.PyColabEnv):
     same color. One object gives an extrinsic reward.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1749,6 +1838,8 @@ class EightRoomRgb(pycolab_env.PyColabEnv):
     to 60 across channels.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1786,6 +1877,8 @@ class EightRoomDiff(pycolab_env.PyColabEnv):
     with a different color.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1824,6 +1917,8 @@ class EightRoomWeather(pycolab_env.PyColabEnv):
     extrinsic reward.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1863,6 +1958,8 @@ class EightRoomXLExt(pycolab_env.PyColabEnv):
     extrinsic reward.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1902,6 +1999,8 @@ class EightRoomXLWeather(pycolab_env.PyColabEnv):
     extrinsic reward.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1940,6 +2039,8 @@ class EightRoomHardExt(pycolab_env.PyColabEnv):
     object that has extrinsic reward.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -1979,6 +2080,8 @@ class EightRoomHardWeather(pycolab_env.PyColabEnv):
     extrinsic reward.
     """
 
+    VecEnvCls = maze_engine.MazeVecEnv
+
     def __init__(self,
                  level=0,
                  max_iterations=500,
@@ -8,18 +8,21 @@ import os
 import sys
 
 import abc
+import math
 import time
+import queue
 import numbers
+import threading
 import gym
 from gym import spaces
 from gym import logger
 from gym.utils import seeding
 
 import numpy as np
-from scipy.stats import entropy
 from collections import namedtuple
 
 from rlpyt.samplers.collections import TrajInfo
+from . import maze_engine
 import matplotlib.pyplot as plt
 
 EnvInfo = namedtuple("EnvInfo", ["visitation_frequency", "first_visit_time", "traj_done"])
@@ -157,6 +160,74 @@ def _repeat_axes(x, factor, axis=[0, 1]):
     return x_
 
 
+def _xlogx(x):
+    return x * math.log(x) if x > 0 else 0.
+
+
+class VisitationTracker(object):
+    """Visit counts of board cells, keeping the entropy (in base
+    `num_states`) and coverage of the visits up to date in O(1) per visit,
+    from the running sum of c*log(c) over the counts."""
+
+    def __init__(self, shape, num_states):
+        self.counts = np.zeros(shape)
+        self._num_states = num_states
+        self._log_base = math.log(num_states)
+        self._total = 0
+        self._visited = 0
+        self._sum_xlogx = 0.
+
+    def visit(self, row, col):
+        count = self.counts[row, col]
+        self.counts[row, col] = count + 1
+        self._total += 1
+        if count == 0:
+            self._visited += 1
+        self._sum_xlogx += _xlogx(count + 1) - _xlogx(count)
+
+    @property
+    def entropy(self):
+        if self._total == 0:
+            return 0.
+        return (math.log(self._total) - self._sum_xlogx / self._total) / self._log_base
+
+    @property
+    def coverage(self):
+        return self._visited / self._num_states
+
+
+class HeatmapWriter(object):
+    """Saves heatmaps as `.npy` and `.png` from a background thread, so that
+    env steps never wait on matplotlib or the disk."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def save(self, path, heatmap):
+        """Queues `heatmap` (no longer written by the caller) to `path` + ext."""
+        self._queue.put((path, heatmap))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, heatmap = item
+            try:
+                np.save('{}.npy'.format(path), heatmap)
+                heatmap_normed = heatmap / np.linalg.norm(heatmap)+0.0000000000000000001
+                plt.imsave('{}.png'.format(path), heatmap_normed, cmap='afmhot', vmin=0.0, vmax=1.0)
+            except Exception as e:
+                logger.warn('Could not save heatmap {}: {}'.format(path, e))
+
+    def close(self):
+        """Waits for the queued heatmaps to be saved."""
+        self._queue.put(None)
+        self._thread.join()
+
+
 class PyColabEnv(gym.Env):
 
     metadata = {
@@ -218,6 +289,8 @@ class PyColabEnv(gym.Env):
         self.np_random = None
         self._color_palette = color_palette
         self._colors = self.make_colors()
+        self._palette = self._make_palette()
+        self._paint_buffers = {}
         test_game = self.make_game(reward_config=self._reward_config)
         test_game.the_plot.info = {}
         observations, _, _ = test_game.its_showtime()
@@ -243,6 +316,8 @@ class PyColabEnv(gym.Env):
         self.visitable_states = visitable_states
 
         self.current_game = None
+        self._maze_vec_env = None
+        self._maze_slot = 0
         self._croppers = []
         self._state = None
 
@@ -256,6 +331,7 @@ class PyColabEnv(gym.Env):
 
         self.viewer = None
         self.delay = delay
+        self._heatmap_writer = None
 
         # Metrics
         self.visitation_frequency = {char:0 for char in self.objects}
@@ -267,7 +343,8 @@ class PyColabEnv(gym.Env):
     def heatmap_init(self, logdir, log_heatmaps):
         self.episodes = 0 # number of episodes run (to determine when to save heatmaps)
         self.heatmap_save_freq = 3 # save heatmaps every 3 episodes
-        self.heatmap = np.zeros((5, 5)) # stores counts each episode (5x5 is a placeholder)
+        self._visitation = VisitationTracker((5, 5), self.visitable_states) # counts each episode (5x5 is a placeholder)
+        self.heatmap = self._visitation.counts
         self.log_heatmaps = log_heatmaps
         root_path = os.path.abspath(__file__).split('/')[1:]
         root_path = root_path[:root_path.index('curiosity_baselines')+1]
@@ -285,6 +362,13 @@ class PyColabEnv(gym.Env):
     def obs_init(self, resize_scale):
         self.resize_scale = resize_scale
 
+    def set_maze_vec_env(self, vec_env, slot):
+        """From the next reset on, plays games as game ``slot`` of the engine
+        shared through ``maze_engine.MazeVecEnv`` ``vec_env`` (if it plays
+        this game; None for pycolab)."""
+        self._maze_vec_env = vec_env
+        self._maze_slot = slot
+
     @abc.abstractmethod
     def make_game(self):
         """Function that creates a new pycolab game.
@@ -366,53 +450,52 @@ class PyColabEnv(gym.Env):
             return True
         return False
 
-    def _paint_board(self, layers, cropped=False):
-        """Method to privately paint layers to RGB.
+    def _make_palette(self):
+        """Character code to RGB lookup table of the current colors."""
+        palette = np.zeros((256, 3), np.uint8)
+        for key, color in self._colors.items():
+            palette[ord(key)] = color
+        return palette
+
+    def _paint_board(self, board, scale=1):
+        """Method to privately paint a board to RGB.
 
         Args:
-            layers: a dictionary mapping a character to the respective curtain.
-            cropped: whether or not this is being called to paint cropped or
-                     uncropped images.
+            board: 2D np.array (np.uint8) of character codes.
+            scale: number of pixels per board cell.
 
         Returns:
-            3D np.array (np.uint32) representing the RGB of the observation
-                layers.
+            3D np.array (np.uint8) representing the RGB of the board, upscaled
+                by `scale`; a buffer reused by the next call with the same
+                board shape and scale.
         """
-        if not cropped:
-            board_shape = self._last_uncropped_observations.board.shape
-        else:
-            board_shape = self._last_cropped_observations.board.shape
-
-        board = np.zeros(list(board_shape) + [3], np.uint32)
-        board_mask = np.zeros(list(board_shape) + [3], np.bool)
-
-        for key in self._render_order:
-
-            color = self._colors.get(key, (0, 0, 0))
-            color = np.reshape(color, [1, 1, -1]).astype(np.uint32)
-
-            # Broadcast the layer to [H, W, C].
-            board_layer_mask = np.array(layers[key])[..., None]
-            board_layer_mask = np.repeat(board_layer_mask, 3, axis=-1)
-            
-            # @ correspond to white noise or changing background
-            perturbation = np.zeros(board_layer_mask.shape)
-            if key == '@':
-                if len(self._reward_switch) > 0:
-                    perturbation = self._switch_perturbations[self._switch]
-                else:
-                    h, w = board_layer_mask.shape[:2]
-                    perturbation = np.random.randint(-15,15, (h, w, 1))
-
-            # Update the board with the new layer.
-            board = np.where(
-                np.logical_not(board_mask),
-                board_layer_mask * color + perturbation,
-                board)
-
-            # Update the mask.
-            board_mask = np.logical_or(board_layer_mask, board_mask)
-        return board
+        key = (board.shape, scale)
+        if key not in self._paint_buffers:
+            h, w = board.shape
+            rows = np.arange(h * scale) // scale
+            cols = np.arange(w * scale) // scale
+            self._paint_buffers[key] = (
+                np.empty((h, w, 3), np.uint8),
+                rows[:, None] * w + cols[None, :], # upscaled pixel -> cell index map
+                np.empty((h * scale, w * scale, 3), np.uint8))
+        cells, index, pixels = self._paint_buffers[key]
+        self._palette.take(board, axis=0, out=cells)
+
+        # @ correspond to white noise or changing background
+        if '@' in self._render_order:
+            if len(self._reward_switch) > 0:
+                perturbation = np.asarray(self._switch_perturbations[self._switch])
+            else:
+                # Drawn for the whole board, keeping the np.random stream.
+                perturbation = np.random.randint(-15, 15, board.shape + (1,))
+            mask = board == ord('@')
+            if mask.any():
+                if perturbation.ndim == 3:
+                    perturbation = perturbation[mask]
+                cells[mask] = self._palette[ord('@')] + perturbation
+
+        cells.reshape(-1, 3).take(index, axis=0, out=pixels)
+        return pixels
 
     def _update_for_game_step(self, observations, reward):
         """Update internal state with data from an environment interaction."""
@@ -428,23 +511,18 @@ class PyColabEnv(gym.Env):
             self._state = np.array(self._state)
 
         elif 'rgb' in self.obs_type:
-            if self.obs_type == 'rgb':
-                rgb_img = self._paint_board(observations.layers, cropped=True).astype(float)
-            elif self.obs_type == 'rgb_full':
-                rgb_img = self._paint_board(observations.layers, cropped=False).astype(float)
-            self._state = self.resize(rgb_img)
+            self._state = self._paint_board(observations.board, self.resize_scale)
             for char in self.state_layer_chars:
                 if char in self.objects:
-                    mask = observations.layers[char].astype(float)
                     if self._check_visit(char):
                         self.visitation_frequency[char] += 1
 
         # update heatmap metric
         if self.log_heatmaps == True:
             pr, pc = self.current_game.things['P'].position
-            self.heatmap[pr, pc] += 1
-            self.visitation_entropy = entropy(self.heatmap.flatten(), base=self.visitable_states)
-            self.coverage = np.count_nonzero(self.heatmap) / self.visitable_states
+            self._visitation.visit(pr, pc)
+            self.visitation_entropy = self._visitation.entropy
+            self.coverage = self._visitation.coverage
 
         # update reward
         self._last_reward = reward if reward is not None else self._default_reward
@@ -514,9 +592,11 @@ class PyColabEnv(gym.Env):
             self._reward_config = {char:0.0 for char in self._reward_switch}
             self._reward_config[self._reward_switch[self._switch]] = 1.0
         self.current_game = self.make_game(reward_config=self._reward_config)
+        if self._maze_vec_env is not None:
+            self.current_game, self._croppers = self._maze_vec_env.make_maze_game(
+                self._maze_slot, self.current_game, self._croppers)
         for cropper in self._croppers:
             cropper.set_engine(self.current_game)
-        self._colors = self.make_colors()
         self.current_game.the_plot.info = {}
         self._game_over = None
         self._last_observations = None
@@ -528,7 +608,7 @@ class PyColabEnv(gym.Env):
         if len(self._croppers) > 0:
             observations = [cropper.crop(observations) for cropper in self._croppers][0]
             self._last_cropped_observations = observations
-            self._empty_cropped_board = np.zeros_like(self._last_cropped_observations)
+            self._empty_cropped_board = np.zeros_like(self._last_cropped_observations.board)
 
         # save and reset metrics
         for char in self.objects:
@@ -536,12 +616,13 @@ class PyColabEnv(gym.Env):
                 self.num_obj_eps[char] += 1
         self.visitation_frequency = {char:0 for char in self.objects}
         if self.log_heatmaps == True and self.episodes % self.heatmap_save_freq == 0 and self.startup == False:
-            np.save('{}/{}.npy'.format(self.heatmap_path, self.episodes), self.heatmap)
-            heatmap_normed = self.heatmap / np.linalg.norm(self.heatmap)+0.0000000000000000001
-            plt.imsave('{}/{}.png'.format(self.heatmap_path, self.episodes), heatmap_normed, cmap='afmhot', vmin=0.0, vmax=1.0)
+            if self._heatmap_writer is None:
+                self._heatmap_writer = HeatmapWriter()
+            self._heatmap_writer.save('{}/{}'.format(self.heatmap_path, self.episodes), self.heatmap)
         self.episodes += 1
         self.startup = False
-        self.heatmap = np.zeros(self._last_uncropped_observations.board.shape)
+        self._visitation = VisitationTracker(self._last_uncropped_observations.board.shape, self.visitable_states)
+        self.heatmap = self._visitation.counts
         
         # run update
         self._update_for_game_step(observations, reward)
@@ -561,13 +642,13 @@ class PyColabEnv(gym.Env):
         img = self._empty_uncropped_board
         if self._last_uncropped_observations:
             img = self._last_uncropped_observations.board
-            layers = self._last_uncropped_observations.layers
-            if self._colors:
-                img = self._paint_board(layers, cropped=False)
-            else:
+            if not self._colors:
                 assert img is not None, '`board` must not be `None`.'
 
-        img = self.resize(img, scale=17)
+        if self._last_uncropped_observations and self._colors:
+            img = self._paint_board(img, scale=17).copy()
+        else:
+            img = self.resize(img, scale=17)
 
         if mode == 'rgb_array':
             return img
@@ -602,7 +683,37 @@ class PyColabEnv(gym.Env):
         return [seed]
 
     def close(self):
-        """Tears down the renderer."""
+        """Tears down the renderer and saves any queued heatmaps."""
         if self.viewer:
             self.viewer.close()
             self.viewer = None
+        if self._heatmap_writer is not None:
+            self._heatmap_writer.close()
+            self._heatmap_writer = None
+
+
+if __name__ == '__main__':
+    # Reset latency, with each level's art parsed at every reset (as before
+    # pycolab's ascii_art cached its parses) and with the cached parse; for
+    # the pycolab env and for its slot of a `maze_engine.MazeVecEnv`.
+    # Run as `python -m rlpyt.envs.mazeworld.mazeworld.envs.pycolab_env`.
+    import timeit
+    from pycolab import ascii_art
+    from rlpyt.envs.mazeworld.mazeworld.envs import mazeworld_env
+
+    def parse_and_reset(reset):
+        ascii_art._parse_art.cache_clear()
+        return reset()
+
+    n = 1000
+    for name in ['FiveRoom', 'FiveRoomXLAllStochExt', 'EightRoomXLWeather', 'Maze']:
+        env = getattr(mazeworld_env, name)(obs_type='mask')
+        env.obs_init(resize_scale=17)
+        env.log_heatmaps, env.episodes, env.startup = False, 0, True
+        vec_env = maze_engine.MazeVecEnv([env])
+        for label, reset in [('pycolab', lambda: env.reset()), ('MazeVecEnv', lambda: vec_env.reset([0]))]:
+            reset()
+            before = timeit.timeit(lambda: parse_and_reset(reset), number=n) / n
+            after = timeit.timeit(reset, number=n) / n
+            print('{:>22} {:>10} reset: {:6.0f} us parsing each time, {:6.0f} us cached'.format(
+                name, label, before * 1e6, after * 1e6))
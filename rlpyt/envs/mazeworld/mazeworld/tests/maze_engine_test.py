@@ -0,0 +1,204 @@
+"""Tests of the array-native maze engine against pycolab."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import contextlib
+import random
+import sys
+import unittest
+import warnings
+from unittest import mock
+
+import numpy as np
+
+from rlpyt.envs.base import VecEnv, make_vec_env
+from rlpyt.envs.mazeworld.mazeworld.envs import maze_engine
+from rlpyt.envs.mazeworld.mazeworld.envs import mazeworld_env
+from rlpyt.envs.mazeworld.mazeworld.envs import pycolab_env
+
+ENV_CLASSES = [c for c in vars(mazeworld_env).values() if isinstance(c, type)
+    and issubclass(c, pycolab_env.PyColabEnv) and c is not pycolab_env.PyColabEnv]
+OPTED_IN = [c for c in ENV_CLASSES if getattr(c, 'VecEnvCls', None) is maze_engine.MazeVecEnv]
+
+
+def make_envs(env_cls, obs_type, B):
+    envs = [env_cls(obs_type=obs_type, max_iterations=60) for _ in range(B)]
+    for env in envs:
+        env.obs_init(resize_scale=1)
+        env.log_heatmaps, env.episodes, env.startup = False, 0, True
+    return envs
+
+
+def restore_arts(arts):
+    """Some make_game move objects by editing their module's art in place."""
+    for art, levels in arts:
+        for level, rows in zip(art, levels):
+            level[:] = rows
+
+
+class EnvStreams:
+    """A `np.random` state per env, swapped into the global `np.random` for
+    whatever is done for that env.  A pycolab `VecEnv` draws game by game and
+    a `MazeEngine` sprite by sprite, so only per-game streams let a batch of
+    stochastic games be compared frame for frame."""
+
+    def __init__(self, seed, B):
+        self._states = [np.random.RandomState(seed + b).get_state() for b in range(B)]
+        self._current = None
+
+    @contextlib.contextmanager
+    def env(self, b):
+        outer = self._current
+        if outer == b:
+            yield
+            return
+        if outer is not None:
+            self._states[outer] = np.random.get_state()
+        np.random.set_state(self._states[b])
+        self._current = b
+        try:
+            yield
+        finally:
+            self._states[b] = np.random.get_state()
+            self._current = outer
+            if outer is not None:
+                np.random.set_state(self._states[outer])
+
+    def randint(self, n, high):
+        draws = np.empty(len(n), dtype=np.int64)
+        for i, b in enumerate(n):
+            with self.env(b):
+                draws[i] = np.random.randint(0, high, size=1)[0]
+        return draws
+
+    def rand(self, n):
+        draws = np.empty(len(n))
+        for i, b in enumerate(n):
+            with self.env(b):
+                draws[i] = np.random.rand(1)[0]
+        return draws
+
+
+class StreamEnv:
+    """Env ``b``, reset and stepped on its stream of ``streams``."""
+
+    def __init__(self, env, streams, b):
+        self._env = env
+        self._streams = streams
+        self._b = b
+
+    def __getattr__(self, name):
+        return getattr(self._env, name)
+
+    def reset(self):
+        with self._streams.env(self._b):
+            return self._env.reset()
+
+    def step(self, action):
+        with self._streams.env(self._b):
+            return self._env.step(action)
+
+
+class MazeEngineTest(unittest.TestCase):
+
+    def setUp(self):
+        self._arts = [(module.MAZES_ART, [list(level) for level in module.MAZES_ART])
+            for name, module in list(sys.modules.items())
+            if name.startswith('pycolab.examples.') and hasattr(module, 'MAZES_ART')]
+
+    def run_envs(self, vec_env_cls, env_cls, obs_type, B, seed=0, steps=200):
+        """States, rewards, dones and push counts of ``B`` envs stepped with
+        random actions (and reset when done) through ``vec_env_cls``."""
+        restore_arts(self._arts)
+        random.seed(seed)
+        streams = EnvStreams(seed, B)
+        envs = [StreamEnv(env, streams, b)
+            for b, env in enumerate(make_envs(env_cls, obs_type, B))]
+        actions = np.random.RandomState(seed).randint(5, size=(steps, B))
+        with mock.patch.object(maze_engine.MazeEngine, 'randint',
+                    lambda engine, n, high: streams.randint(n, high)), \
+                mock.patch.object(maze_engine.MazeEngine, 'rand',
+                    lambda engine, n: streams.rand(n)):
+            vec_env = vec_env_cls(envs)
+            trace = [vec_env.reset().copy()]
+            for action in actions:
+                o, r, d, info = vec_env.step(action)
+                trace.append((o.copy(), r.copy(), d.copy(),
+                    [i.get('controllable_interactions') for i in info]))
+                if d.any():
+                    trace.append(vec_env.reset(np.flatnonzero(d)).copy())
+        return vec_env, trace
+
+    def assertSameTrace(self, expected, actual, msg):
+        if isinstance(expected, (tuple, list)):
+            self.assertEqual(len(expected), len(actual), msg)
+            for e, a in zip(expected, actual):
+                self.assertSameTrace(e, a, msg)
+        else:
+            self.assertTrue(np.array_equal(expected, actual), msg)
+
+    def testParity(self):
+        """Every opted-in env steps as through pycolab, in batches of
+        deterministic and of stochastic games, under each observation type."""
+        self.assertTrue(OPTED_IN)
+        for env_cls in OPTED_IN:
+            for obs_type in ['mask', 'rgb', 'rgb_full']:
+                with self.subTest(env=env_cls.__name__, obs_type=obs_type):
+                    _, expected = self.run_envs(VecEnv, env_cls, obs_type, B=4)
+                    vec_env, actual = self.run_envs(maze_engine.MazeVecEnv, env_cls, obs_type, B=4)
+                    self.assertIsNotNone(vec_env.engine)
+                    self.assertSameTrace(expected, actual, 'differs from pycolab')
+
+    def testSingleGameDraws(self):
+        """A lone game draws from the global `np.random` just as pycolab."""
+        for env_cls in [mazeworld_env.FiveRoomXLAllStochExt, mazeworld_env.FiveRoomMoveableStoch]:
+            traces = []
+            for vec_env_cls in [VecEnv, maze_engine.MazeVecEnv]:
+                restore_arts(self._arts)
+                np.random.seed(1)
+                random.seed(1)
+                vec_env = vec_env_cls(make_envs(env_cls, 'mask', 1))
+                trace = [vec_env.reset().copy()]
+                for action in np.random.RandomState(1).randint(5, size=(200, 1)):
+                    o, r, d, _ = vec_env.step(action)
+                    trace.append((o.copy(), r.copy(), d.copy()))
+                    if d.any():
+                        trace.append(vec_env.reset([0]).copy())
+                traces.append(trace)
+            self.assertSameTrace(traces[0], traces[1], env_cls.__name__)
+
+    def testOptIn(self):
+        """Envs which do not opt in keep the plain `VecEnv`."""
+        self.assertIs(type(make_vec_env(make_envs(mazeworld_env.FiveRoom, 'mask', 2))),
+            maze_engine.MazeVecEnv)
+        self.assertIs(type(make_vec_env(make_envs(mazeworld_env.FiveRoomBouncing, 'mask', 2))),
+            VecEnv)
+
+    def testUnsupportedFallsBack(self):
+        """A game the engine cannot play steps through pycolab, with a warning."""
+        vec_env = maze_engine.MazeVecEnv(make_envs(mazeworld_env.FiveRoomBouncing, 'mask', 2))
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            vec_env.reset()
+        self.assertIsNone(vec_env.engine)
+        self.assertTrue(any('pycolab' in str(w.message) for w in caught))
+        vec_env.step(np.zeros(2, dtype=np.int64))
+
+    def testUpdateLines(self):
+        """Comments are stripped from sprite code, but not a '#' in a string."""
+
+        class Sprite(object):
+
+            def update(self, actions, board, layers, backdrop, things, the_plot):
+                del actions  # Unused.
+                # A comment line.
+                self.impassable = '#'  # A wall.
+
+        self.assertEqual(maze_engine._update_lines(Sprite),
+            ['del actions', "self.impassable = '#'"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,6 +18,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import functools
 import itertools
 
 import numpy as np
@@ -213,19 +214,66 @@ def ascii_art_to_game(art,
 
   ### 3. Convert all ASCII art to numpy arrays ###
 
-  # Now convert the ASCII art array to a numpy array of uint8s.
-  art = ascii_art_to_uint8_nparray(art)
+  if (isinstance(what_lies_beneath, str) and isinstance(art, (list, tuple)) and
+      all(isinstance(row, str) for row in art) and
+      all(ord(character) < 128 for character in sprites) and
+      not set(sprites).intersection(drapes)):
+    # Sprites move from game to game (many games place them at random), but
+    # the rest of the art seldom changes, so we only parse the art with the
+    # Sprites cleared out when we haven't seen it before. Sprite locations are
+    # found in the strings themselves.
+    clear_sprites = {ord(character): what_lies_beneath for character in sprites}
+    backdrop_art, drape_masks, backdrop_characters = _parse_art(
+        tuple(row.translate(clear_sprites) for row in art), what_lies_beneath,
+        tuple(sorted(drapes)))
+    backdrop_art = backdrop_art.copy()
+    drape_masks = {character: mask.copy()
+                   for character, mask in six.iteritems(drape_masks)}
+    flat_art, cols = ''.join(art), len(art[0])
+    sprite_positions = {}
+    for character in sprites:
+      index = flat_art.find(character)
+      if index >= 0 and flat_art.find(character, index + 1) >= 0:
+        raise ValueError('sprite character {} can appear in at most one place '
+                         'in art.'.format(character))
+      sprite_positions[character] = (
+          divmod(index, cols) if index >= 0 else (0, 0))
 
-  # In preparation for masking out sprites and drapes from the ASCII art array
-  # (to make the background), do similar for what_lies_beneath.
-  if isinstance(what_lies_beneath, str):
-    what_lies_beneath = np.full_like(art, ord(what_lies_beneath))
   else:
-    what_lies_beneath = ascii_art_to_uint8_nparray(what_lies_beneath)
-    if art.shape != what_lies_beneath.shape:
-      raise ValueError(
-          'if not a single ASCII character, what_lies_beneath must be ASCII '
-          'art whose shape is the same as that of the ASCII art in art.')
+    # Now convert the ASCII art array to a numpy array of uint8s.
+    backdrop_art = ascii_art_to_uint8_nparray(art)
+
+    # In preparation for masking out sprites and drapes from the ASCII art
+    # array (to make the background), do similar for what_lies_beneath.
+    if isinstance(what_lies_beneath, str):
+      what_lies_beneath = np.full_like(backdrop_art, ord(what_lies_beneath))
+    else:
+      what_lies_beneath = ascii_art_to_uint8_nparray(what_lies_beneath)
+      if backdrop_art.shape != what_lies_beneath.shape:
+        raise ValueError(
+            'if not a single ASCII character, what_lies_beneath must be ASCII '
+            'art whose shape is the same as that of the ASCII art in art.')
+
+    drape_masks = {}
+    sprite_positions = {}
+    for character in flat_update_schedule:
+      # Find locations where this character appears in the ASCII art.
+      mask = backdrop_art == ord(character)
+      if character in drapes:
+        drape_masks[character] = mask
+      if character in sprites:
+        # Get the location of the sprite in the ASCII art, if there was one.
+        row, col = np.where(mask)
+        if len(row) > 1:
+          raise ValueError('sprite character {} can appear in at most one '
+                           'place in art.'.format(character))
+        # If there was a location, convert it to integer values; otherwise,
+        # 0,0. gpylint doesn't know how implicit bools work with numpy arrays...
+        sprite_positions[character] = (
+            (int(row[0]), int(col[0])) if len(row) > 0 else (0, 0))  # pylint: disable=g-explicit-length-test
+      # Clear out the newly-found Sprite or Drape from the ASCII art.
+      backdrop_art[mask] = what_lies_beneath[mask]
+    backdrop_characters = ''.join(chr(c) for c in np.unique(backdrop_art))
 
   ### 4. Other miscellaneous preparation ###
 
@@ -240,42 +288,29 @@ def ascii_art_to_game(art,
 
   ### 5. Construct engine; populate with Sprites and Drapes ###
 
-  game = engine.Engine(*art.shape, occlusion_in_layers=occlusion_in_layers)
+  game = engine.Engine(*backdrop_art.shape,
+                       occlusion_in_layers=occlusion_in_layers)
 
   # Sprites and Drapes are added according to the depth-first traversal of the
   # update schedule.
   for character in flat_update_schedule:
     # Switch to this character's update group.
     game.update_group(update_group_for[character])
-    # Find locations where this character appears in the ASCII art.
-    mask = art == ord(character)
 
     if character in drapes:
       # Add the drape to the Engine.
       partial = drapes[character]
-      game.add_prefilled_drape(character, mask,
+      game.add_prefilled_drape(character, drape_masks[character],
                                partial.pycolab_thing,
                                *partial.args, **partial.kwargs)
 
     if character in sprites:
-      # Get the location of the sprite in the ASCII art, if there was one.
-      row, col = np.where(mask)
-      if len(row) > 1:
-        raise ValueError('sprite character {} can appear in at most one place '
-                         'in art.'.format(character))
-      # If there was a location, convert it to integer values; otherwise, 0,0.
-      # gpylint doesn't know how implicit bools work with numpy arrays...
-      row, col = (int(row), int(col)) if len(row) > 0 else (0, 0)  # pylint: disable=g-explicit-length-test
-
       # Add the sprite to the Engine.
       partial = sprites[character]
-      game.add_sprite(character, (row, col),
+      game.add_sprite(character, sprite_positions[character],
                       partial.pycolab_thing,
                       *partial.args, **partial.kwargs)
 
-    # Clear out the newly-added Sprite or Drape from the ASCII art.
-    art[mask] = what_lies_beneath[mask]
-
   ### 6. Impose specified Z-order ###
 
   game.set_z_order(z_order)
@@ -283,8 +318,8 @@ def ascii_art_to_game(art,
   ### 7. Add the Backdrop to the engine ###
 
   game.set_prefilled_backdrop(
-      characters=''.join(chr(c) for c in np.unique(art)),
-      prefill=art.view(np.uint8),
+      characters=backdrop_characters,
+      prefill=backdrop_art.view(np.uint8),
       backdrop_class=backdrop.pycolab_thing,
       *backdrop.args, **backdrop.kwargs)
 
@@ -292,6 +327,32 @@ def ascii_art_to_game(art,
   return game
 
 
+@functools.lru_cache(maxsize=128)
+def _parse_art(art, what_lies_beneath, drape_characters):
+  """Parses ASCII art for `ascii_art_to_game`, remembering recent results.
+
+  Args:
+    art: a tuple of strings: the ASCII art diagram, with the characters of all
+        `Sprite`s already replaced by `what_lies_beneath`.
+    what_lies_beneath: a single-character ASCII string.
+    drape_characters: a tuple of the characters of all `Drape`s.
+
+  Returns:
+    A 3-tuple: the `Backdrop` art as a 2-D uint8 numpy array; a dict mapping
+    each of `drape_characters` to its mask; and a string of the characters in
+    the `Backdrop` art. The arrays are read-only and shared between calls, so
+    callers must copy them.
+  """
+  art = ascii_art_to_uint8_nparray(art)
+  drape_masks = {}
+  for character in drape_characters:
+    mask = drape_masks[character] = art == ord(character)
+    art[mask] = ord(what_lies_beneath)
+    mask.flags.writeable = False
+  art.flags.writeable = False
+  return art, drape_masks, ''.join(chr(c) for c in np.unique(art))
+
+
 def ascii_art_to_uint8_nparray(art):
   """Construct a numpy array of dtype `uint8` from an ASCII art diagram.
 
@@ -24,7 +24,10 @@ from __future__ import print_function
 import sys
 import unittest
 
+import numpy as np
+
 from pycolab import ascii_art
+from pycolab.tests import test_things as tt
 
 import six
 
@@ -58,6 +61,36 @@ class AsciiArtTest(unittest.TestCase):
         TypeError, 'Did you pass a list of list of single characters?'):
       _ = ascii_art.ascii_art_to_uint8_nparray(art)
 
+  def testGamesFromRepeatedArt(self):
+    """Checks games made from art whose Sprites move between calls."""
+    def make_game(art):
+      return ascii_art.ascii_art_to_game(
+          art, what_lies_beneath='.',
+          sprites=dict(P=tt.TestSprite, Q=tt.TestSprite),
+          drapes=dict(d=tt.TestDrape),
+          update_schedule='PQd', z_order='dQP')
+
+    first = make_game(['#P.d', '#.dQ'])
+    second = make_game(['#.Pd', '#Qd.'])  # Same art with the Sprites cleared.
+    self.assertEqual(first.things['P'].position, (0, 1))
+    self.assertEqual(second.things['P'].position, (0, 2))
+    self.assertEqual(second.things['Q'].position, (1, 1))
+    self.assertIsInstance(second.things['Q'].position.row, int)
+
+    # Drape curtains and Backdrop arrays are never shared between games.
+    second.things['d'].curtain[0, 0] = True
+    np.testing.assert_array_equal(first.things['d'].curtain,
+                                  [[False, False, False, True],
+                                   [False, False, True, False]])
+    self.assertIsNot(first.backdrop.curtain, second.backdrop.curtain)
+    np.testing.assert_array_equal(second.backdrop.curtain,
+                                  [[ord(c) for c in '#...'],
+                                   [ord(c) for c in '#...']])
+
+    # A Sprite appearing twice is still an error.
+    with six.assertRaisesRegex(self, ValueError, 'at most one place'):
+      make_game(['#PPd', '#.d.'])
+
 
 def main(argv=()):
   del argv  # Unused.
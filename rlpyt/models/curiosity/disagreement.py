@@ -25,13 +25,16 @@ class Disagreement(nn.Module):
             obs_stats=None,
             device="cpu",
             forward_loss_wt=0.2,
-            forward_model='res'
+            forward_model='res',
+            cache_features=False
             ):
         super(Disagreement, self).__init__()
 
         self.ensemble_size = ensemble_size
         self.beta = prediction_beta
         self.feature_encoding = feature_encoding
+        # The encoder never receives gradients here, so its features can be reused by the loss
+        self.cache_features = cache_features and feature_encoding != 'none' and not batch_norm
         self.obs_stats = obs_stats
         self.device = torch.device("cuda:0" if device == "gpu" else "cpu")
 
@@ -55,17 +58,20 @@ class Disagreement(nn.Module):
                 self.encoder = MazeHead(image_shape=image_shape, output_size=self.feature_size, batch_norm=batch_norm)
 
         if forward_model == 'res':
-            fmodel_class = ResForward
+            fmodel_class = EnsembleResForward
         elif forward_model == 'og':
-            fmodel_class = OgForward
+            fmodel_class = EnsembleOgForward
 
-        self.forward_model_1 = fmodel_class(feature_size=self.feature_size, action_size=action_size).to(self.device)
-        self.forward_model_2 = fmodel_class(feature_size=self.feature_size, action_size=action_size).to(self.device)
-        self.forward_model_3 = fmodel_class(feature_size=self.feature_size, action_size=action_size).to(self.device)
-        self.forward_model_4 = fmodel_class(feature_size=self.feature_size, action_size=action_size).to(self.device)
-        self.forward_model_5 = fmodel_class(feature_size=self.feature_size, action_size=action_size).to(self.device)
+        # all members of the ensemble are evaluated together, see EnsembleLinear
+        self.forward_model = fmodel_class(ensemble_size=self.ensemble_size, feature_size=self.feature_size, action_size=action_size).to(self.device)
 
-    def forward(self, obs1, obs2, action):
+    def forward(self, obs1, obs2, action, features=None):
+
+        if features is not None:
+            # cached (phi1, phi2) from compute_bonus
+            lead_dim, T, B, _ = infer_leading_dims(features[0], 1)
+            phi1, phi2 = (f.view(T, B, -1) for f in features)
+            return phi1, phi2, self._predict(phi1, action.view(T, B, -1))
 
         if self.obs_stats is not None:
             img1 = (obs1 - self.obs_mean) / (self.obs_std+1e-10)
@@ -89,52 +95,29 @@ class Disagreement(nn.Module):
             phi1 = phi1.view(T, B, -1) # make sure you're not mixing data up here
             phi2 = phi2.view(T, B, -1)
 
-        predicted_phi2 = []
-
-        predicted_phi2.append(self.forward_model_1(phi1.detach(), action.view(T, B, -1).detach()))
-        predicted_phi2.append(self.forward_model_2(phi1.detach(), action.view(T, B, -1).detach()))
-        predicted_phi2.append(self.forward_model_3(phi1.detach(), action.view(T, B, -1).detach()))
-        predicted_phi2.append(self.forward_model_4(phi1.detach(), action.view(T, B, -1).detach()))
-        predicted_phi2.append(self.forward_model_5(phi1.detach(), action.view(T, B, -1).detach()))
-        predicted_phi2_stacked = torch.stack(predicted_phi2)
+        return phi1, phi2, self._predict(phi1, action.view(T, B, -1))
 
-        return phi2, predicted_phi2, predicted_phi2_stacked
+    def _predict(self, phi1, action):
+        return self.forward_model(phi1.detach(), action.detach()) # (ensemble_size, T, B, feature_size)
 
-    def compute_bonus(self, observations, next_observations, actions):
-        _, _, predicted_phi2_stacked = self.forward(observations, next_observations, actions)
-        feature_var = torch.var(predicted_phi2_stacked, dim=0) # feature variance across forward models
+    def compute_bonus(self, observations, next_observations, actions, return_features=False):
+        phi1, phi2, predicted_phi2 = self.forward(observations, next_observations, actions)
+        feature_var = torch.var(predicted_phi2, dim=0) # feature variance across forward models
         reward = torch.mean(feature_var, axis=-1) # mean over feature
+        if return_features:
+            return self.beta * reward, (phi1, phi2)
         return self.beta * reward
 
-    def compute_loss(self, observations, next_observations, actions, valid):
+    def compute_loss(self, observations, next_observations, actions, valid, features=None):
         #------------------------------------------------------------#
         # hacky dimension add for when you have only one environment (debugging)
         if actions.dim() == 2: 
             actions = actions.unsqueeze(1)
         #------------------------------------------------------------#
-        phi2, predicted_phi2, _ = self.forward(observations, next_observations, actions)
+        _, phi2, predicted_phi2 = self.forward(observations, next_observations, actions, features)
         
-        forward_loss = torch.tensor(0.0, device=self.device)
-
-        forward_loss_1 = nn.functional.dropout(nn.functional.mse_loss(predicted_phi2[0], phi2.detach(), reduction='none'), p=0.2).sum(-1)/self.feature_size
-        forward_loss += valid_mean(forward_loss_1, valid)
-
-        forward_loss_2 = nn.functional.dropout(nn.functional.mse_loss(predicted_phi2[1], phi2.detach(), reduction='none'), p=0.2).sum(-1)/self.feature_size
-        forward_loss += valid_mean(forward_loss_2, valid)
-
-        forward_loss_3 = nn.functional.dropout(nn.functional.mse_loss(predicted_phi2[2], phi2.detach(), reduction='none'), p=0.2).sum(-1)/self.feature_size
-        forward_loss += valid_mean(forward_loss_3, valid)
-
-        forward_loss_4 = nn.functional.dropout(nn.functional.mse_loss(predicted_phi2[3], phi2.detach(), reduction='none'), p=0.2).sum(-1)/self.feature_size
-        forward_loss += valid_mean(forward_loss_4, valid)
-
-        forward_loss_5 = nn.functional.dropout(nn.functional.mse_loss(predicted_phi2[4], phi2.detach(), reduction='none'), p=0.2).sum(-1)/self.feature_size
-        forward_loss += valid_mean(forward_loss_5, valid)
+        forward_losses = nn.functional.dropout(nn.functional.mse_loss(predicted_phi2, phi2.detach().expand_as(predicted_phi2), reduction='none'), p=0.2).sum(-1)/self.feature_size
+        # sum over members of each member's valid mean (valid is shared by all members)
+        forward_loss = self.ensemble_size * valid_mean(forward_losses.mean(dim=0), valid)
 
         return self.forward_loss_wt*forward_loss
-
-
-
-
-
-
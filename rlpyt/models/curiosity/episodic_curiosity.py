@@ -1,4 +1,5 @@
 import logging
+import numpy as np
 import torch
 from torch import nn
 
@@ -23,7 +24,9 @@ class EpisodicCuriosity(nn.Module):
           feature_encoding='idf_burda', 
           batch_norm=False,
           prediction_beta=1.0,
-          obs_stats=None
+          obs_stats=None,
+          approx_dim=None,
+          approx_candidates=4
           ):
       """Episodic curiosity model (see https://arxiv.org/pdf/2002.06038.pdf)
 
@@ -41,6 +44,9 @@ class EpisodicCuriosity(nn.Module):
           batch_norm (bool, optional): flag for batch normalization in the encoder. Defaults to False.
           prediction_beta (float, optional): weight coefficient of curiosity reward. Defaults to 1.0.
           obs_stats (RunningMeanStd, optional): for normalizing the observation (usually used in MuJoCo). Defaults to None.
+          approx_dim (int, optional): if set, neighbours are searched in a fixed random projection of the features to this
+                    many dimensions (approximate kNN for large memories), and the candidates are re-ranked exactly. Defaults to None.
+          approx_candidates (int, optional): number of candidates per neighbour kept from the approximate search. Defaults to 4.
       """
       super(EpisodicCuriosity, self).__init__()
       self.image_shape = image_shape
@@ -52,6 +58,8 @@ class EpisodicCuriosity(nn.Module):
       self.eps = eps
       self.c = c
       self.max_similarity = max_similarity
+      self.approx_dim = approx_dim
+      self.approx_candidates = approx_candidates
       self.prediction_beta = prediction_beta
       self.feature_encoding = feature_encoding
       self.obs_stats = obs_stats
@@ -77,29 +85,48 @@ class EpisodicCuriosity(nn.Module):
           nn.Linear(self.feature_size, action_size)
           )
 
+      if self.approx_dim is not None:
+          # fixed Johnson-Lindenstrauss projection, scaled to preserve distances in expectation
+          self.projection = torch.randn(self.feature_size, self.approx_dim) / np.sqrt(self.approx_dim)
+
       self.reset_all()
     
     def reset_all(self):
       """Reset memory and its related variables for all parallel environments.
       """
-      # TODO: make sure model.to(device) work on this
+      device = self.memory.device if hasattr(self, 'memory') else 'cpu'
       # Memory is a circular buffer
-      self.memory = torch.zeros((self.num_envs, self.memory_size, self.feature_size))    
+      self.memory = torch.zeros((self.num_envs, self.memory_size, self.feature_size), device=device)
+      if self.approx_dim is not None:
+        self.projected_memory = torch.zeros((self.num_envs, self.memory_size, self.approx_dim), device=device)
       # How many elements are in the memory
       self.n_elements_in_memory = np.zeros(self.num_envs, dtype=np.int32)
       # The position of the cursor
       self.cursor = np.zeros(self.num_envs, dtype=np.int32)
       # Running average of euclidean distance of k-nearest neighbors (d^2_m in the paper)
-      self.knn_distance_running_mean = torch.zeros((self.num_envs, self.n_nearest_neighbors,))
-      # Number of kNN queries for calculating running mean
-      self.n_knn_queries = np.zeros(self.num_envs, dtype=np.int32)
+      self.knn_distance_running_mean = torch.zeros((self.num_envs, self.n_nearest_neighbors,), device=device)
+      # Number of kNN queries for calculating running mean (per neighbor, as small memories have fewer than k neighbors)
+      self.n_knn_queries = torch.zeros((self.num_envs, self.n_nearest_neighbors,), device=device)
 
     def reset(self, env_idx):
-      self.memory[env_idx] = torch.zeros((self.memory_size, self.feature_size))  
+      self.memory[env_idx] = 0.
+      if self.approx_dim is not None:
+        self.projected_memory[env_idx] = 0.
       self.n_elements_in_memory[env_idx] = 0
       self.cursor[env_idx] = 0
-      self.knn_distance_running_mean[env_idx] = torch.zeros((self.n_nearest_neighbors,))
-      self.n_knn_queries[env_idx] = 0   
+      self.knn_distance_running_mean[env_idx] = 0.
+      self.n_knn_queries[env_idx] = 0.
+
+    def _to(self, device):
+      """Moves the memory to the device of the encoded states (the memory is not a module buffer, so
+      that it stays out of the state dict)."""
+      if self.memory.device != device:
+        self.memory = self.memory.to(device)
+        self.knn_distance_running_mean = self.knn_distance_running_mean.to(device)
+        self.n_knn_queries = self.n_knn_queries.to(device)
+        if self.approx_dim is not None:
+          self.projection = self.projection.to(device)
+          self.projected_memory = self.projected_memory.to(device)
 
     def _encode(self, observation):
       """Encode a batch of observation by self.enoder
@@ -139,17 +166,24 @@ class EpisodicCuriosity(nn.Module):
       assert observations.shape[0] == self.num_envs # T must be equal to self.num_envs
       assert len(observations.shape) == (2 + len(self.image_shape)) # (T, B,) + image_shape
 
-      encoded_states = self._encode(observations)
+      encoded_states = self._encode(observations).detach()
 
       T, B = encoded_states.shape[:2]
       assert T == self.num_envs
-
-      for env_idx in range(T):
-        for batch_idx in range(B):
-          self.memory[env_idx, self.cursor[env_idx]] = encoded_states[env_idx, batch_idx]
-          self.cursor[env_idx] = (self.cursor[env_idx] + 1) % self.memory_size
-          self.n_elements_in_memory[env_idx] = min(self.n_elements_in_memory[env_idx] + 1, self.memory_size)
-          logging.debug('env_idx={}; memory_size={}; n_elements_in_memory={}; cursor={};'.format(env_idx, self.memory_size, self.n_elements_in_memory[env_idx], self.cursor[env_idx]))
+      self._to(encoded_states.device)
+
+      # Write all B elements of every env at once; only the last memory_size elements survive the wrap.
+      n_write = min(B, self.memory_size)
+      offsets = np.arange(B - n_write, B)
+      slots = (self.cursor[:, None] + offsets[None, :]) % self.memory_size # (T, n_write)
+      env_idxs = np.repeat(np.arange(T)[:, None], n_write, axis=1)
+      slots, env_idxs = torch.from_numpy(slots).long().to(self.memory.device), torch.from_numpy(env_idxs).long().to(self.memory.device)
+      self.memory[env_idxs, slots] = encoded_states[:, B - n_write:]
+      if self.approx_dim is not None:
+        self.projected_memory[env_idxs, slots] = torch.matmul(encoded_states[:, B - n_write:], self.projection)
+      self.cursor = ((self.cursor + B) % self.memory_size).astype(np.int32)
+      self.n_elements_in_memory = np.minimum(self.n_elements_in_memory + B, self.memory_size).astype(np.int32)
+      logging.debug('memory_size={}; n_elements_in_memory={}; cursor={};'.format(self.memory_size, self.n_elements_in_memory, self.cursor))
 
     def compute_episodic_curiosity_reward(self, observations):
       """Compute the episodic curiosity reward r^{episodic}_t by k-nearest negihbor lookup in the self.memory
@@ -163,49 +197,90 @@ class EpisodicCuriosity(nn.Module):
                   The shape is (T, B,)
       """
          
-      encoded_states = self._encode(observations)
+      encoded_states = self._encode(observations).detach()
 
       T, B = encoded_states.shape[:2]
       assert T == self.num_envs
+      self._to(encoded_states.device)
+      device = encoded_states.device
+
+      # Retrieve N_k and d^2(f(x_t), N_k[i]) for every query at once (NOTE: they use squared euclidean distance)
+      knn_distances, knn_valid = self._knn(encoded_states) # (T, B, k)
+      has_memory = torch.from_numpy(self.n_elements_in_memory > 0).to(device)
+
+      # Update the running average of distances (d^2_m), as if the B queries of each env were made one by one
+      knn_valid = knn_valid & has_memory[:, None, None]
+      valid = knn_valid.float()
+      counts = self.n_knn_queries[:, None] + torch.cumsum(valid, dim=1)
+      sums = (self.n_knn_queries * self.knn_distance_running_mean)[:, None] + torch.cumsum(knn_distances * valid, dim=1)
+      running_means = sums / counts.clamp(min=1.0) # d^2_m seen by each query
+      self.n_knn_queries = counts[:, -1]
+      self.knn_distance_running_mean = running_means[:, -1]
+
+      # Normalize the distance d_n = d_k / d^2_m
+      normalized_knn_distances = knn_distances / running_means
+
+      # Cluster distance
+      normalized_knn_distances = torch.clamp(normalized_knn_distances - self.cluster_distance, min=0.0, max=INF)
+
+      # Compute kernel values K_v (missing neighbors contribute nothing)
+      kernel_values = torch.where(knn_valid, self.eps / (normalized_knn_distances + self.eps), torch.zeros_like(knn_distances))
+
+      # Compute similarity scores between f(x_t) and N_k
+      similarity = torch.sqrt(torch.sum(kernel_values, dim=-1)) + self.c
+      rewards = torch.where(similarity > self.max_similarity, torch.zeros_like(similarity), 1.0 / similarity)
 
       # TODO: what's a better initialization for each parallel environment when memory of that environment is empty?
       #       for now, I initialize them as one since we 1.0 means no changes in multiplication (i.e., multiply with lifelong curiosity)
-      similarities = np.ones((T, B))
-
-      for env_idx in range(T):
-        available_memory_size = min(self.memory_size, self.n_elements_in_memory[env_idx])
-        if available_memory_size == 0:
-          continue
-        for batch_idx in range(B):         
-          # Retrieve N_k and d(f(x_t), N_k[i])
-          euclidean_distances = torch.sqrt(torch.sum((self.memory[env_idx, :available_memory_size, :] - encoded_states[env_idx, batch_idx, ...])**2, dim=-1))
-          knn_elements_indices = torch.argsort(euclidean_distances, descending=True, dim=-1)[:self.n_nearest_neighbors]
-          
-          # Compute d_k[i] = d^2(f(x_t), N_k[i])
-          knn_distances = euclidean_distances[knn_elements_indices]**2 # NOTE: they use squared euclidean distance
-          
-          # Update the running average of distances (d^2_m)
-          self.n_knn_queries[env_idx] += 1
-          self.knn_distance_running_mean[env_idx] += (1.0 / self.n_knn_queries[env_idx]) * (knn_distances - self.knn_distance_running_mean[env_idx])
-
-          # Normalize the distance d_n = d_k / d^2_m
-          normalized_knn_distances = knn_distances / self.knn_distance_running_mean[env_idx]
-
-          # Cluster distance
-          normalized_knn_distances = torch.clamp(normalized_knn_distances - self.cluster_distance, min=0.0, max=INF)
-
-          # Compute kernel values K_v
-          kernel_values = self.eps / (normalized_knn_distances + self.eps)
-
-          # Compute similarity scores between f(x_t) and N_k
-          similarity = (torch.sqrt(torch.sum(kernel_values)) + self.c).detach().cpu().numpy()
-
-          if similarity > self.max_similarity:
-            similarities[env_idx, batch_idx] = 0
-          else:
-            similarities[env_idx, batch_idx] = 1.0 / similarity
-
-      return similarities 
+      rewards = torch.where(has_memory[:, None], rewards, torch.ones_like(rewards))
+
+      return rewards.cpu().numpy()
+
+    def _knn(self, encoded_states):
+      """Batched k-nearest neighbor search of each query in its own env's memory.
+
+      Args:
+          encoded_states ([torch.Tensor]): queries of shape (T, B, feature_size), T is the number of envs.
+
+      Returns:
+          [torch.Tensor]: squared euclidean distances to the k nearest neighbors, (T, B, k), ascending.
+          [torch.Tensor]: boolean mask of which of the k neighbors exist (fewer than k elements in memory).
+      """
+      T, B = encoded_states.shape[:2]
+      k = min(self.n_nearest_neighbors, self.memory_size)
+      device = encoded_states.device
+      n_elements = torch.from_numpy(self.n_elements_in_memory.astype(np.int64)).to(device)
+      empty_slots = torch.arange(self.memory_size, device=device)[None, :] >= n_elements[:, None] # (T, memory_size)
+
+      if self.approx_dim is None:
+        distances = self._squared_distances(encoded_states, self.memory)
+        distances = distances.masked_fill(empty_slots[:, None, :], INF)
+        knn_distances, _ = torch.topk(distances, k, dim=-1, largest=False)
+      else:
+        # Approximate search in the projected space, then exact distances for the candidates only
+        n_candidates = min(k * self.approx_candidates, self.memory_size)
+        projected = torch.matmul(encoded_states, self.projection)
+        approx_distances = self._squared_distances(projected, self.projected_memory)
+        approx_distances = approx_distances.masked_fill(empty_slots[:, None, :], INF)
+        _, candidates = torch.topk(approx_distances, n_candidates, dim=-1, largest=False) # (T, B, n_candidates)
+        candidate_features = torch.gather(self.memory[:, None].expand(T, B, self.memory_size, self.feature_size), 2,
+            candidates[..., None].expand(T, B, n_candidates, self.feature_size))
+        distances = torch.sum((candidate_features - encoded_states[:, :, None]) ** 2, dim=-1)
+        distances = distances.masked_fill(torch.gather(empty_slots[:, None].expand(T, B, self.memory_size), 2, candidates), INF)
+        knn_distances, _ = torch.topk(distances, k, dim=-1, largest=False)
+
+      knn_valid = torch.isfinite(knn_distances)
+      knn_distances = torch.where(knn_valid, knn_distances, torch.zeros_like(knn_distances))
+      if k < self.n_nearest_neighbors: # pad so that the running mean always has k entries
+        pad = self.n_nearest_neighbors - k
+        knn_distances = nn.functional.pad(knn_distances, (0, pad))
+        knn_valid = nn.functional.pad(knn_valid, (0, pad))
+      return knn_distances, knn_valid
+
+    def _squared_distances(self, queries, memory):
+      """Squared euclidean distances between (T, B, D) queries and (T, M, D) memory, as (T, B, M)."""
+      distances = (queries ** 2).sum(-1)[:, :, None] + (memory ** 2).sum(-1)[:, None, :] - 2 * torch.bmm(queries, memory.transpose(1, 2))
+      return distances.clamp(min=0.0)
 
     def forward(self, obs1, obs2):
         img1 = obs1
@@ -319,6 +394,19 @@ if __name__ == '__main__':
     assert rew.shape == (T, 4)
   print('"compute_episodic_curisoity_reward (after reset)" test passed')
 
+  # Test approximate index against exact search (exact re-ranking when all memory slots are candidates)
+  approx_model = EpisodicCuriosity(image_shape=obs_size,
+                action_size=action_size, memory_size=memory_size, num_envs=T, approx_dim=16, approx_candidates=memory_size)
+  approx_model.load_state_dict(model.state_dict())
+  model.reset_all()
+  for t in range(3):
+    obs = torch.from_numpy(np.random.random((T, 8,) + obs_size)).float()
+    model.append(obs)
+    approx_model.append(obs)
+  obs = torch.from_numpy(np.random.random((T, 4,) + obs_size)).float()
+  assert np.allclose(model.compute_episodic_curiosity_reward(obs), approx_model.compute_episodic_curiosity_reward(obs), atol=1e-4)
+  print('"compute_episodic_curisoity_reward (approximate index)" test passed')
+
 
 
   
\ No newline at end of file
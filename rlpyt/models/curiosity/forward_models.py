@@ -52,4 +52,98 @@ class OgForward(nn.Module):
         x = self.lin_1(torch.cat([phi1, action], 2))
         x = nn.functional.relu(x)
         x = self.lin_2(x)
-        return x
\ No newline at end of file
+        return x
+
+
+class EnsembleLinear(nn.Module):
+    """Linear layer for an ensemble of models: the weights of all members are
+    stacked in one tensor and evaluated with a single batched matmul. Input
+    is [E, N, in_features] (or [N, in_features], shared by all members), output
+    is [E, N, out_features]."""
+    def __init__(self,
+                 ensemble_size,
+                 in_features,
+                 out_features):
+        super(EnsembleLinear, self).__init__()
+        self.ensemble_size = ensemble_size
+        self.weight = nn.Parameter(torch.empty(ensemble_size, in_features, out_features))
+        self.bias = nn.Parameter(torch.empty(ensemble_size, 1, out_features))
+        # same initialization as nn.Linear, independently for each member
+        bound = 1. / in_features ** 0.5
+        nn.init.uniform_(self.weight, -bound, bound)
+        nn.init.uniform_(self.bias, -bound, bound)
+
+    def forward(self, x):
+        if x.dim() == 2:
+            x = x.unsqueeze(0).expand(self.ensemble_size, *x.shape)
+        return torch.baddbmm(self.bias, x, self.weight)
+
+
+class EnsembleResBlock(nn.Module):
+    def __init__(self,
+                 ensemble_size,
+                 feature_size,
+                 action_size):
+        super(EnsembleResBlock, self).__init__()
+
+        self.lin_1 = EnsembleLinear(ensemble_size, feature_size + action_size, feature_size)
+        self.lin_2 = EnsembleLinear(ensemble_size, feature_size + action_size, feature_size)
+
+    def forward(self, x, action):
+        res = nn.functional.leaky_relu(self.lin_1(torch.cat([x, action], 2)))
+        res = self.lin_2(torch.cat([res, action], 2))
+        return res + x
+
+
+class EnsembleResForward(nn.Module):
+    # ResForward for every member of an ensemble at once
+    def __init__(self,
+                 ensemble_size,
+                 feature_size,
+                 action_size):
+        super(EnsembleResForward, self).__init__()
+
+        self.ensemble_size = ensemble_size
+        self.lin_1 = EnsembleLinear(ensemble_size, feature_size + action_size, feature_size)
+        self.res_block_1 = EnsembleResBlock(ensemble_size, feature_size, action_size)
+        self.res_block_2 = EnsembleResBlock(ensemble_size, feature_size, action_size)
+        self.res_block_3 = EnsembleResBlock(ensemble_size, feature_size, action_size)
+        self.res_block_4 = EnsembleResBlock(ensemble_size, feature_size, action_size)
+        self.lin_last = EnsembleLinear(ensemble_size, feature_size + action_size, feature_size)
+
+    def forward(self, phi1, action):
+        """Takes [T, B, feature_size] features and [T, B, action_size] actions, returns
+        [ensemble_size, T, B, feature_size] predictions."""
+        T, B = phi1.shape[:2]
+        phi1 = phi1.reshape(T * B, -1)
+        action = action.reshape(T * B, -1)
+        x = nn.functional.leaky_relu(self.lin_1(torch.cat([phi1, action], 1)))
+        action = action.unsqueeze(0).expand(self.ensemble_size, *action.shape)
+        x = self.res_block_1(x, action)
+        x = self.res_block_2(x, action)
+        x = self.res_block_3(x, action)
+        x = self.res_block_4(x, action)
+        x = self.lin_last(torch.cat([x, action], 2))
+        return x.view(self.ensemble_size, T, B, -1)
+
+
+class EnsembleOgForward(nn.Module):
+    # OgForward for every member of an ensemble at once
+    def __init__(self,
+                 ensemble_size,
+                 feature_size,
+                 action_size):
+        super(EnsembleOgForward, self).__init__()
+
+        self.ensemble_size = ensemble_size
+        self.lin_1 = EnsembleLinear(ensemble_size, feature_size + action_size, feature_size)
+        self.lin_2 = EnsembleLinear(ensemble_size, feature_size, feature_size)
+
+    def forward(self, phi1, action):
+        """Takes [T, B, feature_size] features and [T, B, action_size] actions, returns
+        [ensemble_size, T, B, feature_size] predictions."""
+        T, B = phi1.shape[:2]
+        x = self.lin_1(torch.cat([phi1, action], 2).reshape(T * B, -1))
+        x = nn.functional.relu(x)
+        x = self.lin_2(x)
+        return x.view(self.ensemble_size, T, B, -1)
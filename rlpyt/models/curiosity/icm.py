@@ -26,12 +26,15 @@ class ICM(nn.Module):
             obs_stats=None,
             forward_loss_wt=0.2,
             forward_model='res',
-            feature_space='inverse'
+            feature_space='inverse',
+            cache_features=False
             ):
         super(ICM, self).__init__()
         self.beta = prediction_beta
         self.feature_encoding = feature_encoding
         self.feature_space = feature_space
+        # Encoder features can only be reused by the loss when the encoder is not trained
+        self.cache_features = cache_features and feature_space != 'inverse' and feature_encoding != 'none' and not batch_norm
         self.obs_stats = obs_stats
         if self.obs_stats is not None:
             self.obs_mean, self.obs_std = self.obs_stats
@@ -69,7 +72,19 @@ class ICM(nn.Module):
         self.forward_model = fmodel_class(feature_size=self.feature_size, action_size=action_size)
 
 
-    def forward(self, obs1, obs2, action):
+    def encode(self, obs):
+        """Encoder features [T,B,feature_size] of observations with leading dims [T,B]."""
+        lead_dim, T, B, img_shape = infer_leading_dims(obs, 3)
+        return self.encoder(obs.type(torch.float).view(T * B, *img_shape)).view(T, B, -1)
+
+    def forward(self, obs1, obs2, action, features=None, phi1=None):
+
+        if features is not None:
+            # cached (phi1, phi2) from compute_bonus, the encoder is fixed so these are still exact
+            lead_dim, T, B, _ = infer_leading_dims(features[0], 1)
+            phi1, phi2 = (f.view(T, B, -1) for f in features)
+            predicted_phi2 = self.forward_model(phi1.detach(), action.view(T, B, -1).detach())
+            return phi1, phi2, predicted_phi2, None
 
         if self.obs_stats is not None:
             img1 = (obs1 - self.obs_mean) / self.obs_std
@@ -85,13 +100,12 @@ class ICM(nn.Module):
         # lead_dim is just number of leading dimensions: e.g. [T, B] = 2 or [] = 0.
         lead_dim, T, B, img_shape = infer_leading_dims(obs1, 3) 
 
-        phi1 = img1
         phi2 = img2
         if self.feature_encoding != 'none':
-            phi1 = self.encoder(img1.view(T * B, *img_shape))
-            phi2 = self.encoder(img2.view(T * B, *img_shape))
-            phi1 = phi1.view(T, B, -1)
-            phi2 = phi2.view(T, B, -1)
+            phi1 = self.encode(obs1) if phi1 is None else phi1
+            phi2 = self.encode(obs2)
+        else:
+            phi1 = img1
 
         predicted_action = None
         if self.feature_space == 'inverse':
@@ -100,15 +114,21 @@ class ICM(nn.Module):
 
         return phi1, phi2, predicted_phi2, predicted_action
 
-    def compute_bonus(self, observations, next_observations, actions):
+    def compute_bonus(self, observations, next_observations, actions, return_features=False):
         phi1, phi2, predicted_phi2, _ = self.forward(observations, next_observations, actions)
         reward = nn.functional.mse_loss(predicted_phi2, phi2, reduction='none').sum(-1)/self.feature_size
+        if return_features:
+            return self.beta * reward, (phi1, phi2)
         return self.beta * reward
 
-    def compute_loss(self, observations, next_observations, actions, valid):
+    def compute_loss(self, observations, next_observations, actions, valid, features=None, phi1=None):
+        # phi1: encoder features of these observations, already computed by a policy sharing the encoder
         # dimension add for when you have only one environment
         if actions.dim() == 2: actions = actions.unsqueeze(1)
-        phi1, phi2, predicted_phi2, predicted_action = self.forward(observations, next_observations, actions)
+        if phi1 is not None:
+            assert features is None and phi1.shape[:2] == observations.shape[:2], \
+                "phi1 must be the features of this batch's observations"
+        phi1, phi2, predicted_phi2, predicted_action = self.forward(observations, next_observations, actions, features, phi1)
         actions = torch.max(actions.view(-1, *actions.shape[2:]), 1)[1] # convert action to (T * B, action_size)
         inverse_loss = torch.tensor(0.0)
         if self.feature_space == 'inverse':
@@ -26,9 +26,11 @@ class MICM(nn.Module):
             forward_loss_wt=0.2,
             forward_model='res',
             ensemble_mode='sample',
+            ensemble_size=5,
             device="cpu",
             ):
         super(MICM, self).__init__()
+        self.ensemble_size = ensemble_size
         self.device = torch.device("cuda:0" if device == "gpu" else "cpu")
         self.beta = prediction_beta
         self.feature_encoding = feature_encoding
@@ -61,17 +63,14 @@ class MICM(nn.Module):
             )
 
         if forward_model == 'res':
-            fmodel_class = ResForward
+            fmodel_class = EnsembleResForward
         elif forward_model == 'og':
-            fmodel_class = OgForward
+            fmodel_class = EnsembleOgForward
 
         self.ensemble_mode = ensemble_mode
 
-        self.forward_model_1 = fmodel_class(feature_size=self.feature_size, action_size=action_size).to(self.device)
-        self.forward_model_2 = fmodel_class(feature_size=self.feature_size, action_size=action_size).to(self.device)
-        self.forward_model_3 = fmodel_class(feature_size=self.feature_size, action_size=action_size).to(self.device)
-        self.forward_model_4 = fmodel_class(feature_size=self.feature_size, action_size=action_size).to(self.device)
-        self.forward_model_5 = fmodel_class(feature_size=self.feature_size, action_size=action_size).to(self.device)
+        # all members of the ensemble are evaluated together, see EnsembleLinear
+        self.forward_model = fmodel_class(ensemble_size=self.ensemble_size, feature_size=self.feature_size, action_size=action_size).to(self.device)
 
     def forward(self, obs1, obs2, action):
 
@@ -96,29 +95,17 @@ class MICM(nn.Module):
 
         predicted_action = self.inverse_model(torch.cat([phi1, phi2], 2))
 
-        predicted_phi2 = []
-        predicted_phi2.append(self.forward_model_1(phi1.detach(), action.view(T, B, -1).detach()))
-        predicted_phi2.append(self.forward_model_2(phi1.detach(), action.view(T, B, -1).detach()))
-        predicted_phi2.append(self.forward_model_3(phi1.detach(), action.view(T, B, -1).detach()))
-        predicted_phi2.append(self.forward_model_4(phi1.detach(), action.view(T, B, -1).detach()))
-        predicted_phi2.append(self.forward_model_5(phi1.detach(), action.view(T, B, -1).detach()))
-        predicted_phi2_stacked = torch.stack(predicted_phi2)
+        predicted_phi2_stacked = self.forward_model(phi1.detach(), action.view(T, B, -1).detach()) # (ensemble_size, T, B, feature_size)
 
         return phi1, phi2, predicted_phi2_stacked, predicted_action
 
     def compute_bonus(self, observations, next_observations, actions):
         phi1, phi2, predicted_phi2, _ = self.forward(observations, next_observations, actions)
 
-        rewards = []
-        rewards.append(nn.functional.mse_loss(predicted_phi2[0], phi2, reduction='none').sum(-1)/self.feature_size)
-        rewards.append(nn.functional.mse_loss(predicted_phi2[1], phi2, reduction='none').sum(-1)/self.feature_size)
-        rewards.append(nn.functional.mse_loss(predicted_phi2[2], phi2, reduction='none').sum(-1)/self.feature_size)
-        rewards.append(nn.functional.mse_loss(predicted_phi2[3], phi2, reduction='none').sum(-1)/self.feature_size)
-        rewards.append(nn.functional.mse_loss(predicted_phi2[4], phi2, reduction='none').sum(-1)/self.feature_size)
-        rewards = torch.stack(rewards)
+        rewards = nn.functional.mse_loss(predicted_phi2, phi2.expand_as(predicted_phi2), reduction='none').sum(-1)/self.feature_size
 
         if self.ensemble_mode == 'sample':
-            reward = rewards[np.random.choice(5)]
+            reward = rewards[np.random.choice(self.ensemble_size)]
         elif self.ensemble_mode == 'mean':
             reward = torch.mean(rewards, dim=0)
         elif self.ensemble_mode == 'var':
@@ -126,7 +113,8 @@ class MICM(nn.Module):
 
         return self.beta * reward
 
-    def compute_loss(self, observations, next_observations, actions, valid):
+    def compute_loss(self, observations, next_observations, actions, valid, features=None):
+        # features is unused: the encoder is trained by the inverse loss, so nothing is cached
         # dimension add for when you have only one environment
         if actions.dim() == 2: actions = actions.unsqueeze(1)
         phi1, phi2, predicted_phi2, predicted_action = self.forward(observations, next_observations, actions)
@@ -134,26 +122,8 @@ class MICM(nn.Module):
         inverse_loss = nn.functional.cross_entropy(predicted_action.view(-1, *predicted_action.shape[2:]), actions.detach(), reduction='none').view(phi1.shape[0], phi1.shape[1])
         inverse_loss = valid_mean(inverse_loss, valid.detach())
 
-        forward_loss = torch.tensor(0.0, device=self.device)
-
-        forward_loss_1 = nn.functional.dropout(nn.functional.mse_loss(predicted_phi2[0], phi2.detach(), reduction='none'), p=0.2).sum(-1)/self.feature_size
-        forward_loss += valid_mean(forward_loss_1, valid)
-
-        forward_loss_2 = nn.functional.dropout(nn.functional.mse_loss(predicted_phi2[1], phi2.detach(), reduction='none'), p=0.2).sum(-1)/self.feature_size
-        forward_loss += valid_mean(forward_loss_2, valid)
-
-        forward_loss_3 = nn.functional.dropout(nn.functional.mse_loss(predicted_phi2[2], phi2.detach(), reduction='none'), p=0.2).sum(-1)/self.feature_size
-        forward_loss += valid_mean(forward_loss_3, valid)
-
-        forward_loss_4 = nn.functional.dropout(nn.functional.mse_loss(predicted_phi2[3], phi2.detach(), reduction='none'), p=0.2).sum(-1)/self.feature_size
-        forward_loss += valid_mean(forward_loss_4, valid)
-
-        forward_loss_5 = nn.functional.dropout(nn.functional.mse_loss(predicted_phi2[4], phi2.detach(), reduction='none'), p=0.2).sum(-1)/self.feature_size
-        forward_loss += valid_mean(forward_loss_5, valid)
+        forward_losses = nn.functional.dropout(nn.functional.mse_loss(predicted_phi2, phi2.detach().expand_as(predicted_phi2), reduction='none'), p=0.2).sum(-1)/self.feature_size
+        # sum over members of each member's valid mean (valid is shared by all members)
+        forward_loss = self.ensemble_size * valid_mean(forward_losses.mean(dim=0), valid)
 
         return self.inverse_loss_wt*inverse_loss, self.forward_loss_wt*forward_loss
-
-
-
-
-
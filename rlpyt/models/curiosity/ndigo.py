@@ -13,25 +13,41 @@ from rlpyt.utils.collections import namedarraytuple
 from rlpyt.utils.tensor import infer_leading_dims, restore_leading_dims
 from rlpyt.utils.graph_utils import save_dot
 from rlpyt.models.curiosity.encoders import BurdaHead, MazeHead, UniverseHead
+from rlpyt.models.curiosity.forward_models import EnsembleLinear
 
 GruState = namedarraytuple("GruState", ["c"])  # For downstream namedarraytuples to work
 
-class NdigoForward(nn.Module):
-    """Frame predictor MLP for NDIGO curiosity algorithm"""
+class NdigoMultiForward(nn.Module):
+    """Frame predictor MLPs for NDIGO curiosity algorithm, one for each horizon
+    k = 1..num_heads, evaluated together as one batched MLP. Every head gets a
+    window of num_heads actions, of which head k only sees the first k (the rest
+    are zeroed), which is the same as a separate MLP over k actions."""
     def __init__(self,
+                 num_heads,
                  feature_size,
-                 action_size, # usually multi-action sequence
-                 output_size # observation size
+                 action_size,
+                 output_size, # observation size
+                 hidden_size=64
                  ):
-        super(NdigoForward, self).__init__()
+        super(NdigoMultiForward, self).__init__()
 
-        self.model = nn.Sequential(nn.Linear(feature_size + action_size, 64),
-                                   nn.ReLU(),
-                                   nn.Linear(64, output_size))
-
-    def forward(self, belief_states, action_seqs):
-        predicted_states = self.model(torch.cat([belief_states, action_seqs], 2))
-        return predicted_states
+        self.num_heads = num_heads
+        self.action_size = action_size
+        self.lin_1 = EnsembleLinear(num_heads, feature_size + num_heads*action_size, hidden_size)
+        self.lin_2 = EnsembleLinear(num_heads, hidden_size, output_size)
+
+    def forward(self, belief_states, action_windows, heads=slice(None)):
+        """Takes [T, B, feature_size] belief states and [T, B, num_heads*action_size]
+        action windows, returns [n_heads, T, B, output_size] logits for the selected heads."""
+        T, B = belief_states.shape[:2]
+        head_idxs = torch.arange(self.num_heads, device=action_windows.device)[heads]
+        action_mask = torch.arange(self.num_heads*self.action_size, device=action_windows.device)[None, :] < (head_idxs[:, None] + 1) * self.action_size
+        action_windows = action_windows.reshape(1, T * B, -1) * action_mask[:, None, :].type(action_windows.dtype)
+        belief_states = belief_states.reshape(1, T * B, -1).expand(len(head_idxs), -1, -1)
+        x = torch.cat([belief_states, action_windows], 2)
+        x = nn.functional.relu(torch.baddbmm(self.lin_1.bias[heads], x, self.lin_1.weight[heads]))
+        x = torch.baddbmm(self.lin_2.bias[heads], x, self.lin_2.weight[heads])
+        return x.view(len(head_idxs), T, B, -1)
 
 class NDIGO(torch.nn.Module):
     """Curiosity model for intrinsically motivated agents: a convolutional network 
@@ -50,8 +66,10 @@ class NDIGO(torch.nn.Module):
             batch_norm=False,
             obs_stats=None,
             device='cpu',
+            num_predictors=10,
             ):
-        """Instantiate neural net module according to inputs."""
+        """Instantiate neural net module according to inputs. Frame predictors
+        are trained for horizons 1..max(num_predictors, horizon+1)."""
         super(NDIGO, self).__init__()
 
         self.action_size = action_size
@@ -75,41 +93,18 @@ class NDIGO(torch.nn.Module):
 
         self.gru_size = gru_size
         self.gru = torch.nn.GRU(self.feature_size + action_size, self.gru_size)
-        self.gru_states = None # state output of last batch - (1, B, gru_size) or None
-
-        self.forward_model_1 = NdigoForward(feature_size=self.gru_size, 
-                                            action_size=action_size*1, 
-                                            output_size=image_shape[0]*image_shape[1]*image_shape[2])
-        self.forward_model_2 = NdigoForward(feature_size=self.gru_size, 
-                                            action_size=action_size*2, 
-                                            output_size=image_shape[0]*image_shape[1]*image_shape[2])
-        self.forward_model_3 = NdigoForward(feature_size=self.gru_size, 
-                                            action_size=action_size*3, 
-                                            output_size=image_shape[0]*image_shape[1]*image_shape[2])
-        self.forward_model_4 = NdigoForward(feature_size=self.gru_size, 
-                                            action_size=action_size*4, 
-                                            output_size=image_shape[0]*image_shape[1]*image_shape[2])
-        self.forward_model_5 = NdigoForward(feature_size=self.gru_size, 
-                                            action_size=action_size*5, 
-                                            output_size=image_shape[0]*image_shape[1]*image_shape[2])
-        self.forward_model_6 = NdigoForward(feature_size=self.gru_size, 
-                                            action_size=action_size*6, 
-                                            output_size=image_shape[0]*image_shape[1]*image_shape[2])
-        self.forward_model_7 = NdigoForward(feature_size=self.gru_size, 
-                                            action_size=action_size*7, 
-                                            output_size=image_shape[0]*image_shape[1]*image_shape[2])
-        self.forward_model_8 = NdigoForward(feature_size=self.gru_size, 
-                                            action_size=action_size*8, 
-                                            output_size=image_shape[0]*image_shape[1]*image_shape[2])
-        self.forward_model_9 = NdigoForward(feature_size=self.gru_size, 
-                                            action_size=action_size*9, 
-                                            output_size=image_shape[0]*image_shape[1]*image_shape[2])
-        self.forward_model_10 = NdigoForward(feature_size=self.gru_size, 
-                                            action_size=action_size*10, 
-                                            output_size=image_shape[0]*image_shape[1]*image_shape[2])
-
-
-    def forward(self, observations, prev_actions):
+
+        self.num_heads = max(num_predictors, self.horizon + 1) # bonus needs the horizon and horizon+1 predictors
+        self.forward_model = NdigoMultiForward(num_heads=self.num_heads,
+                                               feature_size=self.gru_size,
+                                               action_size=action_size,
+                                               output_size=image_shape[0]*image_shape[1]*image_shape[2])
+
+
+    def forward(self, observations, prev_actions, done=None, gru_state=None):
+        """Belief states for a [T, B] batch, starting from gru_state (1, B, gru_size) or
+        zeros. With done flags, the state of an env is reset after its episode ends, and
+        the returned final state is the one the next batch starts from."""
 
         # Infer (presence of) leading dimensions: [T,B], [B], or [].
         # lead_dim is just number of leading dimensions: e.g. [T, B] = 2 or [] = 0.
@@ -120,14 +115,35 @@ class NDIGO(torch.nn.Module):
         encoded_states = self.encoder(images.view(T * B, *img_shape)).view(T, B, -1)
 
         # pass encoded batch through GRU
-        # gru_state = None if gru_state is None else gru_state.c
         gru_inputs = torch.cat([encoded_states, prev_actions], dim=2)
-        belief_states, gru_output_states = self.gru(gru_inputs, self.gru_states)
-
-        return belief_states, gru_output_states
+        if done is None:
+            return self.gru(gru_inputs, gru_state)
+
+        # one GRU call per span between episode ends, zeroing the state of finished envs;
+        # only the first and last step of a run of done steps end a span, so the blank
+        # tail after done (wait-reset collectors) is passed in one call, not one per step
+        # (inside a run the state is not zeroed at each step: those steps are not valid)
+        done = done.view(T, B).bool()
+        not_done = (~done).type(gru_inputs.dtype).view(1, T, B, 1)
+        in_run = torch.zeros_like(done)
+        in_run[1:-1] = done[:-2] & done[2:]
+        end_idxs = torch.nonzero((done & ~in_run)[:-1].any(dim=1)).view(-1).tolist() + [T-1]
+        belief_states = []
+        start = 0
+        for end in end_idxs:
+            span_belief_states, gru_state = self.gru(gru_inputs[start:end+1], gru_state)
+            belief_states.append(span_belief_states)
+            gru_state = gru_state * not_done[:, end]
+            start = end + 1
+        belief_states = torch.cat(belief_states, dim=0)
+
+        return belief_states, gru_state
         
 
-    def compute_bonus(self, observations, prev_actions, actions):
+    def compute_bonus(self, observations, prev_actions, actions, done, gru_state=None):
+        """Intrinsic rewards for a [T, B] batch, continuing from gru_state. Also returns
+        the (reset) belief state entering each step (T, B, gru_size), for the loss, and
+        the state to continue the next batch from."""
         #------------------------------------------------------------#
         lead_dim, T, B, img_shape = infer_leading_dims(observations, 3)
 
@@ -136,87 +152,39 @@ class NDIGO(torch.nn.Module):
             prev_actions = prev_actions.view(1, 1, -1)
         if actions.dim() == 1:
             actions = actions.view(1, 1, -1)
+        done = done.view(T, B)
         #------------------------------------------------------------#
 
         # generate belief states
-        belief_states, gru_output_states = self.forward(observations, prev_actions)
-        self.gru_states = None # only bc we're processing exactly 1 episode per batch
+        init_gru_state = torch.zeros((1, B, self.gru_size), device=observations.device) if gru_state is None else gru_state
+        belief_states, gru_state = self.forward(observations, prev_actions, done, init_gru_state)
+        prev_gru_states = torch.cat([init_gru_state, belief_states[:-1] * (1 - done[:-1].type(belief_states.dtype)).unsqueeze(-1)], dim=0)
 
-        # slice beliefs and actions
-        belief_states_t = belief_states.clone()[:-self.horizon] # slice off last timesteps
-        belief_states_tm1 = belief_states.clone()[:-self.horizon-1]
-        
-        action_seqs_t = torch.zeros((T-self.horizon, B, self.horizon*self.action_size), device=self.device) # placeholder
-        action_seqs_tm1 = torch.zeros((T-self.horizon-1, B, (self.horizon+1)*self.action_size), device=self.device) # placeholder
-        for i in range(len(actions)-self.horizon):
-            if i != len(actions)-self.horizon-1:
-                action_seq_tm1 = actions.clone()[i:i+self.horizon+1]
-                action_seq_tm1 = torch.transpose(action_seq_tm1, 0, 1)
-                action_seq_tm1 = torch.reshape(action_seq_tm1, (action_seq_tm1.shape[0], -1))
-                action_seqs_tm1[i] = action_seq_tm1
-            action_seq_t = actions.clone()[i:i+self.horizon]
-            action_seq_t = torch.transpose(action_seq_t, 0, 1)
-            action_seq_t = torch.reshape(action_seq_t, (action_seq_t.shape[0], -1))
-            action_seqs_t[i] = action_seq_t
-        
-        # make forward model predictions
-        if self.horizon == 1:
-            predicted_states_tm1 = self.forward_model_2(belief_states_tm1, action_seqs_tm1.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-1, B, 75)
-            predicted_states_t = self.forward_model_1(belief_states_t, action_seqs_t.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-1, B, 75)
-        elif self.horizon == 2:
-            predicted_states_tm1 = self.forward_model_3(belief_states_tm1, action_seqs_tm1.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-2, B, 75)
-            predicted_states_t = self.forward_model_2(belief_states_t, action_seqs_t.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-2, B, 75)
-        elif self.horizon == 3:
-            predicted_states_tm1 = self.forward_model_4(belief_states_tm1, action_seqs_tm1.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-3, B, 75)
-            predicted_states_t = self.forward_model_3(belief_states_t, action_seqs_t.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-3, B, 75)
-        elif self.horizon == 4:
-            predicted_states_tm1 = self.forward_model_5(belief_states_tm1, action_seqs_tm1.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-4, B, 75)
-            predicted_states_t = self.forward_model_4(belief_states_t, action_seqs_t.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-4, B, 75)
-        elif self.horizon == 5:
-            predicted_states_tm1 = self.forward_model_6(belief_states_tm1, action_seqs_tm1.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-5, B, 75)
-            predicted_states_t = self.forward_model_5(belief_states_t, action_seqs_t.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-5, B, 75)
-        elif self.horizon == 6:
-            predicted_states_tm1 = self.forward_model_7(belief_states_tm1, action_seqs_tm1.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-6, B, 75)
-            predicted_states_t = self.forward_model_6(belief_states_t, action_seqs_t.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-6, B, 75)
-        elif self.horizon == 7:
-            predicted_states_tm1 = self.forward_model_8(belief_states_tm1, action_seqs_tm1.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-7, B, 75)
-            predicted_states_t = self.forward_model_7(belief_states_t, action_seqs_t.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-7, B, 75)
-        elif self.horizon == 8:
-            predicted_states_tm1 = self.forward_model_9(belief_states_tm1, action_seqs_tm1.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-8, B, 75)
-            predicted_states_t = self.forward_model_8(belief_states_t, action_seqs_t.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-8, B, 75)
-        elif self.horizon == 9:
-            predicted_states_tm1 = self.forward_model_10(belief_states_tm1, action_seqs_tm1.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-9, B, 75)
-            predicted_states_t = self.forward_model_9(belief_states_t, action_seqs_t.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-9, B, 75)
-        elif self.horizon == 10:
-            predicted_states_tm1 = self.forward_model_11(belief_states_tm1, action_seqs_tm1.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-10, B, 75)
-            predicted_states_t = self.forward_model_10(belief_states_t, action_seqs_t.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-10, B, 75)
-
-        predicted_states_tm1 = nn.functional.sigmoid(predicted_states_tm1)
-        true_obs_tm1 = observations.clone()[self.horizon:-1].view(-1, *predicted_states_tm1.shape[1:]).type(torch.float)
-        predicted_states_t = nn.functional.sigmoid(predicted_states_t)
-        true_obs_t = observations.clone()[self.horizon:].view(-1, *predicted_states_t.shape[1:]).type(torch.float)
-
-        # generate losses
-        losses_tm1 = nn.functional.binary_cross_entropy(predicted_states_tm1, true_obs_tm1, reduction='none')
-        losses_tm1 = torch.sum(losses_tm1, dim=-1)/losses_tm1.shape[-1] # average of each feature for each environment at each timestep (T, B, ave_loss_over_feature)
-        losses_t = nn.functional.binary_cross_entropy(predicted_states_t, true_obs_t, reduction='none')
-        losses_t = torch.sum(losses_t, dim=-1)/losses_t.shape[-1]
+        # predict frame t+H from belief t with H actions, and from belief t-1 with H+1 actions
+        action_windows = self._action_windows(actions)
+        predicted_states = self.forward_model(belief_states, action_windows, heads=slice(self.horizon-1, self.horizon+1)) # (2, T, B, obs_size)
+        predicted_states_t = predicted_states[0, :T-self.horizon] # (T-H, B, obs_size)
+        predicted_states_tm1 = predicted_states[1, :T-self.horizon-1] # (T-H-1, B, obs_size)
+        true_obs = observations.reshape(T, B, -1).type(torch.float)
 
+        # generate losses (average of each feature for each environment at each timestep)
+        losses_tm1 = nn.functional.binary_cross_entropy_with_logits(predicted_states_tm1, true_obs[self.horizon+1:], reduction='none').mean(-1)
+        losses_t = nn.functional.binary_cross_entropy_with_logits(predicted_states_t, true_obs[self.horizon:], reduction='none').mean(-1)
 
-        
         # subtract losses to get rewards (r[t+H-1] = losses[t-1] - losses[t])
         r_int = torch.zeros((T, B), device=self.device)
         r_int[self.horizon:len(losses_t)+self.horizon-1] = losses_tm1 - losses_t[1:] # time zero reward is set to 0 (L[-1] doesn't exist)
+        r_int[self.horizon:] *= self._no_episode_end(done, self.horizon+1)[:T-self.horizon] # predictions across an episode end get no reward
         # r_int[self.horizon:len(losses_t)+self.horizon-1] = losses_t[1:] - losses_tm1
         # r_int[1:len(losses_t)] = losses_tm1 - losses_t[1:]
         # r_int[1:len(losses_t)] = losses_t[1:] - losses_tm1
 
         # r_int = nn.functional.relu(r_int)
 
-        return r_int*self.beta
+        return r_int*self.beta, prev_gru_states, gru_state
 
 
-    def compute_loss(self, observations, prev_actions, actions, valid):
+    def compute_loss(self, observations, prev_actions, actions, done, prev_gru_state, valid):
         #------------------------------------------------------------#
         lead_dim, T, B, img_shape = infer_leading_dims(observations, 3)
         # hacky dimension add for when you have only one environment
@@ -224,53 +192,37 @@ class NDIGO(torch.nn.Module):
             prev_actions = prev_actions.unsqueeze(1)
         if actions.dim() == 2:
             actions = actions.unsqueeze(1)
+        done = done.view(T, B)
         #------------------------------------------------------------#
 
-        # generate belief states
-        belief_states, gru_output_states = self.forward(observations, prev_actions)
-        self.gru_states = None # only bc we're processing exactly 1 episode per batch
-
-        for k in range(1, 11):
-            action_seqs = torch.zeros((T-k, B, k*self.action_size), device=self.device) # placeholder
-            for i in range(len(actions)-k):
-                action_seq = actions[i:i+k]
-                action_seq = torch.transpose(action_seq, 0, 1)
-                action_seq = torch.reshape(action_seq, (action_seq.shape[0], -1))
-                action_seqs[i] = action_seq
-
-            # make forward model predictions for this predictor
-            if k == 1:
-                predicted_states = self.forward_model_1(belief_states[:-k], action_seqs.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-1, B, 75)
-            elif k == 2:
-                predicted_states = self.forward_model_2(belief_states[:-k], action_seqs.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-2, B, 75)
-            elif k == 3:
-                predicted_states = self.forward_model_3(belief_states[:-k], action_seqs.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-3, B, 75)
-            elif k == 4:
-                predicted_states = self.forward_model_4(belief_states[:-k], action_seqs.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-4, B, 75)
-            elif k == 5:
-                predicted_states = self.forward_model_5(belief_states[:-k], action_seqs.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-5, B, 75)
-            elif k == 6:
-                predicted_states = self.forward_model_6(belief_states[:-k], action_seqs.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-6, B, 75)
-            elif k == 7:
-                predicted_states = self.forward_model_7(belief_states[:-k], action_seqs.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-7, B, 75)
-            elif k == 8:
-                predicted_states = self.forward_model_8(belief_states[:-k], action_seqs.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-8, B, 75)
-            elif k == 9:
-                predicted_states = self.forward_model_9(belief_states[:-k], action_seqs.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-9, B, 75)
-            elif k == 10:
-                predicted_states = self.forward_model_10(belief_states[:-k], action_seqs.detach()).view(-1, B, img_shape[0]*img_shape[1]*img_shape[2]) # (T-10, B, 75)
-
-            # generate losses for this predictor
-            predicted_states = nn.functional.sigmoid(predicted_states)
-            true_obs = observations[k:].view(-1, *predicted_states.shape[1:]).detach().type(torch.float)
-
-            floss = nn.functional.binary_cross_entropy(predicted_states, true_obs.detach(), reduction='mean')
-            if k == 1:
-                loss = floss
-            else:
-                loss += floss
+        # generate belief states, starting from the state the bonus pass started this batch from
+        belief_states, _ = self.forward(observations, prev_actions, done, prev_gru_state[:1].reshape(1, B, -1).detach())
 
-        return loss
+        # all horizons at once: the head for horizon k predicts frame t+k from belief t
+        action_windows = self._action_windows(actions)
+        predicted_states = self.forward_model(belief_states, action_windows) # (num_heads, T, B, obs_size)
+        true_obs = observations.reshape(T, B, -1).detach().type(torch.float)
+        true_obs = nn.functional.pad(true_obs, (0, 0, 0, 0, 0, self.num_heads))
+        true_obs = true_obs.unfold(0, T, 1)[1:].permute(0, 3, 1, 2) # (num_heads, T, B, obs_size), [k-1, t] = obs[t+k]
 
+        # generate losses, mean over the (T-k) valid timesteps of each predictor, summed over predictors
+        losses = nn.functional.binary_cross_entropy_with_logits(predicted_states, true_obs, reduction='none').mean(-1) # (num_heads, T, B)
+        valid = (torch.arange(T, device=losses.device)[None, :] < T - torch.arange(1, self.num_heads+1, device=losses.device)[:, None]).type(losses.dtype)
+        valid = valid[:, :, None] * torch.stack([self._no_episode_end(done, k) for k in range(1, self.num_heads+1)]) # (num_heads, T, B)
+        loss = torch.sum((losses * valid).sum((1, 2)) / valid.sum((1, 2)).clamp(min=1))
 
+        return loss
 
+    def _no_episode_end(self, done, length):
+        """1 where no episode ends within the next length steps (done[t:t+length]), else 0, as (T, B)."""
+        T = done.shape[0]
+        ends = torch.cat([torch.zeros_like(done[:1], dtype=torch.float), done.type(torch.float).cumsum(0)], dim=0)
+        return (ends[torch.clamp(torch.arange(T, device=done.device) + length, max=T)] == ends[:T]).type(torch.float)
+
+    def _action_windows(self, actions):
+        """Windows of the next num_heads actions from every timestep of a [T, B, action_size]
+        batch, as [T, B, num_heads*action_size] (zero padded past the end of the batch)."""
+        T, B = actions.shape[:2]
+        padded = nn.functional.pad(actions, (0, 0, 0, 0, 0, self.num_heads - 1))
+        windows = padded.unfold(0, self.num_heads, 1) # (T, B, action_size, num_heads)
+        return windows.transpose(2, 3).reshape(T, B, -1)
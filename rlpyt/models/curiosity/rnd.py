@@ -5,7 +5,8 @@ import torch
 from torch import nn
 
 from rlpyt.utils.tensor import infer_leading_dims, restore_leading_dims, valid_mean
-from rlpyt.utils.averages import RunningMeanStd, RewardForwardFilter
+from rlpyt.utils.averages import RewardForwardFilter
+from rlpyt.models.running_mean_std import RunningMeanStdModel
 from rlpyt.models.utils import Flatten
 from rlpyt.models.curiosity.encoders import BurdaHead, MazeHead, UniverseHead
 import cv2
@@ -23,11 +24,13 @@ class RND(nn.Module):
             drop_probability=1.0,
             feature_encoding='none',
             gamma=0.99,
-            device='cpu'
+            device='cpu',
+            cache_features=False
             ):
         super(RND, self).__init__()
 
         self.beta = prediction_beta
+        self.cache_features = cache_features # reuse target network outputs from compute_bonus in compute_loss
         self.drop_probability = drop_probability
         self.device = torch.device('cuda:0' if device == 'gpu' else 'cpu')
 
@@ -37,11 +40,17 @@ class RND(nn.Module):
         self.c = c
         self.h = h
         self.w = w
-        self.obs_rms = RunningMeanStd(shape=(1, c, h, w)) # (T, B, c, h, w)
+        self.obs_rms = RunningMeanStdModel((c, h, w), epsilon=1e-4) # statistics kept on device
         if obs_stats is not None:
-            self.obs_rms.mean[0] = obs_stats[0]
-            self.obs_rms.var[0] = obs_stats[1]**2
-        self.rew_rms = RunningMeanStd()
+            self.obs_rms.mean.copy_(torch.as_tensor(obs_stats[0]).expand_as(self.obs_rms.mean))
+            self.obs_rms.var.copy_(torch.as_tensor(obs_stats[1]).expand_as(self.obs_rms.var)**2)
+        if self.cache_features:
+            # with cached targets, observation statistics from a bonus pass are only merged in at the
+            # start of the next one, so the cached targets and the predictor in compute_loss are
+            # normalized with the same statistics
+            self.pending_obs_rms = RunningMeanStdModel((c, h, w))
+            self._loss_since_bonus = False
+        self.rew_rms = RunningMeanStdModel((), epsilon=1e-4)
         self.rew_rff = RewardForwardFilter(gamma)
         self.feature_size = 512
         self.conv_feature_size = 7*7*64
@@ -111,13 +120,12 @@ class RND(nn.Module):
             param.requires_grad = False
 
 
-    def forward(self, obs, not_done=None):
+    def forward(self, obs, not_done=None, target_phi=None):
 
         # in case of frame stacking
         if obs.shape[2] == 4:
             obs = obs[:,:,-1,:,:]
             obs = obs.unsqueeze(2)
-        obs_cpu = obs.clone().cpu().data.numpy()
 
         # img = np.squeeze(obs.data.numpy()[0][0])
         # mean = np.squeeze(self.obs_rms.mean)
@@ -137,54 +145,59 @@ class RND(nn.Module):
         # lead_dim is just number of leading dimensions: e.g. [T, B] = 2 or [] = 0.
         lead_dim, T, B, img_shape = infer_leading_dims(obs, 3)
         
-        if self.device == torch.device('cuda:0'):
-            obs_mean = torch.from_numpy(self.obs_rms.mean).float().cuda()
-            obs_var = torch.from_numpy(self.obs_rms.var).float().cuda()
-        else:
-            obs_mean = torch.from_numpy(self.obs_rms.mean).float()
-            obs_var = torch.from_numpy(self.obs_rms.var).float()
-        norm_obs = (obs.clone().float() - obs_mean) / (torch.sqrt(obs_var)+1e-10)
+        norm_obs = (obs.float() - self.obs_rms.mean) / (torch.sqrt(self.obs_rms.var)+1e-10)
         norm_obs = torch.clamp(norm_obs, min=-5, max=5).float()
 
-        # prediction target
-        phi = self.target_model(norm_obs.clone().detach().view(T * B, *img_shape)).view(T, B, -1)
+        # prediction target (fixed network, so a cached output from the bonus pass can be reused)
+        if target_phi is not None:
+            phi = target_phi.view(T, B, -1)
+        else:
+            phi = self.target_model(norm_obs.clone().detach().view(T * B, *img_shape)).view(T, B, -1)
 
         # make prediction
         predicted_phi = self.forward_model(norm_obs.detach().view(T * B, *img_shape)).view(T, B, -1)
 
         # update statistics
         if not_done is not None:
-            valid_obs = np.reshape(obs_cpu[np.where(not_done==1)[:2]], (-1, self.c, self.h, self.w))
-            self.obs_rms.update(valid_obs)
+            obs_rms = self.pending_obs_rms if self.cache_features else self.obs_rms
+            obs_rms.update(obs, mask=not_done)
 
         return phi, predicted_phi, T
 
-    def compute_bonus(self, next_observation, done):
-        done = done.cpu().data.numpy()
-        not_done = np.abs(done-1)
+    def compute_bonus(self, next_observation, done, return_features=False):
+        if self.cache_features and self._loss_since_bonus:
+            self.merge_pending_obs_stats()
+        not_done = 1 - done.type(torch.float)
         phi, predicted_phi, T = self.forward(next_observation, not_done=not_done)
         rewards = nn.functional.mse_loss(predicted_phi, phi.detach(), reduction='none').sum(-1)/self.feature_size
 
         # update running mean
-        rewards_cpu = rewards.clone().cpu().data.numpy()
-        total_rew_per_env = np.array([self.rew_rff.update(rewards_cpu[i], not_done=not_done[i]) for i in range(T)])
-        self.rew_rms.update_from_moments(np.mean(total_rew_per_env), np.var(total_rew_per_env), np.sum(not_done))
+        total_rew_per_env = self.rew_rff.update_block(rewards.detach(), not_done=not_done)
+        self.rew_rms.update_from_moments(total_rew_per_env.mean(), total_rew_per_env.var(unbiased=False), not_done.sum())
 
         # normalize rewards
-        if self.device == torch.device('cuda:0'):
-            rew_var = torch.from_numpy(np.array(self.rew_rms.var)).float().cuda()
-            not_done = torch.from_numpy(not_done).float().cuda()
-        else:
-            rew_var = torch.from_numpy(np.array(self.rew_rms.var)).float()
-            not_done = torch.from_numpy(not_done).float()
-        rewards /= torch.sqrt(rew_var)
+        rewards /= torch.sqrt(self.rew_rms.var)
 
         # apply done mask
         rewards *= not_done
+        if return_features:
+            return self.beta * rewards, (phi,)
         return self.beta * rewards
 
-    def compute_loss(self, next_observations, valid):
-        phi, predicted_phi, _ = self.forward(next_observations, not_done=None)
+    def merge_pending_obs_stats(self):
+        """Merges the observation statistics deferred from the last bonus pass (cache_features only)."""
+        pending = self.pending_obs_rms
+        self.obs_rms.update_from_moments(pending.mean, pending.var, pending.count)
+        pending.mean.zero_()
+        pending.var.fill_(1.)
+        pending.count.zero_()
+        self._loss_since_bonus = False
+
+    def compute_loss(self, next_observations, valid, features=None):
+        if self.cache_features:
+            self._loss_since_bonus = True
+        target_phi = features[0] if features is not None else None
+        phi, predicted_phi, _ = self.forward(next_observations, not_done=None, target_phi=target_phi)
         forward_loss = nn.functional.mse_loss(predicted_phi, phi.detach(), reduction='none').sum(-1)/self.feature_size
         mask = torch.rand(forward_loss.shape)
         mask = 1.0 - (mask > self.drop_probability).float().to(self.device)
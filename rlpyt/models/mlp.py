@@ -42,3 +42,69 @@ class MlpModel(nn.Module):
         """Retuns the output size of the model."""
         return self._output_size
 
+
+class EnsembleMlpModel(nn.Module):
+    """Ensemble of ``ensemble_size`` independent MLPs of the same shape (as
+    ``MlpModel``), with each layer's weights stacked along a leading ensemble
+    dimension, so that all members are evaluated on the same input with one
+    batched matmul per layer.  Each member is initialized as ``nn.Linear``.
+
+    Args:
+        input_size (int): number of inputs
+        hidden_sizes (list): can be empty list for none (linear model).
+        output_size: linear layer at output, or if ``None``, the last hidden size will be the output size and will have nonlinearity applied
+        ensemble_size (int): number of members.
+        nonlinearity: torch nonlinearity Module (not Functional).
+    """
+
+    def __init__(
+            self,
+            input_size,
+            hidden_sizes,  # Can be empty list for none.
+            output_size=None,  # if None, last layer has nonlinearity applied.
+            ensemble_size=2,
+            nonlinearity=nn.ReLU,  # Module, not Functional.
+            ):
+        super().__init__()
+        if isinstance(hidden_sizes, int):
+            hidden_sizes = [hidden_sizes]
+        sizes = [input_size] + list(hidden_sizes)
+        if output_size is not None:
+            sizes.append(output_size)
+        self.weights = nn.ParameterList()
+        self.biases = nn.ParameterList()
+        for n_in, n_out in zip(sizes[:-1], sizes[1:]):
+            bound = 1 / n_in ** 0.5  # As nn.Linear.
+            self.weights.append(nn.Parameter(
+                torch.empty(ensemble_size, n_in, n_out).uniform_(-bound, bound)))
+            self.biases.append(nn.Parameter(
+                torch.empty(ensemble_size, 1, n_out).uniform_(-bound, bound)))
+        self.nonlinearity = nonlinearity()
+        self._last_nonlinear = output_size is None
+        self._ensemble_size = ensemble_size
+        self._output_size = (hidden_sizes[-1] if output_size is None
+            else output_size)
+
+    def forward(self, input, member=None):
+        """Compute all members on the input, assuming input shape
+        [B,input_size], returning shape [ensemble_size,B,output_size]; or
+        with ``member`` (int), compute only that one, returning [B,output_size]."""
+        x = input
+        for i, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            if member is None:
+                x = torch.baddbmm(bias, x, weight) if x.dim() == 3 else (
+                    torch.matmul(x, weight) + bias)  # Broadcast first input.
+            else:
+                x = torch.addmm(bias[member], x, weight[member])
+            if i < len(self.weights) - 1 or self._last_nonlinear:
+                x = self.nonlinearity(x)
+        return x
+
+    @property
+    def output_size(self):
+        """Returns the output size of each member."""
+        return self._output_size
+
+    @property
+    def ensemble_size(self):
+        return self._ensemble_size
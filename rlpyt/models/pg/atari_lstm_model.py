@@ -20,6 +20,13 @@ RnnState = namedarraytuple("RnnState", ["h", "c"])  # For downstream namedarrayt
 class AtariLstmModel(torch.nn.Module):
     """Recurrent model for Atari agents: a convolutional network into an FC layer
     into an LSTM which outputs action probabilities and state-value estimate.
+
+    With ``shared_encoder`` in ``curiosity_kwargs`` (ICM with inverse features
+    and a feature encoding), the convolutional network is the curiosity model's
+    encoder.  The policy reads its features with gradients stopped, so the
+    encoder trains on the inverse loss only; the algorithm computes them once
+    per minibatch (``encode()``) and passes them to both the policy (``phi``)
+    and the curiosity loss.
     """
 
     def __init__(
@@ -44,8 +51,15 @@ class AtariLstmModel(torch.nn.Module):
         if self.obs_stats is not None:
             self.obs_mean, self.obs_std = self.obs_stats
 
+        self.shared_encoder = curiosity_kwargs.get('shared_encoder', False)
+        if self.shared_encoder:
+            # Only ICM's inverse loss trains the encoder (Disagreement's and random features stay fixed).
+            assert (curiosity_kwargs['curiosity_alg'] == 'icm' and curiosity_kwargs['feature_encoding'] != 'none'
+                    and curiosity_kwargs.get('feature_space', 'inverse') == 'inverse'), \
+                "shared_encoder needs ICM with inverse features and a feature encoding"
+
         if curiosity_kwargs['curiosity_alg'] != 'none':
-            curiosity_init_kwargs = {k: curiosity_kwargs[k] for k in curiosity_kwargs.keys() - {'curiosity_alg'}}
+            curiosity_init_kwargs = {k: curiosity_kwargs[k] for k in curiosity_kwargs.keys() - {'curiosity_alg', 'shared_encoder'}}
             if curiosity_kwargs['curiosity_alg'] == 'icm':
                 self.curiosity_model = ICM(image_shape=image_shape, action_size=output_size, **curiosity_init_kwargs)
             if curiosity_kwargs['curiosity_alg'] == 'micm':
@@ -57,7 +71,9 @@ class AtariLstmModel(torch.nn.Module):
             elif curiosity_kwargs['curiosity_alg'] == 'rnd':
                 self.curiosity_model = RND(image_shape=image_shape, obs_stats=self.obs_stats, **curiosity_init_kwargs)
             
-            if curiosity_kwargs['feature_encoding'] == 'idf':
+            if self.shared_encoder:
+                self.conv = None
+            elif curiosity_kwargs['feature_encoding'] == 'idf':
                 self.conv = UniverseHead(image_shape=image_shape,
                                          batch_norm=curiosity_kwargs['batch_norm'])
                 self.conv.output_size = self.curiosity_model.feature_size
@@ -91,12 +107,19 @@ class AtariLstmModel(torch.nn.Module):
                 hidden_sizes=fc_sizes, # Applies nonlinearity at end.
             )
 
-        self.lstm = torch.nn.LSTM(self.conv.output_size + output_size, lstm_size)
+        conv_output_size = self.curiosity_model.feature_size if self.shared_encoder else self.conv.output_size
+        self.lstm = torch.nn.LSTM(conv_output_size + output_size, lstm_size)
         self.pi = torch.nn.Linear(lstm_size, output_size)
         self.value = torch.nn.Linear(lstm_size, 1)
 
 
-    def forward(self, image, prev_action, prev_reward, init_rnn_state):
+    def encode(self, image):
+        """Shared encoder features [T,B,feature_size] of images with leading
+        dims [T,B], with gradients (for the curiosity loss)."""
+        lead_dim, T, B, img_shape = infer_leading_dims(image, 3)
+        return self.curiosity_model.encode(image.view(T, B, *img_shape))
+
+    def forward(self, image, prev_action, prev_reward, init_rnn_state, phi=None):
         """
         Compute action probabilities and value estimate from input state.
         Infers leading dimensions of input: can be [T,B], [B], or []; provides
@@ -105,16 +128,21 @@ class AtariLstmModel(torch.nn.Module):
         [0,255] and converts them to float32 in [0,1] (to minimize image data
         storage and transfer).  Recurrent layers processed as [T,B,H]. Used in
         both sampler and in algorithm (both via the agent).  Also returns the
-        next RNN state.
+        next RNN state.  With a shared encoder, ``phi`` can give the output of
+        ``encode(image)`` already computed for the curiosity loss.
         """       
-        if self.obs_stats is not None: # don't normalize observation
-            image = (image - self.obs_mean) / (self.obs_std+1e-10)
-        img = image.type(torch.float)  # Expect torch.uint8 inputs
+        if self.shared_encoder:
+            lead_dim, T, B, img_shape = infer_leading_dims(image, 3)
+            fc_out = (self.encode(image) if phi is None else phi).detach()
+        else:
+            if self.obs_stats is not None: # don't normalize observation
+                image = (image - self.obs_mean) / (self.obs_std+1e-10)
+            img = image.type(torch.float)  # Expect torch.uint8 inputs
 
-        # Infer (presence of) leading dimensions: [T,B], [B], or [].
-        lead_dim, T, B, img_shape = infer_leading_dims(img, 3) 
+            # Infer (presence of) leading dimensions: [T,B], [B], or [].
+            lead_dim, T, B, img_shape = infer_leading_dims(img, 3) 
 
-        fc_out = self.conv(img.view(T * B, *img_shape))
+            fc_out = self.conv(img.view(T * B, *img_shape))
         lstm_input = torch.cat([
             fc_out.view(T, B, -1),
             prev_action.view(T, B, -1),  # Assumed onehot.
@@ -3,7 +3,7 @@ import numpy as np
 import torch
 
 from rlpyt.utils.tensor import infer_leading_dims, restore_leading_dims
-from rlpyt.models.mlp import MlpModel
+from rlpyt.models.mlp import MlpModel, EnsembleMlpModel
 
 
 class MuMlpModel(torch.nn.Module):
@@ -87,6 +87,41 @@ class QofMuMlpModel(torch.nn.Module):
         return q
 
 
+class QofMuEnsembleMlpModel(torch.nn.Module):
+    """Ensemble of ``ensemble_size`` Q-models (e.g. twin Q for SAC and TD3,
+    or more for REDQ), each as ``QofMuMlpModel``, evaluated together in one
+    fused MLP.  Returns Q-values with the ensemble as the last dimension, or
+    only those of one ``member``."""
+
+    def __init__(
+            self,
+            observation_shape,
+            hidden_sizes,
+            action_size,
+            ensemble_size=2,
+            ):
+        """Instantiate neural net according to inputs."""
+        super().__init__()
+        self._obs_ndim = len(observation_shape)
+        self.mlp = EnsembleMlpModel(
+            input_size=int(np.prod(observation_shape)) + action_size,
+            hidden_sizes=hidden_sizes,
+            output_size=1,
+            ensemble_size=ensemble_size,
+        )
+
+    def forward(self, observation, prev_action, prev_reward, action, member=None):
+        lead_dim, T, B, _ = infer_leading_dims(observation,
+            self._obs_ndim)
+        q_input = torch.cat(
+            [observation.view(T * B, -1), action.view(T * B, -1)], dim=1)
+        q = self.mlp(q_input, member=member).squeeze(-1)  # [N,T*B] or [T*B]
+        if member is None:
+            q = q.transpose(0, 1)  # [T*B,N]
+        q = restore_leading_dims(q, lead_dim, T, B)
+        return q
+
+
 class VMlpModel(torch.nn.Module):
 
     def __init__(
@@ -9,21 +9,30 @@ class RunningMeanStdModel(torch.nn.Module):
     """Adapted from OpenAI baselines.  Maintains a running estimate of mean
     and variance of data along each dimension, accessible in the `mean` and
     `var` attributes.  Supports multi-GPU training by all-reducing statistics
-    across GPUs."""
+    across GPUs.  Statistics stay on the module's device; updates (optionally
+    under a mask over the leading dimensions) never sync with the host."""
 
-    def __init__(self, shape):
+    def __init__(self, shape, epsilon=0.):
         super().__init__()
         self.register_buffer("mean", torch.zeros(shape))
         self.register_buffer("var", torch.ones(shape))
-        self.register_buffer("count", torch.zeros(()))
+        self.register_buffer("count", torch.full((), epsilon))
         self.shape = shape
 
-    def update(self, x):
+    def update(self, x, mask=None):
+        """Updates from data with leading dimensions [T,B], [B], or []; if
+        given, only where ``mask`` (shaped as the leading dimensions) is 1."""
         _, T, B, _ = infer_leading_dims(x, len(self.shape))
-        x = x.view(T * B, *self.shape)
-        batch_mean = x.mean(dim=0)
-        batch_var = x.var(dim=0, unbiased=False)
-        batch_count = T * B
+        x = x.view(T * B, *self.shape).type(self.mean.dtype)
+        if mask is None:
+            batch_mean = x.mean(dim=0)
+            batch_var = x.var(dim=0, unbiased=False)
+            batch_count = T * B
+        else:
+            mask = mask.reshape(T * B, *(1 for _ in self.shape)).type(x.dtype)
+            batch_count = mask.sum()
+            batch_mean = (x * mask).sum(dim=0) / batch_count.clamp(min=1)
+            batch_var = ((x - batch_mean) ** 2 * mask).sum(dim=0) / batch_count.clamp(min=1)
         if dist.is_initialized():  # Assume need all-reduce.
             mean_var = torch.stack([batch_mean, batch_var])
             dist.all_reduce(mean_var)
@@ -31,15 +40,18 @@ class RunningMeanStdModel(torch.nn.Module):
             mean_var /= world_size
             batch_count *= world_size
             batch_mean, batch_var = mean_var[0], mean_var[1]
-        if self.count == 0:
-            self.mean[:] = batch_mean
-            self.var[:] = batch_var
-        else:
-            delta = batch_mean - self.mean
-            total = self.count + batch_count
-            self.mean[:] = self.mean + delta * batch_count / total
-            m_a = self.var * self.count
-            m_b = batch_var * batch_count
-            M2 = m_a + m_b + delta ** 2 * self.count * batch_count / total
-            self.var[:] = M2 / total
+        self.update_from_moments(batch_mean, batch_var, batch_count)
+
+    def update_from_moments(self, batch_mean, batch_var, batch_count):
+        """Parallel-algorithm merge of a batch's moments into the running
+        ones; a batch with zero count leaves them unchanged."""
+        batch_count = torch.as_tensor(batch_count, dtype=self.count.dtype, device=self.count.device)
+        delta = batch_mean - self.mean
+        total = self.count + batch_count
+        safe_total = torch.where(total > 0, total, torch.ones_like(total))
+        self.mean.copy_(self.mean + delta * batch_count / safe_total)
+        m_a = self.var * self.count
+        m_b = batch_var * batch_count
+        M2 = m_a + m_b + delta ** 2 * self.count * batch_count / safe_total
+        self.var.copy_(torch.where(total > 0, M2 / safe_total, self.var))
         self.count += batch_count
@@ -2,6 +2,8 @@
 import torch
 from torch import nn
 
+FOREACH_LERP = hasattr(torch, "_foreach_lerp_")  # (torch>=2.0)
+
 class Flatten(nn.Module):
     def forward(self, x):
         return x.view(x.size(0), -1)
@@ -52,10 +54,33 @@ def update_state_dict(model, state_dict, tau=1, strip_ddp=True):
         state_dict = strip_ddp_state_dict(state_dict)
     if tau == 1:
         model.load_state_dict(state_dict)
-    elif tau > 0:
-        update_sd = {k: tau * state_dict[k] + (1 - tau) * v
-            for k, v in model.state_dict().items()}
-        model.load_state_dict(update_sd)
+    elif tau > 0:  # In place, in one fused op if available.
+        olds, news = list(), list()
+        for k, v in model.state_dict().items():  # (Share storage with model.)
+            if v.is_floating_point():
+                olds.append(v)
+                news.append(state_dict[k])
+            else:
+                v.copy_(state_dict[k])
+        if FOREACH_LERP:
+            torch._foreach_lerp_(olds, news, tau)
+        else:
+            for old, new in zip(olds, news):
+                old.lerp_(new, tau)
+
+
+def clip_grad_norm_ensemble_(parameters, max_norm, ensemble_size):
+    """Like ``torch.nn.utils.clip_grad_norm_()``, but for parameters stacked
+    along a leading ensemble dimension (e.g. ``EnsembleMlpModel``): clips the
+    gradient of each member separately to total 2-norm ``max_norm``, as if
+    each were its own model.  Returns the list of members' total norms."""
+    grads = [p.grad for p in parameters if p.grad is not None]
+    norms = torch.stack([g.reshape(ensemble_size, -1).norm(dim=1) for g in grads])
+    total_norms = norms.norm(dim=0)  # [N]
+    clip_coefs = (max_norm / (total_norms + 1e-6)).clamp(max=1.)
+    for g in grads:
+        g.mul_(clip_coefs.view(ensemble_size, *(1 for _ in g.shape[1:])))
+    return list(total_norms)
 
 
 def strip_ddp_state_dict(state_dict):
@@ -1,6 +1,8 @@
 
 
-from rlpyt.utils.buffer import buffer_from_example, get_leading_dims
+import mmap
+
+from rlpyt.utils.buffer import buffer_from_example, get_leading_dims, np_memmap_array
 from rlpyt.utils.collections import namedarraytuple
 from rlpyt.utils.logging import logger
 
@@ -22,6 +24,12 @@ class FrameBufferMixin:
     written.  Cursor timestep invalid because previous action and reward
     overwritten.  NEW: Next n_frames-1 invalid because observation history
     frames overwritten.
+
+    With ``memmap_dir`` (see ``BaseNStepReturnBuffer``), frames are stored in a
+    memory-mapped file, with each environment's history contiguous and
+    page-aligned, so the replay size is not bounded by RAM.  Pages about to
+    be written or read for a batch are requested from the OS ahead of time
+    (``prefetch_frames()``), rather than faulted in one at a time.
     """
 
     def __init__(self, example, **kwargs):
@@ -36,9 +44,19 @@ class FrameBufferMixin:
             n_dim=1)[0]
         logger.log(f"Frame-based buffer using {n_frames}-frame sequences.")
         # frames: oldest stored at t; duplicate n_frames - 1 beginning & end.
-        self.samples_frames = buffer_from_example(example.observation[0],
-            (self.T + n_frames - 1, self.B),
-            share_memory=self.async_)  # [T+n_frames-1,B,H,W]
+        if self.memmap_dir is None:
+            self.samples_frames = buffer_from_example(example.observation[0],
+                (self.T + n_frames - 1, self.B),
+                share_memory=self.async_)  # [T+n_frames-1,B,H,W]
+            self._frames_mmap = None
+        else:
+            frame = example.observation[0]
+            self.samples_frames = np_memmap_array(
+                (self.T + n_frames - 1, self.B) + frame.shape, frame.dtype,
+                self.memmap_dir, page_axis=1)  # [T+n_frames-1,B,H,W]
+            self._frames_mmap = self.samples_frames.base
+            if hasattr(mmap, "MADV_RANDOM"):  # No read-around on faults.
+                self._frames_mmap.madvise(mmap.MADV_RANDOM)
         # new_frames: shifted so newest stored at t; no duplication.
         self.samples_new_frames = self.samples_frames[n_frames - 1:]  # [T,B,H,W]
         self.off_forward = max(self.off_forward, n_frames - 1)
@@ -47,6 +65,8 @@ class FrameBufferMixin:
         """Appends all samples except for the `observation` as normal.
         Only the new frame in each observation is recorded."""
         t, fm1 = self.t, self.n_frames - 1
+        T_new = samples.observation.shape[0]
+        self.prefetch_frames([t + fm1] * self.B, range(self.B), T_new)
         buffer_samples = BufferSamples(*(v for k, v in samples.items()
             if k != "observation"))
         T, idxs = super().append_samples(buffer_samples)
@@ -57,3 +77,25 @@ class FrameBufferMixin:
         elif self.t < t:  # Wrapped: copy duplicate frames.
             self.samples_frames[:fm1] = self.samples_frames[-fm1:]
         return T, idxs
+
+    def prefetch_frames(self, T_idxs, B_idxs, n):
+        """With memory-mapped frames, asks the OS to start reading in frames
+        ``[t, t + n)`` (wrapping) of each environment ``b``, e.g. for a batch
+        about to be extracted, so the pages load together rather than fault
+        in one by one.  Otherwise does nothing."""
+        if self._frames_mmap is None or not hasattr(mmap, "MADV_WILLNEED"):
+            return
+        t_stride, b_stride = self.samples_frames.strides[:2]
+        T_frames = self.samples_frames.shape[0]
+        for t, b in zip(T_idxs, B_idxs):
+            t_end = t + n
+            self._madvise_willneed(b * b_stride + t * t_stride,
+                b * b_stride + min(t_end, T_frames) * t_stride)
+            if t_end > T_frames:  # Wrap (first n_frames - 1 are duplicates).
+                self._madvise_willneed(b * b_stride,
+                    b * b_stride + (t_end - self.T) * t_stride)
+
+    def _madvise_willneed(self, start, end):
+        start, end = int(start), int(end)
+        aligned = start - start % mmap.PAGESIZE
+        self._frames_mmap.madvise(mmap.MADV_WILLNEED, aligned, end - aligned)
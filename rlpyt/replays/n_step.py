@@ -4,7 +4,7 @@ import numpy as np
 
 
 from rlpyt.replays.base import BaseReplayBuffer
-from rlpyt.utils.buffer import buffer_from_example, get_leading_dims
+from rlpyt.utils.buffer import buffer_from_example, buffer_func, get_leading_dims
 from rlpyt.algos.utils import discount_return_n_step
 
 
@@ -36,22 +36,29 @@ class BaseNStepReturnBuffer(BaseReplayBuffer):
     appears in any of the n-step future, such that the following value should
     *not* be bootstrapped.
 
+    With ``memmap_dir``, all storage is allocated in memory-mapped files in
+    that directory (e.g. on a local disk), which the OS pages in and out as
+    needed, so the replay size is not bounded by RAM (see
+    ``np_memmap_array()``).  Also shared among forked processes.
+
     """
 
-    def __init__(self, example, size, B, discount=1, n_step_return=1):
+    def __init__(self, example, size, B, discount=1, n_step_return=1,
+            memmap_dir=None):
         self.T = T = math.ceil(size / B)
         self.B = B
         self.size = T * B
         self.discount = discount
         self.n_step_return = n_step_return
+        self.memmap_dir = memmap_dir
         self.t = 0  # Cursor (in T dimension).
         self.samples = buffer_from_example(example, (T, B),
-            share_memory=self.async_)
+            share_memory=self.async_, memmap_dir=memmap_dir)
         if n_step_return > 1:
             self.samples_return_ = buffer_from_example(example.reward, (T, B),
-                share_memory=self.async_)
+                share_memory=self.async_, memmap_dir=memmap_dir)
             self.samples_done_n = buffer_from_example(example.done, (T, B),
-                share_memory=self.async_)
+                share_memory=self.async_, memmap_dir=memmap_dir)
         else:
             self.samples_return_ = self.samples.reward
             self.samples_done_n = self.samples.done
@@ -78,6 +85,25 @@ class BaseNStepReturnBuffer(BaseReplayBuffer):
         self.t = (t + T) % self.T
         return T, idxs  # Pass these on to subclass.
 
+    def memory_usage(self):
+        """Returns the number of bytes held in each of the buffer's storage
+        arrays (the ``samples*`` attributes), by attribute name; views into
+        storage already counted are not counted again."""
+        usage, counted = dict(), list()
+        for name, value in vars(self).items():
+            if not name.startswith("samples"):
+                continue
+            arrays = list()
+            buffer_func(value, arrays.append)
+            nbytes = 0
+            for a in arrays:
+                if not any(np.may_share_memory(a, c) for c in counted):
+                    nbytes += a.nbytes
+                    counted.append(a)
+            if nbytes:
+                usage[name] = nbytes
+        return usage
+
     def compute_returns(self, T):
         """Compute the n-step returns using the new rewards just written into
         the buffer, but before the buffer cursor is advanced.  Input ``T`` is
@@ -17,6 +17,7 @@ class NStepFrameBuffer(FrameBufferMixin, NStepReturnBuffer):
         ``done=True`` is found, the history is not full due to recent
         environment reset, so these frames are zero-ed.
         """
+        self.prefetch_frames(T_idxs, B_idxs, self.n_frames)
         # Begin/end frames duplicated in samples_frames so no wrapping here.
         # return np.stack([self.samples_frames[t:t + self.n_frames, b]
         #     for t, b in zip(T_idxs, B_idxs)], axis=0)  # [B,C,H,W]
@@ -18,11 +18,12 @@ class PrioritizedReplay:
     The priority tree must configure at instantiation if priorities will be
     input with samples in ``append_samples()``, by parameter
     ``input_priorities=True``, else the default value will be applied to all
-    new samples.
+    new samples.  With ``normalize_is_weights=False``, importance-sampling
+    weights are returned unnormalized (e.g. to normalize across shards).
     """
 
     def __init__(self, alpha=0.6, beta=0.4, default_priority=1, unique=False,
-            input_priorities=False, **kwargs):
+            input_priorities=False, normalize_is_weights=True, **kwargs):
         super().__init__(**kwargs)
         save__init__args(locals())
         self.init_priority_tree()
@@ -65,7 +66,8 @@ class PrioritizedReplay:
             unique=self.unique)
         batch = self.extract_batch(T_idxs, B_idxs)
         is_weights = (1. / (priorities + EPS)) ** self.beta  # Unnormalized.
-        is_weights /= max(is_weights)  # Normalize.
+        if self.normalize_is_weights:
+            is_weights /= max(is_weights)  # Normalize.
         is_weights = torchify_buffer(is_weights).float()
         return SamplesFromReplayPri(*batch, is_weights=is_weights)
 
@@ -23,6 +23,7 @@ class SequenceNStepFrameBuffer(FrameBufferMixin, SequenceNStepReturnBuffer):
         observation = np.empty(shape=(T, len(B_idxs), self.n_frames) +  # [T,B,C,H,W]
             self.samples_frames.shape[2:], dtype=self.samples_frames.dtype)
         fm1 = self.n_frames - 1
+        self.prefetch_frames(T_idxs, B_idxs, T + fm1)
         for i, (t, b) in enumerate(zip(T_idxs, B_idxs)):
             if t + T > self.T:  # wrap (n_frames duplicated)
                 m = self.T - t
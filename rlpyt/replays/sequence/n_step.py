@@ -1,5 +1,6 @@
 
 import math
+import multiprocessing as mp
 import numpy as np
 
 from rlpyt.replays.n_step import BaseNStepReturnBuffer
@@ -13,6 +14,26 @@ SamplesFromReplay = namedarraytuple("SamplesFromReplay",
 
 SamplesToBuffer = None
 
+RNN_STATE_STORAGE_DTYPES = dict(float16=np.float16, bfloat16=np.uint16)
+
+
+def compress_rnn_state(rnn_state, dtype):
+    """Rounds the float32 array ``rnn_state`` to ``dtype`` for storage:
+    "float16", or "bfloat16", held as the upper 16 bits of the float32
+    values (rounded to nearest even) in ``np.uint16``."""
+    rnn_state = np.asarray(rnn_state, dtype=np.float32)
+    if dtype == "bfloat16":
+        bits = rnn_state.view(np.uint32)
+        return ((bits + 0x7FFF + ((bits >> 16) & 1)) >> 16).astype(np.uint16)
+    return rnn_state.astype(RNN_STATE_STORAGE_DTYPES[dtype])
+
+
+def decompress_rnn_state(stored, dtype):
+    """Inverse of ``compress_rnn_state()``, returns float32."""
+    if dtype == "bfloat16":
+        return (stored.astype(np.uint32) << 16).view(np.float32)
+    return stored.astype(np.float32)
+
 
 class SequenceNStepReturnBuffer(BaseNStepReturnBuffer):
     """Base n-step return buffer for sequences replays.  Includes storage of
@@ -22,11 +43,28 @@ class SequenceNStepReturnBuffer(BaseNStepReturnBuffer):
     stores RNN state, to save memory.  The replay mechanism must account for the
     fact that only time-steps with saved RNN state are valid first states for replay.
     (``rnn_state_interval<1`` does not store RNN state.)
+
+    Use of ``rnn_state_dtype`` ("float16" or "bfloat16") stores RNN state in
+    half the memory, returned as float32 in batches.  Writing a state which
+    overflows the storage dtype raises an error (bfloat16 has float32's
+    range), and ``rnn_state_error`` tracks the largest rounding error so far
+    (in shared memory, so the learner reads what async memory copiers wrote).
     """
 
-    def __init__(self, example, size, B, rnn_state_interval, batch_T=None, **kwargs):
+    def __init__(self, example, size, B, rnn_state_interval, batch_T=None,
+            rnn_state_dtype=None, **kwargs):
         self.rnn_state_interval = rnn_state_interval
         self.batch_T = batch_T  # Maybe required fixed depending on replay type.
+        if rnn_state_interval == 0:
+            rnn_state_dtype = None
+        if rnn_state_dtype is not None:
+            if rnn_state_dtype not in RNN_STATE_STORAGE_DTYPES:
+                raise ValueError(f"Unsupported rnn_state_dtype: {rnn_state_dtype}"
+                    f", use one of {list(RNN_STATE_STORAGE_DTYPES)}.")
+            example = example._replace(prev_rnn_state=buffer_func(
+                example.prev_rnn_state, compress_rnn_state, rnn_state_dtype))
+        self.rnn_state_dtype = rnn_state_dtype
+        self._rnn_state_error = mp.RawValue("d", 0.)
         if rnn_state_interval <= 1:  # Store no rnn state or every rnn state.
             buffer_example = example
         else:
@@ -40,7 +78,7 @@ class SequenceNStepReturnBuffer(BaseNStepReturnBuffer):
                 math.ceil(size / B) / rnn_state_interval)
             self.samples_prev_rnn_state = buffer_from_example(example.prev_rnn_state,
                 (size // (B * rnn_state_interval), B),
-                share_memory=self.async_)
+                share_memory=self.async_, memmap_dir=kwargs.get("memmap_dir"))
         super().__init__(example=buffer_example, size=size, B=B, **kwargs)
         if rnn_state_interval > 1:
             assert self.T % rnn_state_interval == 0
@@ -51,6 +89,9 @@ class SequenceNStepReturnBuffer(BaseNStepReturnBuffer):
         ``append_samples()``.
         """
         t, rsi = self.t, self.rnn_state_interval
+        if self.rnn_state_dtype is not None:
+            samples = samples._replace(prev_rnn_state=buffer_func(
+                samples.prev_rnn_state, self.compress_rnn_state))
         if rsi <= 1:  # All or no rnn states stored.
             return super().append_samples(samples)
         buffer_samples = SamplesToBuffer(*(v for k, v in samples.items()
@@ -84,6 +125,9 @@ class SequenceNStepReturnBuffer(BaseNStepReturnBuffer):
             init_rnn_state = self.samples.prev_rnn_state[T_idxs, B_idxs]
         else:  # rsi == 0
             init_rnn_state = None
+        if self.rnn_state_dtype is not None:
+            init_rnn_state = buffer_func(init_rnn_state, decompress_rnn_state,
+                self.rnn_state_dtype)
         batch = SamplesFromReplay(
             all_observation=self.extract_observation(T_idxs, B_idxs,
                 T + self.n_step_return),
@@ -103,3 +147,24 @@ class SequenceNStepReturnBuffer(BaseNStepReturnBuffer):
         """Generalization anticipating frame-buffer."""
         return buffer_func(self.samples.observation, extract_sequences,
             T_idxs, B_idxs, T)
+
+    def compress_rnn_state(self, rnn_state):
+        """Converts one array of incoming RNN state to the storage dtype,
+        checking that finite values stay finite, and updating
+        ``rnn_state_error`` with the largest absolute rounding error."""
+        rnn_state = np.asarray(rnn_state, dtype=np.float32)
+        with np.errstate(over="ignore"):  # Checked below.
+            stored = compress_rnn_state(rnn_state, self.rnn_state_dtype)
+        error = np.abs(decompress_rnn_state(stored, self.rnn_state_dtype) - rnn_state)
+        if np.any(np.isinf(error) & np.isfinite(rnn_state)):
+            raise ValueError(f"RNN state (max magnitude "
+                f"{np.abs(rnn_state).max():.4g}) overflows storage as "
+                f"{self.rnn_state_dtype}; use rnn_state_dtype='bfloat16' or None.")
+        if error.size:
+            self._rnn_state_error.value = max(self._rnn_state_error.value,
+                float(np.nanmax(error)))
+        return stored
+
+    @property
+    def rnn_state_error(self):
+        return self._rnn_state_error.value
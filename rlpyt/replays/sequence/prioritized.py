@@ -44,10 +44,14 @@ class PrioritizedSequenceReplay:
     effort might all be simplified by writing a replay buffer which manages a
     list of valid trajectories to sample, rather than a monolithic,
     pre-allocated buffer.)
+
+    With ``normalize_is_weights=False``, importance-sampling weights are
+    returned unnormalized (e.g. to normalize across shards).
     """
 
     def __init__(self, alpha=0.6, beta=0.4, default_priority=1, unique=False,
-            input_priorities=False, input_priority_shift=0, **kwargs):
+            input_priorities=False, input_priority_shift=0,
+            normalize_is_weights=True, **kwargs):
         super().__init__(**kwargs)
         save__init__args(locals())
         assert self.batch_T is not None, "Must assign fixed batch_T for prioritized."
@@ -106,7 +110,8 @@ class PrioritizedSequenceReplay:
             T_idxs = T_idxs * self.rnn_state_interval
         batch = self.extract_batch(T_idxs, B_idxs, self.batch_T)
         is_weights = (1. / priorities) ** self.beta
-        is_weights /= max(is_weights)  # Normalize.
+        if self.normalize_is_weights:
+            is_weights /= max(is_weights)  # Normalize.
         is_weights = torchify_buffer(is_weights).float()
         return SamplesFromReplayPri(*batch, is_weights=is_weights)
 
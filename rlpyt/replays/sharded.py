@@ -0,0 +1,114 @@
+
+import numpy as np
+
+from rlpyt.replays.base import BaseReplayBuffer
+from rlpyt.replays.non_sequence.prioritized import PrioritizedReplay
+from rlpyt.replays.sequence.n_step import SequenceNStepReturnBuffer
+from rlpyt.replays.sequence.prioritized import PrioritizedSequenceReplay
+from rlpyt.utils.buffer import buffer_concatenate, numpify_buffer
+
+
+class ShardedAsyncReplayBuffer(BaseReplayBuffer):
+    """Asynchronous replay buffer split along the B dimension into
+    ``n_shards`` independent buffers of class ``ShardCls`` (e.g.
+    ``AsyncPrioritizedReplayFrameBuffer``), each holding a contiguous group of
+    the sampler's environments, with its own cursor, read-write lock, and (if
+    prioritized) sum tree.  Appending takes each shard's write lock in turn,
+    and sampling takes each sampled shard's read lock in turn, so the writers
+    and the learner only contend on one shard at a time, rather than the
+    whole buffer.
+
+    Batches are drawn across shards in proportion to each shard's total
+    priority (or number of samples, if uniform), read from shared memory
+    without locking; importance-sampling weights are normalized across the
+    whole batch.  The remaining keyword arguments are passed on to each shard,
+    with ``size`` divided among them.
+    """
+
+    async_ = True
+
+    def __init__(self, ShardCls, n_shards, example, size, B, **kwargs):
+        n_shards = min(n_shards, B)
+        B_bounds = np.linspace(0, B, n_shards + 1).astype(int).tolist()
+        self.B_slices = [slice(low, high) for low, high in
+            zip(B_bounds[:-1], B_bounds[1:])]
+        self.prioritized = issubclass(ShardCls,
+            (PrioritizedReplay, PrioritizedSequenceReplay))
+        if self.prioritized:
+            kwargs["normalize_is_weights"] = False
+        self.shards = [ShardCls(example=example, size=size * (s.stop - s.start) // B,
+            B=s.stop - s.start, **kwargs) for s in self.B_slices]
+        self.sequence = isinstance(self.shards[0], SequenceNStepReturnBuffer)
+        self.B = B
+        self._sampled_counts = None
+
+    def append_samples(self, samples):
+        """Writes each shard's environments' samples into it, under that
+        shard's write lock only; priorities (if input) are split along B."""
+        if hasattr(samples, "priorities"):
+            priorities = np.asarray(samples.priorities)
+            for shard, B_slice in zip(self.shards, self.B_slices):
+                ret = shard.append_samples(samples._replace(
+                    priorities=priorities[..., B_slice] if priorities.ndim else priorities,
+                    samples=samples.samples[:, B_slice]))
+        else:
+            for shard, B_slice in zip(self.shards, self.B_slices):
+                ret = shard.append_samples(samples[:, B_slice])
+        return ret  # Shard cursors advance together.
+
+    def sample_batch(self, batch_B, *args, **kwargs):
+        """Splits ``batch_B`` among the shards at random, in proportion to
+        their sampling mass, and concatenates the batches sampled from
+        each."""
+        weights = np.array([self._shard_weight(shard) for shard in self.shards],
+            dtype=np.float64)
+        if not weights.sum() > 0:
+            weights[:] = 1
+        counts = np.random.multinomial(batch_B, weights / weights.sum())
+        batches = [shard.sample_batch(count, *args, **kwargs)
+            for shard, count in zip(self.shards, counts) if count > 0]
+        self._sampled_counts = counts
+        batch = self._concatenate(batches)
+        if self.prioritized:
+            batch.is_weights.div_(batch.is_weights.max())  # Normalize.
+        return batch
+
+    def update_batch_priorities(self, priorities):
+        """Splits the new priorities of the last batch back among the shards
+        it was sampled from."""
+        priorities = numpify_buffer(priorities)
+        bounds = np.cumsum(self._sampled_counts)
+        for shard, count, high in zip(self.shards, self._sampled_counts, bounds):
+            if count > 0:
+                shard.update_batch_priorities(priorities[high - count:high])
+
+    def set_beta(self, beta):
+        for shard in self.shards:
+            shard.set_beta(beta)
+
+    def memory_usage(self):
+        """Sums the storage of all shards, by attribute name."""
+        usage = dict()
+        for shard in self.shards:
+            for name, nbytes in shard.memory_usage().items():
+                usage[name] = usage.get(name, 0) + nbytes
+        return usage
+
+    @property
+    def rnn_state_error(self):
+        """Largest RNN state rounding error stored in any shard."""
+        return max(shard.rnn_state_error for shard in self.shards)
+
+    def _shard_weight(self, shard):
+        if self.prioritized:
+            return shard.priority_tree.tree[0]
+        full = shard._async_buffer_full.value
+        return shard.B * (shard.T if full else shard.async_t.value)
+
+    def _concatenate(self, batches):
+        if not self.sequence:
+            return buffer_concatenate(batches)
+        # Sequence fields are [T,B], except the initial RNN state and weights.
+        return batches[0]._make(buffer_concatenate(field_batches,
+            axis=0 if name in ("init_rnn_state", "is_weights") else 1)
+            for name, field_batches in zip(batches[0]._fields, zip(*batches)))
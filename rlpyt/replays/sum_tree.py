@@ -4,6 +4,8 @@ import multiprocessing as mp
 
 from rlpyt.utils.buffer import np_mp_array
 
+FAST_UFUNC_AT = np.lib.NumpyVersion(np.__version__) >= "1.25.0"
+
 
 class SumTree:
     """
@@ -101,32 +103,41 @@ class SumTree:
     def sample(self, n, unique=False):
         """Get `n` samples, with replacement (default) or without.  Use 
         ``np.random.rand()`` to generate random values with which to descend
-        the tree to each sampled leaf node. Returns `T_idxs` and `B_idxs`, and sample
-        priorities."""
+        the tree to each sampled leaf node; without replacement, these are
+        stratified (see ``sample_unique()``).  Returns `T_idxs` and `B_idxs`,
+        and sample priorities."""
         self._sampled_unique = unique
-        random_values = np.random.rand(int(n*1 if unique else n))
-        tree_idxes, scaled_random_values = self.find(random_values)
         if unique:
-            i = 0
-            while i < 100:
-                tree_idxes, unique_idx = np.unique(tree_idxes, return_index=True)
-                scaled_random_values = scaled_random_values[unique_idx]
-                if len(tree_idxes) < n:
-                    new_idxes, new_values = self.find(np.random.rand(2 * (n - len(tree_idxes))))
-                    tree_idxes = np.concatenate([tree_idxes, new_idxes])
-                    scaled_random_values = np.concatenate([scaled_random_values, new_values])
-                else:
-                    break
-                i += 1
-            if len(tree_idxes) < n:
-                raise RuntimeError("After 100 tries, unable to get unique indexes.")
-            tree_idxes = tree_idxes[:n]
-
+            tree_idxes = self.sample_unique(n)
+        else:
+            tree_idxes, _ = self.find(np.random.rand(n))
         priorities = self.tree[tree_idxes]
         self.prev_tree_idxs = tree_idxes
         T_idxs, B_idxs = np.divmod(tree_idxes - self.low_idx, self.B)
         return (T_idxs, B_idxs), priorities
 
+    def sample_unique(self, n):
+        """Returns `n` distinct leaf tree indexes, by descending with one
+        random value from each of `n` equal segments of the total priority,
+        which lands on distinct leaves unless one holds more than 1/n of it.
+        In that case, the shortfall is drawn the same way from the tree less
+        the priorities of the leaves already drawn (see ``find()``); the tree
+        itself is only read, as under the shared read lock of the async
+        replay.  If the undrawn leaves' priorities are lost to round-off in
+        the tree sums (so a retry draws nothing new), the rest is drawn from
+        those leaves directly."""
+        tree_idxes = np.unique(self.find(self._stratified_values(n))[0])
+        while len(tree_idxes) < n:
+            new_idxes = np.unique(self.find(self._stratified_values(n - len(tree_idxes)),
+                drawn=tree_idxes)[0])
+            # (Round-off can still land on drawn leaves or zero priorities.)
+            new_idxes = new_idxes[self.tree[new_idxes] > 0]
+            new_idxes = np.setdiff1d(new_idxes, tree_idxes, assume_unique=True)
+            if len(new_idxes) == 0:
+                new_idxes = self._choice_undrawn(n - len(tree_idxes), drawn=tree_idxes)
+            tree_idxes = np.concatenate([tree_idxes, new_idxes])
+        return tree_idxes
+
     def update_batch_priorities(self, priorities):
         """Apply new priorities to tree at the leaf positions where the last
         batch was returned from the ``sample()`` method.
@@ -204,23 +215,71 @@ class SumTree:
             self.propagate_diffs(idxs, diffs, min_level=1)
 
     def propagate_diffs(self, tree_idxs, diffs, min_level=1):
-        for _ in range(min_level, self.tree_levels):
-            tree_idxs = (tree_idxs - 1) // 2  # Rise a level
-            np.add.at(self.tree, tree_idxs, diffs)
+        """Adds `diffs` into all ancestors of `tree_idxs` (from `min_level`
+        up).  Before numpy 1.25, ``np.add.at()`` is slow, so instead the
+        ancestors of every index at every level are listed together, and the
+        diffs landing on each distinct node are summed with ``np.bincount()``
+        before a single add into the tree."""
+        if FAST_UFUNC_AT:
+            for _ in range(min_level, self.tree_levels):
+                tree_idxs = (tree_idxs - 1) // 2  # Rise a level
+                np.add.at(self.tree, tree_idxs, diffs)
+            return
+        if len(tree_idxs) == 0:
+            return
+        shifts = np.arange(min_level, self.tree_levels)[:, None]
+        ancestor_idxs = ((tree_idxs + 1) >> shifts) - 1  # [levels, n]
+        ancestor_idxs, inverse = np.unique(ancestor_idxs, return_inverse=True)
+        self.tree[ancestor_idxs] += np.bincount(inverse.reshape(-1),
+            weights=np.broadcast_to(diffs, shifts.shape[:1] + np.shape(tree_idxs)).reshape(-1))
 
-    def find(self, random_values):
-        """Param random_values: numpy array of floats in range [0, 1] """
-        random_values = self.tree[0] * random_values  # Double precision.
+    def find(self, random_values, drawn=None):
+        """Param random_values: numpy array of floats in range [0, 1].
+        Descends the tree for all values together, one level at a time.
+        Optional `drawn` leaf tree indexes are left out, by subtracting their
+        priorities from their ancestors' sums on the way down."""
+        if drawn is None:
+            total, drawn_sum = self.tree[0], None
+        else:
+            shifts = np.arange(self.tree_levels)[:, None]
+            drawn_nodes, inverse = np.unique(((drawn + 1) >> shifts) - 1,
+                return_inverse=True)  # Leaves and all their ancestors.
+            drawn_sums = np.bincount(inverse.reshape(-1), weights=np.broadcast_to(
+                self.tree[drawn], (self.tree_levels, len(drawn))).reshape(-1))
+            total = self.tree[0] - drawn_sums[0]  # (Root is drawn_nodes[0].)
+
+            def drawn_sum(tree_idxs):
+                pos = np.minimum(np.searchsorted(drawn_nodes, tree_idxs),
+                    len(drawn_nodes) - 1)
+                return np.where(drawn_nodes[pos] == tree_idxs, drawn_sums[pos], 0.)
+
+        random_values = total * random_values  # Double precision.
         scaled_random_values = random_values.copy()
         tree_idxs = np.zeros(len(random_values), dtype=np.int64)
         for _ in range(self.tree_levels - 1):
             tree_idxs = 2 * tree_idxs + 1
             left_values = self.tree[tree_idxs]
-            where_right = np.where(random_values > left_values)[0]
-            tree_idxs[where_right] += 1
-            random_values[where_right] -= left_values[where_right]
+            if drawn_sum is not None:
+                left_values = np.maximum(left_values - drawn_sum(tree_idxs), 0.)
+            go_right = random_values > left_values
+            tree_idxs += go_right
+            random_values -= left_values * go_right
         return tree_idxs, scaled_random_values
 
+    def _stratified_values(self, n):
+        return (np.arange(n) + np.random.rand(n)) / n
+
+    def _choice_undrawn(self, n, drawn):
+        """`n` distinct leaf tree indexes, with probability proportional to
+        priority among the nonzero leaves not in `drawn`."""
+        leaves = np.setdiff1d(np.flatnonzero(self.priorities) + self.low_idx,
+            drawn, assume_unique=True)
+        if len(leaves) < n:
+            raise RuntimeError(f"Fewer than {n + len(drawn)} nonzero "
+                "priorities, unable to get unique indexes.")
+        p = self.tree[leaves]
+        return np.random.choice(leaves, n, replace=False, p=p / p.sum())
+
 
 class AsyncSumTree(SumTree):
     """Allocates the tree into shared memory, and manages asynchronous cursor
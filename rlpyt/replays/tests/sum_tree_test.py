@@ -0,0 +1,67 @@
+"""Tests of sampling without replacement from the replay sum tree."""
+
+import signal
+import unittest
+
+import numpy as np
+
+from rlpyt.replays.sum_tree import SumTree
+
+
+def make_tree(priorities):
+    tree = SumTree(T=len(priorities), B=1, off_backward=0, off_forward=1)
+    tree.advance(len(priorities) - 1)
+    idxs = np.arange(len(priorities)) + tree.low_idx
+    tree.reconstruct(idxs, np.asarray(priorities, dtype=np.float64))
+    return tree
+
+
+class SumTreeSampleUniqueTest(unittest.TestCase):
+
+    def setUp(self):
+        # A sampling loop which never finishes fails the test instead of hanging it.
+        signal.signal(signal.SIGALRM, lambda *args: self.fail('sample_unique did not return'))
+        signal.alarm(10)
+
+    def tearDown(self):
+        signal.alarm(0)
+
+    def assertUniqueSample(self, tree, n):
+        before = tree.tree.copy()
+        (T_idxs, _), priorities = tree.sample(n, unique=True)
+        self.assertEqual(len(np.unique(T_idxs)), n)
+        self.assertTrue((priorities > 0).all())
+        self.assertTrue(np.array_equal(tree.tree, before))  # Only read.
+        return T_idxs
+
+    def testDominantLeaf(self):
+        """A leaf whose priority swamps the others' in float64 sums."""
+        tree = make_tree([1e17, 1, 1, 1])
+        for _ in range(20):
+            T_idxs = self.assertUniqueSample(tree, 3)
+            self.assertIn(0, T_idxs)
+
+    def testNegligibleLeaves(self):
+        """More leaves needed than carry any mass in the sums."""
+        tree = make_tree([1.] * 10 + [1e-20] * 1014)
+        for _ in range(20):
+            T_idxs = self.assertUniqueSample(tree, 32)
+            self.assertTrue(set(range(10)) <= set(T_idxs))
+
+    def testLargeLeaves(self):
+        """Leaves holding more than 1/n of the total are all drawn."""
+        tree = make_tree([1000., 300.] + [1.] * 98)
+        counts = np.zeros(100)
+        for _ in range(500):
+            counts[self.assertUniqueSample(tree, 4)] += 1
+        self.assertEqual(counts[0], 500)
+        self.assertEqual(counts[1], 500)
+
+    def testTooFewNonzero(self):
+        tree = make_tree([1.] * 5 + [0.] * 5)
+        with self.assertRaises(RuntimeError):
+            tree.sample(8, unique=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
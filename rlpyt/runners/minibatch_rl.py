@@ -300,6 +300,87 @@ class MinibatchRl(MinibatchRlBase):
             logger.record_histogram(k, v)
 
 
+class MinibatchRlPipelined(MinibatchRl):
+    """
+    Runs on-policy RL (e.g. PPO, A2C) with sampling overlapped with
+    optimization: while the algorithm trains on batch ``itr``, sampler
+    workers already collect batch ``itr + 1`` with the parameters from
+    before that training, so each batch is one update stale.  The algorithm
+    corrects for that with its likelihood ratio against the sampling policy.
+    Before dispatching batch ``itr + 1``, the runner measures the KL
+    divergence from the policy which sampled batch ``itr`` to the current one
+    (``algo.measure_policy_lag()``); whenever that exceeds ``max_policy_lag``,
+    batch ``itr + 1`` is collected after optimizing instead (i.e.
+    synchronously, as in ``MinibatchRl``).  Intrinsic rewards are computed
+    by the algorithm, in batch order, so curiosity bookkeeping is unaffected.
+    Requires a ``PipelinedCpuSampler``; no evaluation.
+    """
+
+    def __init__(self, max_policy_lag=0.05, **kwargs):
+        """
+        Args:
+            max_policy_lag (float): KL divergence (sampling to current policy) above which the next batch is collected synchronously.
+        """
+        super().__init__(**kwargs)
+        self.max_policy_lag = max_policy_lag
+
+    def startup(self):
+        """
+        Extends base ``startup()`` to tell the algorithm its samples are stale.
+        """
+        self.algo.stale_samples = True
+        return super().startup()
+
+    def train(self):
+        """
+        Performs startup, then loops by finishing batch ``itr``, starting batch
+        ``itr + 1`` (unless batch ``itr`` lags the current policy too far), and
+        running ``algo.optimize_agent()`` on batch ``itr``, logging diagnostics
+        at the specified interval.
+        """
+        n_itr = self.startup()
+        if self.pretrain != 'None':
+            status_file_read = open(self.log_dir + '/last_itr.txt', 'r')
+            starting_itr = int(status_file_read.read().split('\n')[-2])
+        else:
+            starting_itr = 0
+        self.sampler.start_samples(starting_itr)
+        for itr in range(starting_itr, n_itr):
+            logger.set_iteration(itr)
+            with logger.prefix(f"itr #{itr} "):
+                samples, traj_infos = self.sampler.finish_samples(itr)
+                self.agent.train_mode(itr)
+                policy_lag = self.algo.measure_policy_lag(samples)
+                self._policy_lags.append(policy_lag)
+                overlap = policy_lag <= self.max_policy_lag and itr + 1 < n_itr
+                if overlap:
+                    self.sampler.start_samples(itr + 1)
+                opt_info, layer_info = self.algo.optimize_agent(itr, samples)
+                if not overlap and itr + 1 < n_itr:
+                    self._sync_itrs += 1
+                    self.sampler.start_samples(itr + 1)
+                self.store_diagnostics(itr, traj_infos, opt_info)
+                if (itr + 1) % self.log_interval_itrs == 0:
+                    with open(self.log_dir + '/last_itr.txt', 'a') as status_file:
+                        status_file.write(str(itr) + '\n')
+                    self.log_diagnostics(itr)
+                    self.log_weights(layer_info)
+        self.shutdown()
+
+    def initialize_logging(self):
+        self._policy_lags = list()
+        self._sync_itrs = 0
+        super().initialize_logging()
+
+    def log_diagnostics(self, itr, prefix='Diagnostics/'):
+        with logger.tabular_prefix(prefix):
+            logger.record_tabular('PolicyLag', sum(self._policy_lags) / max(len(self._policy_lags), 1))
+            logger.record_tabular('SyncItrs', self._sync_itrs)
+        super().log_diagnostics(itr, prefix=prefix)
+        self._policy_lags = list()
+        self._sync_itrs = 0
+
+
 class MinibatchRlEval(MinibatchRlBase):
     """
     Runs RL on minibatches; tracks performance offline using evaluation
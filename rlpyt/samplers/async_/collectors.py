@@ -1,6 +1,6 @@
 
 from rlpyt.samplers.parallel.cpu.collectors import (CpuResetCollector,
-    CpuWaitResetCollector)
+    CpuWaitResetCollector, VecCpuResetCollector, VecCpuWaitResetCollector)
 from rlpyt.samplers.parallel.gpu.collectors import (GpuResetCollector,
     GpuWaitResetCollector)
 
@@ -26,6 +26,14 @@ class DbCpuWaitResetCollector(DoubleBufferCollectorMixin, CpuWaitResetCollector)
     pass
 
 
+class DbVecCpuResetCollector(DoubleBufferCollectorMixin, VecCpuResetCollector):
+    pass
+
+
+class DbVecCpuWaitResetCollector(DoubleBufferCollectorMixin, VecCpuWaitResetCollector):
+    pass
+
+
 class DbGpuResetCollector(DoubleBufferCollectorMixin, GpuResetCollector):
     pass
 
@@ -1,5 +1,6 @@
 
 
+from rlpyt.samplers.buffer import build_frame_samples, extract_frame_observation
 from rlpyt.samplers.collections import BatchSpec, TrajInfo, Samples
 from rlpyt.utils.quick_args import save__init__args
 
@@ -22,6 +23,7 @@ class BaseSampler:
         eval_max_trajectories: optional earlier cutoff for evaluation phase
         record_freq: number of episodes between recording video (0 means no video, first process is filmed)
         log_dir: log directory where results are kept (used to know where to save videos)
+        frame_buffer (bool): if ``True``, record only the newest frame of each frame-stacked observation in the samples buffer, and piece observations back together once per batch (expects older frames zero-filled at reset, as in ``AtariEnv``)
     """
 
     alternating = False
@@ -41,7 +43,8 @@ class BaseSampler:
             eval_max_steps=None,  # int if using evaluation.
             eval_max_trajectories=None,  # Optional earlier cutoff.
             record_freq=0,
-            log_dir=None
+            log_dir=None,
+            frame_buffer=False,
             ):
         eval_max_steps = None if eval_max_steps is None else int(eval_max_steps)
         eval_max_trajectories = (None if eval_max_trajectories is None else
@@ -66,6 +69,22 @@ class BaseSampler:
     def shutdown(self):
         pass
 
+    def _build_frame_samples(self, examples):
+        """With a frame buffer, allocates the full samples handed to the
+        algorithm; call after building ``self.samples_np``."""
+        if self.frame_buffer:
+            self.frame_samples_pyt, self._all_observation = build_frame_samples(
+                self.samples_np, n_frames=examples["observation"].shape[0])
+
+    def _samples_out(self):
+        """Returns the samples for the algorithm, piecing observations back
+        together first if using a frame buffer."""
+        if not self.frame_buffer:
+            return self.samples_pyt
+        extract_frame_observation(self.samples_np, self._all_observation,
+            self.mid_batch_reset)
+        return self.frame_samples_pyt
+
     @property
     def batch_size(self):
         return self.batch_spec.size  # For logging at least.
@@ -6,14 +6,27 @@ import numpy as np
 from rlpyt.agents.pg.base import AgentInfo, AgentInfoRnn
 from rlpyt.utils.buffer import buffer_from_example, torchify_buffer
 from rlpyt.agents.base import AgentInputs
-from rlpyt.samplers.collections import (Samples, AgentSamples, AgentSamplesBsv, AgentSamplesBsvTwin, EnvSamples)
+from rlpyt.samplers.collections import (Samples, AgentSamples, AgentSamplesBsv, AgentSamplesBsvTwin, EnvSamples,
+    EnvSamplesFrames)
 
 
 def build_samples_buffer(agent, env, batch_spec, bootstrap_value=False,
-        agent_shared=True, env_shared=True, subprocess=True, examples=None):
+        agent_shared=True, env_shared=True, subprocess=True, examples=None,
+        frame_buffer=False, terminal_slots=2):
     """Recommended to step/reset agent and env in subprocess, so it doesn't
     affect settings in master before forking workers (e.g. torch num_threads
-    (MKL) may be set at first forward computation.)"""
+    (MKL) may be set at first forward computation.)
+
+    With ``frame_buffer``, expects frame-stacked observations [C,H,..] (OLDEST
+    to NEWEST) and records only the newest frame of each one, in ``frames``;
+    use ``build_frame_samples()`` to get the full observations back.
+
+    Observations are stored once, as T+1 frames, so ``next_observation[t]`` is
+    ``observation[t+1]``.  Where a mid-batch-reset collector resets an env
+    after step t, that is the reset observation; the terminal one goes to one
+    of ``terminal_slots`` per env in ``terminal_observation``, indexed by
+    ``terminal_idx[t]`` (-1: no reset, -2: reset with no slot left).  See
+    ``rlpyt.algos.utils.terminal_next_observation()``."""
     # import ipdb; ipdb.set_trace()
     if examples is None:
         if subprocess:
@@ -47,26 +60,92 @@ def build_samples_buffer(agent, env, batch_spec, bootstrap_value=False,
             bv = buffer_from_example(examples["agent_info"].value, (1, B), agent_shared)
             agent_buffer = AgentSamplesBsv(*agent_buffer, bootstrap_value=bv)
 
-    observation = buffer_from_example(examples["observation"], (T, B), env_shared) # all zero arrays (except 0th index should equal o_reset)
-    next_observation = buffer_from_example(examples["observation"], (T, B), env_shared) 
     all_reward = buffer_from_example(examples["reward"], (T + 1, B), env_shared) # all zero values
     reward = all_reward[1:]
     prev_reward = all_reward[:-1]  # Writing to reward will populate prev_reward.
     done = buffer_from_example(examples["done"], (T, B), env_shared)
     env_info = buffer_from_example(examples["env_info"], (T, B), env_shared)
-    env_buffer = EnvSamples(
-        observation=observation,
-        next_observation=next_observation,
-        prev_reward=prev_reward,
-        reward=reward,
-        done=done,
-        env_info=env_info,
-    )
+    terminal_observation = buffer_from_example(examples["observation"], (terminal_slots, B), env_shared)
+    terminal_idx = buffer_from_example(np.int16(-1), (T, B), env_shared)
+    if frame_buffer:
+        # frames: observation t is frames[t:t+C], i.e. its newest frame is at t+C-1.
+        n_frames = examples["observation"].shape[0]
+        frames = buffer_from_example(examples["observation"][0], (T + n_frames, B), env_shared)
+        env_buffer = EnvSamplesFrames(
+            frames=frames,
+            prev_reward=prev_reward,
+            reward=reward,
+            done=done,
+            env_info=env_info,
+            terminal_observation=terminal_observation,
+            terminal_idx=terminal_idx,
+        )
+    else:
+        all_observation = buffer_from_example(examples["observation"], (T + 1, B), env_shared)
+        observation = all_observation[:-1] # all zero arrays (except 0th index should equal o_reset)
+        next_observation = all_observation[1:]  # Writing to next_observation will populate observation.
+        env_buffer = EnvSamples(
+            observation=observation,
+            next_observation=next_observation,
+            prev_reward=prev_reward,
+            reward=reward,
+            done=done,
+            env_info=env_info,
+            terminal_observation=terminal_observation,
+            terminal_idx=terminal_idx,
+        )
     samples_np = Samples(agent=agent_buffer, env=env_buffer)
     samples_pyt = torchify_buffer(samples_np) # this links the two (changes to samples_np will reflect in samples_pyt)
     return samples_pyt, samples_np, examples
 
 
+def build_frame_samples(samples_np, n_frames):
+    """Allocates (locally) the full [T+1,B,C,..] observations for a frame
+    buffer, and returns the ``Samples`` handed to the algorithm, which share
+    all other fields with ``samples_np``, along with the observation array to
+    pass to ``extract_frame_observation()``."""
+    env_buf = samples_np.env
+    T, B = env_buf.done.shape[:2]
+    frame_example = env_buf.frames[0, 0]
+    all_observation = np.zeros((T + 1, B, n_frames) + frame_example.shape, dtype=frame_example.dtype)
+    env_buffer = EnvSamples(
+        observation=all_observation[:-1],
+        next_observation=all_observation[1:],
+        prev_reward=env_buf.prev_reward,
+        reward=env_buf.reward,
+        done=env_buf.done,
+        env_info=env_buf.env_info,
+        terminal_observation=env_buf.terminal_observation,
+        terminal_idx=env_buf.terminal_idx,
+    )
+    samples_pyt = torchify_buffer(Samples(agent=samples_np.agent, env=env_buffer))
+    return samples_pyt, all_observation
+
+
+def extract_frame_observation(samples_np, all_observation, mid_batch_reset):
+    """Pieces the stacked observations back together from a frame buffer,
+    into ``all_observation`` [T+1,B,C,..].  Frames from before an environment
+    reset are zero-filled, as in a reset observation (and in the blank
+    observations recorded by wait-reset collectors after ``done``)."""
+    env_buf = samples_np.env
+    T = env_buf.done.shape[0]
+    n_frames = all_observation.shape[2]
+    for f in range(n_frames):
+        all_observation[:, :, f] = env_buf.frames[f:f + T + 1]
+    if mid_batch_reset:  # Envs reset on traj_done only (e.g. not after a lost life).
+        traj_done = getattr(env_buf.env_info, "traj_done", env_buf.done)
+    else:  # Blank observations recorded from done until the end of the batch.
+        traj_done = env_buf.done
+    if not np.any(traj_done[:T]):
+        return
+    # Number of steps since observation t began a new history (capped at C).
+    t_idxs = np.arange(T + 1)[:, None]
+    new_history = np.concatenate([np.zeros_like(traj_done[:1], dtype=bool), traj_done.astype(bool)])
+    since_reset = t_idxs - np.maximum.accumulate(np.where(new_history, t_idxs, -n_frames), axis=0)
+    for f in range(n_frames - 1):
+        all_observation[:, :, f][since_reset < n_frames - 1 - f] = 0
+
+
 def get_example_outputs(agent, env, examples, subprocess=False):
     """Do this in a sub-process to avoid setup conflict in master/workers (e.g.
     MKL)."""
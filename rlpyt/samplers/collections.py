@@ -13,7 +13,11 @@ AgentSamplesBsv = namedarraytuple("AgentSamplesBsv",
 AgentSamplesBsvTwin = namedarraytuple("AgentSamplesBsv",
     ["action", "prev_action", "agent_info", "bootstrap_value", "int_bootstrap_value"])
 EnvSamples = namedarraytuple("EnvSamples",
-    ["reward", "prev_reward", "observation","next_observation", "done", "env_info"])
+    ["reward", "prev_reward", "observation","next_observation", "done", "env_info",
+    "terminal_observation", "terminal_idx"])
+EnvSamplesFrames = namedarraytuple("EnvSamplesFrames",
+    ["reward", "prev_reward", "frames", "done", "env_info",
+    "terminal_observation", "terminal_idx"])  # Frame buffer: only new frames stored.
 
 
 class BatchSpec(namedtuple("BatchSpec", "T B")):
@@ -2,6 +2,7 @@ from copy import deepcopy
 import numpy as np
 
 from rlpyt.agents.base import AgentInputs, IcmAgentCuriosityInputs
+from rlpyt.envs.base import make_vec_env
 from rlpyt.utils.buffer import buffer_from_example, torchify_buffer, numpify_buffer
 from rlpyt.utils.logging import logger
 from rlpyt.utils.quick_args import save__init__args
@@ -46,6 +47,35 @@ class BaseCollector:
         """Main data collection loop."""
         raise NotImplementedError
 
+    def record_observation(self, env_buf, observation):
+        """Records the leading observation of the batch, [B,..]."""
+        if "frames" in env_buf:  # Frame buffer: all frames of the leading observation.
+            n_frames = observation.shape[1]
+            env_buf.frames[:n_frames] = np.swapaxes(observation, 0, 1)
+        else:
+            env_buf.observation[0] = observation
+        env_buf.terminal_idx[:] = -1
+        self._n_terminal = np.zeros(len(observation), dtype=np.int64)
+
+    def record_terminal_observation(self, env_buf, t, b, observation):
+        """Records the last observation [..] of the episode which env ``b``
+        ends at time-step t, before resetting it mid-batch (the reset
+        observation is recorded as the next observation)."""
+        k = self._n_terminal[b]
+        if k < len(env_buf.terminal_observation):
+            env_buf.terminal_observation[k, b] = observation
+            env_buf.terminal_idx[t, b] = k
+        else:
+            env_buf.terminal_idx[t, b] = -2  # No slot left.
+        self._n_terminal[b] += 1
+
+    def record_next_observation(self, env_buf, t, observation):
+        """Records the observation following time-step t, [B,..]."""
+        if "frames" in env_buf:  # Frame buffer: only the newest frame.
+            env_buf.frames[t + observation.shape[1]] = observation[:, -1]
+        else:
+            env_buf.next_observation[t] = observation # [1 : T+1], also observation[t+1]
+
     def reset_if_needed(self, agent_inputs):
         """Reset agent and or env as needed, if doing between batches."""
         pass
@@ -128,3 +158,60 @@ class DecorrelatingStartCollector(BaseCollector):
 
         return AgentInputs(observation, prev_action, prev_reward), traj_infos
 
+
+
+class DecorrelatingStartVecCollector(DecorrelatingStartCollector):
+    """Collector which steps all of its environment instances together through
+    a ``VecEnv`` (see ``make_vec_env()``), including during the decorrelating
+    start.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.vec_env = make_vec_env(self.envs)
+
+    def start_envs(self, max_decorrelation_steps=0):
+        """Resets every environment instance, then steps each one through a
+        random number of random actions (stepping the remaining ones together),
+        and returns the resulting agent_inputs buffer (`observation`,
+        `prev_action`, `prev_reward`)."""
+        B = len(self.envs)
+        traj_infos = [self.TrajInfoCls() for _ in range(B)]
+
+        null_action = self.envs[0].action_space.null_value()
+        prev_action = np.stack([null_action for _ in range(B)]) # noop
+        prev_reward = np.zeros(B, dtype="float32") # total reward (extrinsic + intrinsic)
+        observation = self.vec_env.reset()
+
+        if self.rank == 0:
+            logger.log("Sampler decorrelating envs, max steps: "
+                f"{max_decorrelation_steps}")
+        if max_decorrelation_steps != 0:
+            n_steps = 1 + (np.random.rand(B) * max_decorrelation_steps).astype(int)
+            for i in range(n_steps.max()):
+                active = n_steps > i
+                a = prev_action.copy()
+                for b in np.flatnonzero(active):
+                    a[b] = self.envs[b].action_space.sample()
+                o, r, d, info = self.vec_env.step(a, active=active)
+                observation[active] = o[active]
+                prev_action[active] = a[active]
+                prev_reward[active] = r[active]
+                reset = list()
+                for b in np.flatnonzero(active):
+                    traj_infos[b].step(o[b], a[b], r[b], d[b], None, info[b])
+                    if getattr(info[b], "traj_done", d[b]):
+                        reset.append(b)
+                        traj_infos[b] = self.TrajInfoCls()
+                if reset:
+                    observation[reset] = self.vec_env.reset(reset)
+                prev_action[d] = null_action
+                prev_reward[d] = 0
+
+        # For action-server samplers.
+        if hasattr(self, "step_buffer_np") and self.step_buffer_np is not None:
+            self.step_buffer_np.prev_action[:] = prev_action
+            self.step_buffer_np.prev_reward[:] = prev_reward
+            self.step_buffer_np.observation[:] = observation
+
+        return AgentInputs(observation, prev_action, prev_reward), traj_infos
@@ -10,7 +10,7 @@ from rlpyt.utils.logging import logger
 from rlpyt.utils.collections import AttrDict
 from rlpyt.utils.synchronize import drain_queue
 
-from rlpyt.utils.averages import generate_observation_stats
+from rlpyt.utils.averages import parallel_observation_stats
 
 
 EVAL_TRAJ_CHECK = 0.1  # seconds.
@@ -77,7 +77,10 @@ class ParallelSamplerBase(BaseSampler):
         env = self.EnvCls(**self.env_kwargs)
 
         if self.env_kwargs['normalize_obs']:
-            obs_mean, obs_std = generate_observation_stats(env, nsteps=self.env_kwargs['normalize_obs_steps'])
+            # The agent needs these at initialization, before the sampler workers exist,
+            # so a temporary pool with the same number of processes steps the envs.
+            obs_mean, obs_std = parallel_observation_stats(self.EnvCls, self.env_kwargs,
+                nsteps=self.env_kwargs['normalize_obs_steps'], n_worker=n_worker, seed=seed)
             self.obs_stats = (obs_mean, obs_std)
         else:
             self.obs_stats = None
@@ -119,7 +122,7 @@ class ParallelSamplerBase(BaseSampler):
         # Workers step environments and sample actions here.
         self.ctrl.barrier_out.wait()
         traj_infos = drain_queue(self.traj_infos_queue)
-        return self.samples_pyt, traj_infos
+        return self._samples_out(), traj_infos
 
     def evaluate_agent(self, itr):
         """Signal worker processes to perform agent evaluation.  If a max
@@ -191,7 +194,9 @@ class ParallelSamplerBase(BaseSampler):
     def _build_buffers(self, env, bootstrap_value):
         self.samples_pyt, self.samples_np, examples = build_samples_buffer(
             self.agent, env, self.batch_spec, bootstrap_value,
-            agent_shared=True, env_shared=True, subprocess=True)
+            agent_shared=True, env_shared=True, subprocess=True,
+            frame_buffer=self.frame_buffer)
+        self._build_frame_samples(examples)
         return examples
 
     def _build_parallel_ctrl(self, n_worker):
@@ -4,7 +4,7 @@ from copy import deepcopy
 import numpy as np
 
 from rlpyt.samplers.collectors import (DecorrelatingStartCollector,
-    BaseEvalCollector)
+    DecorrelatingStartVecCollector, BaseEvalCollector)
 from rlpyt.agents.base import AgentInputs
 from rlpyt.utils.buffer import (torchify_buffer, numpify_buffer, buffer_from_example,
     buffer_method)
@@ -33,9 +33,9 @@ class CpuResetCollector(DecorrelatingStartCollector):
         obs_pyt, act_pyt, rew_pyt = torchify_buffer(agent_inputs)
         agent_buf.prev_action[0] = action  # Leading prev_action.
         env_buf.prev_reward[0] = reward
+        self.record_observation(env_buf, observation)  # Leading observation.
         self.agent.sample_mode(itr)
         for t in range(self.batch_T):
-            env_buf.observation[t] = observation
             # Agent inputs and outputs are torch tensors.
             act_pyt, agent_info = self.agent.step(obs_pyt, act_pyt, rew_pyt)
             action = numpify_buffer(act_pyt)
@@ -47,6 +47,7 @@ class CpuResetCollector(DecorrelatingStartCollector):
                 if getattr(env_info, "traj_done", d):
                     completed_infos.append(traj_infos[b].terminate())
                     traj_infos[b] = self.TrajInfoCls()
+                    self.record_terminal_observation(env_buf, t, b, o)
                     o = env.reset()
                 if d:
                     self.agent.reset_one(idx=b)
@@ -57,6 +58,7 @@ class CpuResetCollector(DecorrelatingStartCollector):
                     env_buf.env_info[t, b] = env_info
             agent_buf.action[t] = action
             env_buf.reward[t] = reward
+            self.record_next_observation(env_buf, t, observation)
             if agent_info:
                 agent_buf.agent_info[t] = agent_info
 
@@ -94,7 +96,7 @@ class CpuWaitResetCollector(DecorrelatingStartCollector):
         super().__init__(*args, **kwargs)
         self.need_reset = np.zeros(len(self.envs), dtype=np.bool)
         self.done = np.zeros(len(self.envs), dtype=np.bool)
-        self.temp_observation = buffer_method(self.samples_np.env.observation[0, :len(self.envs)], "copy")
+        self.temp_observation = [None] * len(self.envs)
 
     def collect_batch(self, agent_inputs, traj_infos, itr):
         # Numpy arrays can be written to from numpy arrays or torch tensors
@@ -115,10 +117,10 @@ class CpuWaitResetCollector(DecorrelatingStartCollector):
         
         agent_buf.prev_action[0] = action # Leading prev_action
         env_buf.prev_reward[0] = reward_tot # Leading previous total reward
+        self.record_observation(env_buf, observation) # Leading observation
         self.agent.sample_mode(itr)
         for t in range(self.batch_T):
 
-            env_buf.observation[t] = observation # [0 : T]
             # Agent inputs and outputs are torch tensors.
             act_pyt, agent_info = self.agent.step(obs_pyt, act_pyt, rew_tot_pyt)
             action = numpify_buffer(act_pyt)
@@ -156,7 +158,7 @@ class CpuWaitResetCollector(DecorrelatingStartCollector):
 
             agent_buf.action[t] = action
             env_buf.reward[t] = reward_tot
-            env_buf.next_observation[t] = observation # [1 : T+1]
+            self.record_next_observation(env_buf, t, observation)
             env_buf.done[t] = self.done
             if agent_info:                
                 agent_buf.agent_info[t] = agent_info
@@ -182,6 +184,138 @@ class CpuWaitResetCollector(DecorrelatingStartCollector):
         self.need_reset[:] = False
 
 
+class VecCpuResetCollector(DecorrelatingStartVecCollector):
+    """Collector with the reset logic of ``CpuResetCollector``, which steps all
+    of its environment instances in one call through a ``VecEnv`` and writes
+    whole [B] slices of the batch buffer.  Only the trajectory-info bookkeeping
+    remains per environment instance.
+    """
+
+    mid_batch_reset = True
+
+    def collect_batch(self, agent_inputs, traj_infos, itr):
+        agent_buf, env_buf = self.samples_np.agent, self.samples_np.env
+        completed_infos = list()
+        observation, action, reward = agent_inputs
+        obs_pyt, act_pyt, rew_pyt = torchify_buffer(agent_inputs)
+        prev_observation = buffer_from_example(observation[0], len(self.envs))  # For traj_infos.
+        agent_buf.prev_action[0] = action  # Leading prev_action.
+        env_buf.prev_reward[0] = reward
+        self.record_observation(env_buf, observation)  # Leading observation.
+        self.agent.sample_mode(itr)
+        for t in range(self.batch_T):
+            act_pyt, agent_info = self.agent.step(obs_pyt, act_pyt, rew_pyt)
+            action = numpify_buffer(act_pyt)
+            prev_observation[:] = observation
+            o, r, d, env_info = self.vec_env.step(action, out=observation)  # Written in place.
+            reset = list()
+            for b in range(len(self.envs)):
+                traj_infos[b].step(prev_observation[b], action[b], r[b], d[b],
+                    agent_info[b], env_info[b])
+                if getattr(env_info[b], "traj_done", d[b]):
+                    completed_infos.append(traj_infos[b].terminate())
+                    traj_infos[b] = self.TrajInfoCls()
+                    reset.append(b)
+                if env_info[b]:
+                    env_buf.env_info[t, b] = env_info[b]
+            for b in reset:
+                self.record_terminal_observation(env_buf, t, b, observation[b])
+            if reset:
+                observation[reset] = self.vec_env.reset(reset)
+            for b in np.flatnonzero(d):
+                self.agent.reset_one(idx=b)
+            reward[:] = r
+            env_buf.done[t] = d
+            agent_buf.action[t] = action
+            env_buf.reward[t] = reward
+            self.record_next_observation(env_buf, t, observation)
+            if agent_info:
+                agent_buf.agent_info[t] = agent_info
+
+        if "bootstrap_value" in agent_buf:
+            # agent.value() should not advance rnn state.
+            agent_buf.bootstrap_value[:] = self.agent.value(obs_pyt, act_pyt, rew_pyt)
+
+        if "int_bootstrap_value" in agent_buf:
+            agent_buf.int_bootstrap_value[:] = self.agent.value(obs_pyt, act_pyt, rew_pyt, ret_int=True)
+
+        return AgentInputs(observation, action, reward), traj_infos, completed_infos
+
+
+class VecCpuWaitResetCollector(DecorrelatingStartVecCollector):
+    """Collector with the reset logic of ``CpuWaitResetCollector``, which steps
+    all of its not-yet-done environment instances in one call through a
+    ``VecEnv`` and writes whole [B] slices of the batch buffer.  Resets between
+    batches are also made in one call.
+    """
+
+    mid_batch_reset = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.need_reset = np.zeros(len(self.envs), dtype=bool)
+        self.done = np.zeros(len(self.envs), dtype=bool)
+
+    def collect_batch(self, agent_inputs, traj_infos, itr):
+        agent_buf, env_buf = self.samples_np.agent, self.samples_np.env
+        completed_infos = list()
+        observation, action, reward_tot = agent_inputs
+        self.done[:] = False  # Did resets between batches.
+        obs_pyt, act_pyt, rew_tot_pyt = torchify_buffer(agent_inputs)
+        prev_observation = buffer_from_example(observation[0], len(self.envs))  # For traj_infos.
+        agent_buf.prev_action[0] = action # Leading prev_action
+        env_buf.prev_reward[0] = reward_tot # Leading previous total reward
+        self.record_observation(env_buf, observation) # Leading observation
+        self.agent.sample_mode(itr)
+        for t in range(self.batch_T):
+            act_pyt, agent_info = self.agent.step(obs_pyt, act_pyt, rew_tot_pyt)
+            action = numpify_buffer(act_pyt)
+            active = ~self.done
+            action[self.done] = 0  # Record blank.
+            reward_tot[self.done] = 0
+            if agent_info:
+                agent_info[self.done] = 0
+            prev_observation[:] = observation
+            o, r_ext, d, env_info = self.vec_env.step(action, active=active, out=observation)
+            for b in np.flatnonzero(active):
+                traj_infos[b].step(prev_observation[b], action[b], r_ext[b], d[b],
+                    agent_info[b], env_info[b])
+                if getattr(env_info[b], "traj_done", d[b]):
+                    completed_infos.append(traj_infos[b].terminate())
+                    traj_infos[b] = self.TrajInfoCls()
+                    self.need_reset[b] = True
+                if env_info[b]:
+                    env_buf.env_info[t, b] = env_info[b]
+            observation[d] = 0  # Record blank.
+            reward_tot[active] = 0.0 if self.no_extrinsic else r_ext[active]
+            self.done |= d  # Not stepped envs report d=False.
+
+            agent_buf.action[t] = action
+            env_buf.reward[t] = reward_tot
+            self.record_next_observation(env_buf, t, observation)
+            env_buf.done[t] = self.done
+            if agent_info:
+                agent_buf.agent_info[t] = agent_info
+
+        if "bootstrap_value" in agent_buf:
+            # agent.value() should not advance rnn state.
+            agent_buf.bootstrap_value[:] = self.agent.value(obs_pyt, act_pyt, rew_tot_pyt)
+
+        if "int_bootstrap_value" in agent_buf:
+            agent_buf.int_bootstrap_value[:] = self.agent.value(obs_pyt, act_pyt, rew_tot_pyt, ret_int=True)
+
+        return AgentInputs(observation, action, reward_tot), traj_infos, completed_infos
+
+    def reset_if_needed(self, agent_inputs):
+        reset = np.flatnonzero(self.need_reset)
+        if len(reset) > 0:
+            agent_inputs[reset] = 0  # wipe all fields
+            agent_inputs.observation[reset] = self.vec_env.reset(reset)
+            for b in reset:
+                self.agent.reset_one(idx=b)
+        self.need_reset[:] = False
+
+
 class CpuEvalCollector(BaseEvalCollector):
     """Offline agent evaluation collector which calls ``agent.step()`` in 
     sampling loop.  Immediately resets any environment which finishes a
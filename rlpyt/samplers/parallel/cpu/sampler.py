@@ -1,10 +1,14 @@
 
 import multiprocessing as mp
+import ctypes
 import time
 
 
 from rlpyt.samplers.parallel.base import ParallelSamplerBase
 from rlpyt.samplers.parallel.cpu.collectors import CpuResetCollector, CpuEvalCollector
+from rlpyt.samplers.async_.collectors import DbCpuResetCollector
+from rlpyt.samplers.buffer import build_samples_buffer
+from rlpyt.utils.synchronize import drain_queue
 
 
 class CpuSampler(ParallelSamplerBase):
@@ -31,3 +35,78 @@ class CpuSampler(ParallelSamplerBase):
         """Like in ``obtain_samples()``, first sync agent shared memory."""
         self.agent.sync_shared_memory()
         return super().evaluate_agent(itr)
+
+
+class PipelinedCpuSampler(CpuSampler):
+    """CPU sampler with two samples buffers, so that workers can collect the
+    next batch into one while the algorithm optimizes on the last one in the
+    other.  ``start_samples(itr)`` sends the agent's current parameters to
+    the workers and sets them collecting, returning right away;
+    ``finish_samples(itr)`` waits for them and returns the batch, which stays
+    valid until batch ``itr + 2`` is started.  Needs a double-buffer
+    collector (e.g. ``DbCpuResetCollector``, ``DbVecCpuResetCollector``).
+    """
+
+    def __init__(self, *args, CollectorCls=DbCpuResetCollector, **kwargs):
+        super().__init__(*args, CollectorCls=CollectorCls, **kwargs)
+
+    def initialize(self, *args, **kwargs):
+        """Extends base ``initialize()`` so that, once the workers are started
+        with the shared-memory model, the agent trains its own copy, which
+        workers only see when the next batch is started."""
+        examples = super().initialize(*args, **kwargs)
+        self.agent.separate_shared_model()
+        return examples
+
+    def obtain_samples(self, itr):
+        self.start_samples(itr)
+        return self.finish_samples(itr)
+
+    def start_samples(self, itr):
+        """Syncs agent shared memory, then signals workers to collect batch
+        ``itr`` into buffer ``itr % 2``."""
+        self.agent.sync_shared_memory()
+        self.sync.db_idx.value = itr % 2
+        self.ctrl.itr.value = itr
+        self.ctrl.barrier_in.wait()
+
+    def finish_samples(self, itr):
+        """Waits for the workers to finish batch ``itr``, and returns it with
+        the trajectory-info objects completed during it."""
+        self.ctrl.barrier_out.wait()
+        traj_infos = drain_queue(self.traj_infos_queue)
+        self.samples_pyt = self.double_buffer_pyt[itr % 2]
+        self.samples_np = self.double_buffer_np[itr % 2]
+        if self.frame_buffer:
+            self.frame_samples_pyt, self._all_observation = \
+                self._double_frame_samples[itr % 2]
+        return self._samples_out(), traj_infos
+
+    def _build_buffers(self, env, bootstrap_value):
+        self.double_buffer_pyt, self.double_buffer_np = list(), list()
+        self._double_frame_samples = list()
+        for _ in range(2):
+            self.samples_pyt, self.samples_np, examples = build_samples_buffer(
+                self.agent, env, self.batch_spec, bootstrap_value,
+                agent_shared=True, env_shared=True, subprocess=True,
+                frame_buffer=self.frame_buffer)
+            self._build_frame_samples(examples)
+            self.double_buffer_pyt.append(self.samples_pyt)
+            self.double_buffer_np.append(self.samples_np)
+            if self.frame_buffer:
+                self._double_frame_samples.append(
+                    (self.frame_samples_pyt, self._all_observation))
+        return examples
+
+    def _build_parallel_ctrl(self, n_worker):
+        super()._build_parallel_ctrl(n_worker)
+        self.sync.db_idx = mp.RawValue(ctypes.c_int, 0)
+
+    def _assemble_workers_kwargs(self, affinity, seed, n_envs_list):
+        workers_kwargs = super()._assemble_workers_kwargs(affinity, seed, n_envs_list)
+        i_env = 0
+        for w_kwargs in workers_kwargs:
+            slice_B = slice(i_env, i_env + w_kwargs["n_envs"])
+            w_kwargs["samples_np"] = tuple(buf[:, slice_B] for buf in self.double_buffer_np)
+            i_env += w_kwargs["n_envs"]
+        return workers_kwargs
@@ -23,10 +23,10 @@ class GpuResetCollector(DecorrelatingStartCollector):
         agent_buf, env_buf = self.samples_np.agent, self.samples_np.env
         agent_buf.prev_action[0] = step.action
         env_buf.prev_reward[0] = step.reward
+        self.record_observation(env_buf, step.observation)
         obs_ready.release()  # Previous obs already written, ready for new.
         completed_infos = list()
         for t in range(self.batch_T):
-            env_buf.observation[t] = step.observation
             act_ready.acquire()  # Need sampled actions from server.
             for b, env in enumerate(self.envs):
                 o, r, d, env_info = env.step(step.action[b])
@@ -35,6 +35,7 @@ class GpuResetCollector(DecorrelatingStartCollector):
                 if getattr(env_info, "traj_done", d):
                     completed_infos.append(traj_infos[b].terminate(o))
                     traj_infos[b] = self.TrajInfoCls()
+                    self.record_terminal_observation(env_buf, t, b, o)
                     o = env.reset()
                 step.observation[b] = o
                 step.reward[b] = r
@@ -43,6 +44,7 @@ class GpuResetCollector(DecorrelatingStartCollector):
                     env_buf.env_info[t, b] = env_info
             agent_buf.action[t] = step.action  # OPTIONAL BY SERVER
             env_buf.reward[t] = step.reward
+            self.record_next_observation(env_buf, t, step.observation)
             env_buf.done[t] = step.done
             if step.agent_info:
                 agent_buf.agent_info[t] = step.agent_info  # OPTIONAL BY SERVER
@@ -78,12 +80,12 @@ class GpuWaitResetCollector(DecorrelatingStartCollector):
         agent_buf, env_buf = self.samples_np.agent, self.samples_np.env
         agent_buf.prev_action[0] = step.prev_action
         env_buf.prev_reward[0] = step.prev_reward
+        self.record_observation(env_buf, step.observation) # Leading observation
         obs_ready.release()  # Previous obs already written, ready for new.
 
         completed_infos = list()
         for t in range(self.batch_T):
             
-            env_buf.observation[t] = step.observation # [0 : T]
             act_ready.acquire()  # Need sampled actions from server.
             for b, env in enumerate(self.envs):
                 if step.done[b]:
@@ -118,7 +120,7 @@ class GpuWaitResetCollector(DecorrelatingStartCollector):
 
             agent_buf.action[t] = step.prev_action  # OPTIONAL BY SERVER
             env_buf.reward[t] = step.prev_reward
-            env_buf.next_observation[t] = step.observation # [1: T+1]
+            self.record_next_observation(env_buf, t, step.observation)
             env_buf.done[t] = step.done
             if step.agent_info:
                 agent_buf.agent_info[t] = step.agent_info  # OPTIONAL BY SERVER
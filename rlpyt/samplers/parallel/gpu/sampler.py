@@ -57,7 +57,7 @@ class GpuSamplerBase(ParallelSamplerBase):
 
         traj_infos = drain_queue(self.traj_infos_queue)
 
-        return self.samples_pyt, traj_infos
+        return self._samples_out(), traj_infos
 
     def evaluate_agent(self, itr):
         """Signals workers to begin agent evaluation loop, and drops into
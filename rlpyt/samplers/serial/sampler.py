@@ -53,7 +53,7 @@ class SerialSampler(BaseSampler):
             global_B=global_B, env_ranks=env_ranks)
         samples_pyt, samples_np, examples = build_samples_buffer(agent, envs[0],
             self.batch_spec, bootstrap_value, agent_shared=False,
-            env_shared=False, subprocess=False)
+            env_shared=False, subprocess=False, frame_buffer=self.frame_buffer)
         if traj_info_kwargs:
             for k, v in traj_info_kwargs.items():
                 setattr(self.TrajInfoCls, "_" + k, v)  # Avoid passing at init.
@@ -88,6 +88,7 @@ class SerialSampler(BaseSampler):
         self.agent = agent
         self.samples_pyt = samples_pyt
         self.samples_np = samples_np
+        self._build_frame_samples(examples)
         self.collector = collector
         self.agent_inputs = agent_inputs
         self.traj_infos = traj_infos
@@ -105,7 +106,7 @@ class SerialSampler(BaseSampler):
         self.collector.reset_if_needed(agent_inputs)
         self.agent_inputs = agent_inputs
         self.traj_infos = traj_infos
-        return self.samples_pyt, completed_infos
+        return self._samples_out(), completed_infos
 
     def evaluate_agent(self, itr):
         """Call the evaluation collector to execute agent-environment interactions."""
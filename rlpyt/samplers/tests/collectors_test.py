@@ -0,0 +1,111 @@
+"""Tests of the terminal observations kept by mid-batch-reset collectors."""
+
+import unittest
+
+import numpy as np
+import torch
+
+from rlpyt.algos.utils import terminal_next_observation
+from rlpyt.samplers.buffer import build_samples_buffer, build_frame_samples, extract_frame_observation
+from rlpyt.samplers.collections import BatchSpec
+from rlpyt.samplers.parallel.cpu.collectors import CpuResetCollector, VecCpuResetCollector
+from rlpyt.utils.collections import namedarraytuple
+
+Info = namedarraytuple("Info", ["value"])
+
+
+class CountingEnv:
+    """Observation 100 * episode + step, the episode ending after `length` steps."""
+
+    def __init__(self, length, n_frames=None):
+        self.length, self.n_frames, self.episode = length, n_frames, -1
+
+    def reset(self):
+        self.episode += 1
+        self.steps = 0
+        return self.observation()
+
+    def observation(self):
+        shape = (2,) if self.n_frames is None else (self.n_frames, 2)
+        return np.full(shape, 100 * self.episode + self.steps, dtype=np.float32)
+
+    def step(self, action):
+        self.steps += 1
+        return self.observation(), 0., self.steps == self.length, None
+
+
+class NullAgent:
+
+    def sample_mode(self, itr):
+        pass
+
+    def reset_one(self, idx):
+        pass
+
+    def step(self, observation, prev_action, prev_reward):
+        B = len(observation)
+        return torch.zeros(B, dtype=torch.long), Info(value=torch.zeros(B))
+
+
+class NullTrajInfo:
+
+    def step(self, *args):
+        pass
+
+    def terminate(self, *args):
+        return self
+
+
+def collect(CollectorCls, lengths, T, n_frames=None, terminal_slots=2):
+    envs = [CountingEnv(length, n_frames) for length in lengths]
+    observation = np.stack([env.reset() for env in envs])
+    examples = dict(observation=observation[0], action=np.int64(0), reward=np.float32(0),
+        done=False, env_info=Info(value=np.float32(0)), agent_info=Info(value=np.float32(0)))
+    samples_pyt, samples_np, _ = build_samples_buffer(None, None, BatchSpec(T, len(envs)),
+        examples=examples, frame_buffer=n_frames is not None, terminal_slots=terminal_slots)
+    collector = CollectorCls(0, envs, samples_np, T, NullTrajInfo, agent=NullAgent())
+    agent_inputs = (observation, np.zeros(len(envs), dtype=np.int64), np.zeros(len(envs), dtype=np.float32))
+    collector.collect_batch(agent_inputs, [NullTrajInfo() for _ in envs], 0)
+    if n_frames is not None:
+        samples_pyt, all_observation = build_frame_samples(samples_np, n_frames)
+        extract_frame_observation(samples_np, all_observation, mid_batch_reset=True)
+    return samples_pyt.env
+
+
+class TerminalObservationTest(unittest.TestCase):
+
+    def assertTerminalNextObservation(self, CollectorCls, n_frames=None):
+        lengths, T = (3, 4, 20), 10
+        env_samples = collect(CollectorCls, lengths, T, n_frames)
+        next_observation, terminal_valid = terminal_next_observation(env_samples)
+        newest = next_observation.reshape(T, len(lengths), -1)[..., -1]
+        for b, length in enumerate(lengths):
+            for t in range(T):
+                episode, steps = divmod(t, length)
+                if episode >= 2:  # Third reset in the batch: no slot left, masked out.
+                    self.assertEqual(terminal_valid[t, b], float(steps + 1 < length))
+                    if steps + 1 == length:
+                        continue
+                self.assertEqual(newest[t, b], 100 * episode + steps + 1)
+        # next_observation itself still shows the reset observation.
+        self.assertEqual(env_samples.next_observation.reshape(T, len(lengths), -1)[2, 0, -1], 100)
+
+    def testCpuResetCollector(self):
+        self.assertTerminalNextObservation(CpuResetCollector)
+
+    def testVecCpuResetCollector(self):
+        self.assertTerminalNextObservation(VecCpuResetCollector)
+
+    def testFrameBuffer(self):
+        self.assertTerminalNextObservation(CpuResetCollector, n_frames=4)
+        self.assertTerminalNextObservation(VecCpuResetCollector, n_frames=4)
+
+    def testNoReset(self):
+        env_samples = collect(CpuResetCollector, (20, 20), T=5)
+        next_observation, terminal_valid = terminal_next_observation(env_samples)
+        self.assertIs(next_observation, env_samples.next_observation)
+        self.assertIsNone(terminal_valid)
+
+
+if __name__ == "__main__":
+    unittest.main()
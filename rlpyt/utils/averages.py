@@ -1,8 +1,11 @@
 
 from mpi4py import MPI
 import multiprocessing
+import hashlib
+import os
 import gym
 import numpy as np
+import torch
 import cv2
 from copy import deepcopy
 
@@ -58,29 +61,112 @@ class RewardForwardFilter(object):
                 self.rewems[mask] = self.rewems[mask] * self.gamma + rews[mask]
             return deepcopy(self.rewems)
 
-def generate_observation_stats(env, nsteps=10000):
+    def update_block(self, rews, not_done=None, max_scale=1e4):
+        """Same as calling ``update()`` on each row of a [T,B] block (numpy or
+        torch, on any device), in one pass.  Returns the [T,B] filtered
+        rewards.  Rewards where ``not_done`` is 0 leave the filter unchanged,
+        so ``x[t] = a[t] * x[t-1] + b[t]`` with ``a[t]`` either gamma or 1,
+        solved in blocks of K rows as ``P[t] * (x[-1] + cumsum(b / P)[t])``,
+        with ``P = cumprod(a)`` (float64, K such that gamma**-K <= max_scale).
+        """
+        is_numpy = isinstance(rews, np.ndarray)
+        rews_ = torch.from_numpy(rews) if is_numpy else rews
+        T = rews_.shape[0]
+        x = rews_.new_empty(rews_.shape, dtype=torch.float64)
+        rews_ = rews_.type(torch.float64)
+        mask = torch.ones_like(rews_) if not_done is None else torch.as_tensor(
+            not_done, device=rews_.device).type(torch.float64).expand_as(rews_).clone()
+        if self.rewems is None:
+            x_prev = torch.zeros_like(rews_[0])
+            mask[0] = 1  # First rewards start the filter, even if done.
+        else:
+            x_prev = torch.as_tensor(self.rewems, device=rews_.device).type(torch.float64)
+        block_size = T if self.gamma >= 1 else max(1, min(T, int(np.log(max_scale) / -np.log(max(self.gamma, 1e-8)))))
+        for start in range(0, T, block_size):
+            block = slice(start, start + block_size)
+            decay = self.gamma ** torch.cumsum(mask[block], dim=0)
+            x[block] = decay * (x_prev + torch.cumsum(mask[block] * rews_[block] / decay, dim=0))
+            x_prev = x[min(start + block_size, T) - 1]
+        x = x.numpy().astype(rews.dtype) if is_numpy else x.type(rews.dtype)
+        self.rewems = x[-1].copy() if is_numpy else x[-1].clone()
+        return x
+
+def generate_observation_stats(env, nsteps=10000, rms=None):
     '''
     Steps through the environment randomly and produces an observation mean and standard deviation. 
     From https://github.com/openai/large-scale-curiosity/blob/master/utils.py
+    Stacked observations count as one sample per frame; moments are merged
+    one step at a time, so no frames are kept around.  Pass ``rms`` to also
+    get the raw moments (e.g. to merge with those of other processes).
     '''
     wrap_print('Generating observation mean/std... ({} random steps)'.format(nsteps))
     ob = env.reset()
-    obs = []
+    rms = RunningMeanStd(epsilon=0., shape=(1,) + ob.shape[1:]) if rms is None else rms
     for _ in range(nsteps):
         ac = env.action_space.sample()
         ob, _, done, _ = env.step(ac.item())
         if done:
             ob = env.reset()
-        ob = np.split(ob, ob.shape[0])
-        for o in ob: # stacked observations
-            obs.append(o)
-    obs = np.array(obs)
-    mean = np.mean(obs, 0).astype(np.float32)
-    std = np.std(obs, 0).astype(np.float32)
-    # print(set(list(np.squeeze(mean).ravel())))
-    # cv2.imwrite('norm_images/mean.png', np.squeeze(mean))
-    # cv2.imwrite('norm_images/std.png', np.squeeze(std))
+        rms.update(np.expand_dims(ob, 1)) # stacked observations
+    mean = rms.mean.astype(np.float32)
+    std = np.sqrt(rms.var).astype(np.float32)
     return mean, std
 
+def _observation_moments(EnvCls, env_kwargs, nsteps, seed):
+    '''Worker for ``parallel_observation_stats``: (mean, var, count) of ``nsteps`` random steps.'''
+    import random
+    from rlpyt.utils.seed import set_envs_seeds
+    random.seed(seed)
+    np.random.seed(seed)
+    env = EnvCls(**env_kwargs)
+    set_envs_seeds([env], seed)
+    rms = RunningMeanStd(epsilon=0.)
+    generate_observation_stats(env, nsteps=nsteps, rms=rms)
+    env.close()
+    return rms.mean, rms.var, rms.count
+
+# env kwargs which only control logging, left out of the cache key
+OBS_STATS_IGNORED_KWARGS = ('logdir', 'log_heatmaps', 'record_dir', 'record_freq')
+OBS_STATS_CACHE_DIR = os.environ.get('RLPYT_OBS_STATS_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'rlpyt', 'obs_stats'))
 
+def obs_stats_cache_path(EnvCls, env_kwargs, nsteps, cache_dir=OBS_STATS_CACHE_DIR):
+    '''Cache file for the observation statistics of an env id (class or factory) and its kwargs.'''
+    kwargs = {k: v for k, v in env_kwargs.items() if k not in OBS_STATS_IGNORED_KWARGS}
+    key = repr((getattr(EnvCls, '__module__', None), getattr(EnvCls, '__qualname__', repr(EnvCls)),
+        sorted(kwargs.items()), nsteps))
+    return os.path.join(cache_dir, hashlib.sha1(key.encode()).hexdigest() + '.npz')
 
+def parallel_observation_stats(EnvCls, env_kwargs, nsteps=10000, n_worker=1, seed=None,
+        cache_dir=OBS_STATS_CACHE_DIR):
+    '''
+    Same statistics as ``generate_observation_stats``, with the random steps
+    split over ``n_worker`` processes (each with its own env instance) and
+    their moments merged.  Results are stored under ``cache_dir`` (set it to
+    None to disable), so later runs with the same env skip the stepping.
+    '''
+    path = None if cache_dir is None else obs_stats_cache_path(EnvCls, env_kwargs, nsteps, cache_dir)
+    if path is not None and os.path.exists(path):
+        wrap_print('Loading observation mean/std from {}'.format(path))
+        with np.load(path) as stats:
+            return stats['mean'], stats['std']
+    seed = np.random.randint(2 ** 31) if seed is None else seed
+    n_worker = max(1, min(n_worker, nsteps))
+    worker_steps = [nsteps // n_worker + (i < nsteps % n_worker) for i in range(n_worker)]
+    args = [(EnvCls, env_kwargs, steps, seed + i) for i, steps in enumerate(worker_steps)]
+    if n_worker == 1:
+        moments = [_observation_moments(*args[0])]
+    else:
+        with multiprocessing.Pool(n_worker) as pool:
+            moments = pool.starmap(_observation_moments, args)
+    rms = RunningMeanStd(epsilon=0.)
+    for mean, var, count in moments:
+        rms.update_from_moments(mean, var, count)
+    mean = rms.mean.astype(np.float32)
+    std = np.sqrt(rms.var).astype(np.float32)
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = '{}.{}.tmp.npz'.format(path[:-len('.npz')], os.getpid())
+        np.savez(tmp_path, mean=mean, std=std)
+        os.replace(tmp_path, path) # atomic, concurrent sweep runs may race here
+    return mean, std
@@ -2,13 +2,16 @@
 import numpy as np
 import multiprocessing as mp
 import ctypes
+import mmap
+import os
+import tempfile
 import torch
 
 from rlpyt.utils.collections import (NamedArrayTuple, namedarraytuple_like, NamedArrayTupleSchema_like, NamedTuple)
 
 
 def buffer_from_example(example, leading_dims, share_memory=False,
-        use_NatSchema=None):
+        use_NatSchema=None, memmap_dir=None):
     """Allocates memory and returns it in `namedarraytuple` with same
     structure as ``examples``, which should be a `namedtuple` or
     `namedarraytuple`. Applies the same leading dimensions ``leading_dims`` to
@@ -20,6 +23,9 @@ def buffer_from_example(example, leading_dims, share_memory=False,
     may be easier for pickling/unpickling when using spawn instead
     of fork. If use_NatSchema is None, the type of ``example`` will be used to
     infer what type to return (this is the default)
+
+    With ``memmap_dir``, allocates in files there instead, paged by the OS
+    (see ``np_memmap_array()``).
     """
     if example is None:
         return
@@ -31,23 +37,25 @@ def buffer_from_example(example, leading_dims, share_memory=False,
         else:
             buffer_type = namedarraytuple_like(example)
     except TypeError:  # example was not a namedtuple or namedarraytuple
-        return build_array(example, leading_dims, share_memory)
+        return build_array(example, leading_dims, share_memory, memmap_dir)
     return buffer_type(*(buffer_from_example(v, leading_dims,
-        share_memory=share_memory, use_NatSchema=use_NatSchema)
-        for v in example))
+        share_memory=share_memory, use_NatSchema=use_NatSchema,
+        memmap_dir=memmap_dir) for v in example))
 
 
-def build_array(example, leading_dims, share_memory=False):
+def build_array(example, leading_dims, share_memory=False, memmap_dir=None):
     """Allocate a numpy array matchin the dtype and shape of example, possibly
     with additional leading dimensions.  Optionally allocate on OS shared
-    memory.
+    memory, or in a memory-mapped file in ``memmap_dir`` (also shared).
     """
     a = np.asarray(example)
     if a.dtype == "object":
         raise TypeError("Buffer example value cannot cast as np.dtype==object.")
-    constructor = np_mp_array if share_memory else np.zeros
     if not isinstance(leading_dims, (list, tuple)):
         leading_dims = (leading_dims,)
+    if memmap_dir is not None:
+        return np_memmap_array(leading_dims + a.shape, a.dtype, memmap_dir)
+    constructor = np_mp_array if share_memory else np.zeros
     return constructor(shape=leading_dims + a.shape, dtype=a.dtype)
 
 
@@ -61,6 +69,38 @@ def np_mp_array(shape, dtype):
     return np.frombuffer(mp_array, dtype=dtype, count=size).reshape(shape)
 
 
+def np_memmap_array(shape, dtype, directory, page_axis=None):
+    """Allocate a (zeroed) numpy array in a memory-mapped file in
+    ``directory``, so the OS keeps recently used pages in RAM and pages the
+    rest to disk.  The mapping is shared, so forked processes see the same
+    memory (not for the "spawn" start method); the file is unlinked at once,
+    and freed with the last mapping.  The ``mmap`` object is the array's
+    ``base``.  With ``page_axis``, that dimension is laid out outermost and
+    each of its slices starts on a page boundary (e.g. for contiguous,
+    page-aligned history per environment), keeping the requested shape.
+    """
+    dtype = np.dtype(dtype)
+    shape = tuple(int(d) for d in shape)
+    strides = None
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    if page_axis is not None:
+        inner_shape = shape[:page_axis] + shape[page_axis + 1:]
+        inner_strides = tuple(int(np.prod(inner_shape[i + 1:])) * dtype.itemsize
+            for i in range(len(inner_shape)))  # C-order.
+        inner_bytes = int(np.prod(inner_shape)) * dtype.itemsize
+        slice_bytes = -(-inner_bytes // mmap.PAGESIZE) * mmap.PAGESIZE
+        strides = inner_strides[:page_axis] + (slice_bytes,) + inner_strides[page_axis:]
+        nbytes = shape[page_axis] * slice_bytes
+    fd, path = tempfile.mkstemp(dir=directory, prefix="rlpyt_memmap_")
+    try:
+        os.ftruncate(fd, max(nbytes, 1))
+        mm = mmap.mmap(fd, max(nbytes, 1))
+    finally:
+        os.close(fd)
+        os.unlink(path)
+    return np.ndarray(shape, dtype=dtype, buffer=mm, strides=strides)
+
+
 class np_mp_array_spawn(np.ndarray):
     """Shared ndarray for use with multiprocessing's 'spawn' start method.
 
@@ -204,6 +244,23 @@ def buffer_func(buffer_, func, *args, **kwargs):
     return buffer_._make(contents)
 
 
+def buffer_concatenate(buffers, axis=0):
+    """Concatenate the matching contents of several ``buffers`` (of the same
+    structure) along ``axis``, using ``torch.cat()`` for torch tensors and
+    ``np.concatenate()`` for numpy arrays, and return a new, matching
+    structure.  ``None`` fields remain ``None``.
+    """
+    if buffers[0] is None:
+        return
+    if isinstance(buffers[0], torch.Tensor):
+        return torch.cat(buffers, dim=axis)
+    if isinstance(buffers[0], np.ndarray):
+        return np.concatenate(buffers, axis=axis)
+    contents = tuple(buffer_concatenate(bs, axis=axis) for bs in zip(*buffers))
+    if type(buffers[0]) is tuple:
+        return contents
+    return buffers[0]._make(contents)
+
 def get_leading_dims(buffer_, n_dim=1):
     """Return the ``n_dim`` number of leading dimensions of the contents of
     ``buffer_``. Checks to make sure the leading dimensions match for all
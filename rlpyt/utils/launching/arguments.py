@@ -25,6 +25,9 @@ def get_args(args_in=sys.argv[1:]):
     parser.add_argument('-sample_mode', default='cpu', type=str, help='Whether to use GPU or CPU sampling.')
     parser.add_argument('-num_gpus', default=0, type=int, help='Number of GPUs available.')
     parser.add_argument('-num_cpus', default=1, type=int, help='Number of CPUs to run worker processes.')
+    parser.add_argument('-vec_env', action='store_true', help='Whether or not to step all of a worker\'s environments in one batched call (cpu sampling only).')
+    parser.add_argument('-pipelined', action='store_true', help='Whether or not to collect the next batch while optimizing on the last one (cpu sampling, ppo/a2c, no evaluation only).')
+    parser.add_argument('-max_policy_lag', default=0.05, type=float, help='KL divergence (sampling to current policy) above which a pipelined run collects the next batch synchronously.')
     parser.add_argument('-gpu_per_run', default=2, type=int, help='How many GPUs to parallelize one run across.')
     parser.add_argument('-eval_envs', default=0, type=int, help='Number of evaluation environments per worker process.')
     parser.add_argument('-eval_max_steps', default=int(51e3), type=int, help='Max number of timesteps run during an evaluation cycle (from one evaluation process).')
@@ -77,6 +80,7 @@ def get_args(args_in=sys.argv[1:]):
         parser.add_argument('-score_multiplier', default=1.0, type=float, help='A multiplier for the extrinsic reward.')
         parser.add_argument('-repeat_action_probability', default=0.0, type=float, help='Probability that an action will repeat (sticky actions).')
         parser.add_argument('-fire_on_reset', action='store_true', help='Whether or not to automatically press the fire button to start the game, or have the agent do this.')
+        parser.add_argument('-frame_buffer', action='store_true', help='Whether or not to store only the newest frame of each observation in the sampler batch buffer.')
 
     # curiosity specific args
     curiosity_alg = args_in[args_in.index('-curiosity_alg')+1]
@@ -89,6 +93,8 @@ def get_args(args_in=sys.argv[1:]):
         parser.add_argument('-prediction_beta', default=1.0, type=float, help='Scalar multiplier applied to the prediction error to generate the intrinsic reward. Environment dependent.')
         parser.add_argument('-forward_model', default='res', type=str, choices=['res', 'og'], help='Which forward model architecture to use.')
         parser.add_argument('-feature_space', default='inverse', type=str, choices=['inverse', 'random'], help='Use inverse features or random fixed features.')
+        parser.add_argument('-cache_features', action='store_true', help='Whether or not to reuse the (fixed) features computed for the intrinsic reward in the curiosity loss.')
+        parser.add_argument('-shared_encoder', action='store_true', help='Whether or not the (lstm) policy uses the curiosity feature encoder, with gradients stopped, instead of its own (needs inverse features).')
     elif curiosity_alg == 'micm':
         parser.add_argument('-feature_encoding', default='idf_burda', type=str, choices=['none', 'idf', 'idf_burda', 'idf_maze'], help='Which feature encoding method to use with ICM.')
         parser.add_argument('-forward_loss_wt', default=0.2, type=float, help='Forward loss coefficient. Inverse weight is (1 - this).')
@@ -96,6 +102,7 @@ def get_args(args_in=sys.argv[1:]):
         parser.add_argument('-prediction_beta', default=1.0, type=float, help='Scalar multiplier applied to the prediction error to generate the intrinsic reward. Environment dependent.')
         parser.add_argument('-forward_model', default='res', type=str, choices=['res', 'og'], help='Which forward model architecture to use.')
         parser.add_argument('-ensemble_mode', default='sample', type=str, choices=['sample', 'mean', 'var'], help='Which ensemble reward formulation to use.')
+        parser.add_argument('-ensemble_size', default=5, type=int, help='Number of forward models in the ensemble.')
     elif curiosity_alg == 'disagreement':
         parser.add_argument('-feature_encoding', default='idf_burda', type=str, choices=['none', 'idf', 'idf_burda', 'idf_maze'], help='Which feature encoding method to use with ICM.')
         parser.add_argument('-forward_loss_wt', default=0.2, type=float, help='Forward loss coefficient. Inverse weight is (1 - this).')
@@ -103,6 +110,7 @@ def get_args(args_in=sys.argv[1:]):
         parser.add_argument('-batch_norm', action='store_true', help='Whether or not to use batch norm in the feature encoder.')
         parser.add_argument('-prediction_beta', default=1.0, type=float, help='Scalar multiplier applied to the prediction error to generate the intrinsic reward. Environment dependent.')
         parser.add_argument('-forward_model', default='res', type=str, choices=['res', 'og'], help='Which forward model architecture to use.')
+        parser.add_argument('-cache_features', action='store_true', help='Whether or not to reuse the (fixed) features computed for the intrinsic reward in the curiosity loss.')
     elif curiosity_alg == 'ndigo':
         parser.add_argument('-feature_encoding', default='idf_maze', type=str, choices=['none', 'idf', 'idf_burda', 'idf_maze'], help='Which feature encoding method to use with ICM.')
         parser.add_argument('-pred_horizon', default=1, type=int, help='Number of prediction steps used to calculate intrinsic reward.')
@@ -112,6 +120,7 @@ def get_args(args_in=sys.argv[1:]):
         parser.add_argument('-feature_encoding', default='none', type=str, choices=['none'], help='Which feature encoding method to use with RND.')
         parser.add_argument('-prediction_beta', default=1.0, type=float, help='Scalar multiplier applied to the prediction error to generate the intrinsic reward. Environment dependent.')
         parser.add_argument('-drop_probability', default=1.0, type=float, help='Decimal percent of experience to drop when training the predictor model.')
+        parser.add_argument('-cache_features', action='store_true', help='Whether or not to reuse the (fixed) features computed for the intrinsic reward in the curiosity loss.')
     elif curiosity_alg == 'none':
         parser.add_argument('-feature_encoding', default='none', type=str, choices=['none'], help='Which feature encoding method to use with your policy.')
 